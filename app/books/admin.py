@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.contrib.admin import SimpleListFilter
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django import forms
-from .models import Book, RentalHistory, ErrorLog
+from django.utils import timezone
+from .models import (
+    Book, RentalHistory, ErrorLog, BookInfoCache, ImportRetryState, SheetSyncState, ImportLock, ImportShard, ImportRun
+)
+from .utils.admin_changelist import EstimatedCountPaginator, KeysetChangeList
 from datetime import date, timedelta
 
 
@@ -49,12 +53,23 @@ class CreatedDateDropdownFilter(SimpleListFilter):
         return queryset
 
 
+class LargeTableAdminMixin:
+    """件数の多いテーブルの一覧（件数は閾値までしか数えず、既定の並び順ではキーセットでページングする）"""
+    
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # 絞り込みなしの全件数のCOUNTを実行しない
+    
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
 @admin.register(Book)
-class BookAdmin(admin.ModelAdmin):
+class BookAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['thumbnail_image', 'title_with_status', 'author', 'isbn', 'status_badge', 'current_borrower', 'location', 'created_at']
     list_filter = [StatusDropdownFilter, 'application_date', 'approval_date', CreatedDateDropdownFilter]
-    search_fields = ['title', 'author', 'isbn', 'application_number', 'applicant_name', 'approver_name']
-    readonly_fields = ['created_at', 'updated_at', 'thumbnail_preview']
+    search_fields = ['search_key']  # 検索はget_search_resultsで行う
+    search_help_text = '書籍名・著者・出版社・ISBN・申請番号・申請者名・承認者名で検索（全角/半角、カタカナ/ひらがなは区別しません）'
+    readonly_fields = ['created_at', 'updated_at', 'thumbnail_preview', 'current_borrower_name', 'current_due_date']
     list_per_page = 20
     date_hierarchy = None  # 上部にフィルターを配置するため無効化
     
@@ -72,7 +87,7 @@ class BookAdmin(admin.ModelAdmin):
             'fields': ('application_number', 'applicant_name', 'approver_name', 'application_date', 'approval_date', 'price'),
         }),
         ('管理情報', {
-            'fields': ('status', 'location')
+            'fields': ('status', 'location', 'current_borrower_name', 'current_due_date')
         }),
         ('タイムスタンプ', {
             'fields': ('created_at', 'updated_at'),
@@ -141,6 +156,12 @@ class BookAdmin(admin.ModelAdmin):
     status_badge.short_description = 'ステータス'
     status_badge.admin_order_field = 'status'
     
+    def get_search_results(self, request, queryset, search_term):
+        """検索（列ごとのLIKE検索ではなく、ISBN・申請番号の完全一致と検索キーの全文検索を使用）"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
+    
     def current_borrower(self, obj):
         """現在の貸出人 - Cursorコンソールスタイル"""
         if obj.status == 'rented':
@@ -152,10 +173,11 @@ class BookAdmin(admin.ModelAdmin):
                 )
         return format_html('<span style="color: #999;">-</span>')
     current_borrower.short_description = '貸出人'
+    current_borrower.admin_order_field = 'current_borrower_name'
 
 
 @admin.register(RentalHistory)
-class RentalHistoryAdmin(admin.ModelAdmin):
+class RentalHistoryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ['book_with_status', 'borrower_badge', 'rental_date', 'expected_return_date', 'actual_return_date', 'overdue_badge']
     list_filter = ['rental_date', 'expected_return_date', 'actual_return_date']
     search_fields = ['book__title', 'borrower_name']
@@ -228,12 +250,12 @@ class RentalHistoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(ErrorLog)
-class ErrorLogAdmin(admin.ModelAdmin):
-    list_display = ['error_type_badge', 'application_number', 'isbn', 'error_message_short', 'created_at']
-    list_filter = ['error_type', 'created_at']
+class ErrorLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['error_type_badge', 'application_number', 'isbn', 'error_message_short', 'occurrence_count', 'last_seen_at']
+    list_filter = ['error_type', 'last_seen_at']
     search_fields = ['application_number', 'isbn', 'error_message']
-    readonly_fields = ['application_number', 'isbn', 'error_type', 'error_message', 'created_at']
-    date_hierarchy = 'created_at'
+    readonly_fields = ['application_number', 'isbn', 'error_type', 'error_message', 'occurrence_count', 'created_at', 'last_seen_at']
+    date_hierarchy = 'last_seen_at'
     list_per_page = 20
     
     class Media:
@@ -249,7 +271,7 @@ class ErrorLogAdmin(admin.ModelAdmin):
             'fields': ('application_number', 'isbn')
         }),
         ('発生日時', {
-            'fields': ('created_at',)
+            'fields': ('occurrence_count', 'created_at', 'last_seen_at')
         }),
     )
     
@@ -259,7 +281,10 @@ class ErrorLogAdmin(admin.ModelAdmin):
             'INITIALIZATION_ERROR': '#d9534f',  # レッド（重大エラー）
             'INVALID_ISBN': '#f0ad4e',          # オレンジ
             'BOOK_NOT_FOUND': '#f0ad4e',        # オレンジ
+            'RATE_LIMITED': '#f0ad4e',          # オレンジ
+            'API_ERROR': '#f0ad4e',             # オレンジ
             'PROCESSING_ERROR': '#d9534f',      # レッド（重大エラー）
+            'SHEET_UPDATE_ERROR': '#d9534f',    # レッド（重大エラー）
             'BATCH_ERROR': '#d9534f',           # レッド（重大エラー）
         }
         color = colors.get(obj.error_type, '#999999')
@@ -289,3 +314,158 @@ class ErrorLogAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """変更権限を無効化（読み取り専用）"""
         return False
+
+
+@admin.register(ImportRetryState)
+class ImportRetryStateAdmin(admin.ModelAdmin):
+    list_display = ['application_number', 'row_index', 'isbn', 'last_error_type', 'attempt_count', 'next_attempt_at', 'is_parked']
+    list_filter = ['is_parked', 'last_error_type']
+    search_fields = ['application_number', 'isbn']
+    readonly_fields = ['application_number', 'row_index', 'isbn', 'attempt_count', 'last_error_type', 'next_attempt_at', 'is_parked', 'created_at', 'updated_at']
+    actions = ['retry_next_run']
+    list_per_page = 20
+    
+    class Media:
+        css = {
+            'all': ('admin/css/custom_admin.css',)
+        }
+    
+    def has_add_permission(self, request):
+        """追加権限を無効化（バッチが自動作成するため）"""
+        return False
+    
+    @admin.action(description='次回のバッチで再試行する')
+    def retry_next_run(self, request, queryset):
+        """保留・待機中の行を次回実行時に再試行させる"""
+        updated = queryset.update(attempt_count=0, is_parked=False, next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated}件を次回のバッチで再試行します')
+
+
+@admin.register(BookInfoCache)
+class BookInfoCacheAdmin(admin.ModelAdmin):
+    list_display = ['isbn', 'title', 'author', 'is_found', 'fetched_at']
+    list_filter = ['is_found', 'fetched_at']
+    search_fields = ['isbn', 'title']
+    readonly_fields = ['isbn', 'is_found', 'title', 'author', 'publisher', 'published_date', 'description', 'thumbnail_url', 'fetched_at']
+    list_per_page = 20
+    
+    class Media:
+        css = {
+            'all': ('admin/css/custom_admin.css',)
+        }
+    
+    def has_add_permission(self, request):
+        """追加権限を無効化（APIの取得結果から自動作成するため）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限を無効化（読み取り専用、削除で再取得させる）"""
+        return False
+
+
+@admin.register(SheetSyncState)
+class SheetSyncStateAdmin(admin.ModelAdmin):
+    list_display = ['sheet_name', 'high_water_row', 'last_synced_at']
+    readonly_fields = ['sheet_name', 'high_water_row', 'last_synced_at', 'created_at', 'updated_at']
+    
+    class Media:
+        css = {
+            'all': ('admin/css/custom_admin.css',)
+        }
+    
+    def has_add_permission(self, request):
+        """追加権限を無効化（バッチが自動作成するため）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限を無効化（読み取り専用、削除すると次回同期で基準を作り直す）"""
+        return False
+
+
+@admin.register(ImportLock)
+class ImportLockAdmin(admin.ModelAdmin):
+    list_display = ['name', 'owner', 'acquired_at', 'heartbeat_at', 'expires_at']
+    readonly_fields = ['name', 'owner', 'acquired_at', 'heartbeat_at', 'expires_at']
+    
+    class Media:
+        css = {
+            'all': ('admin/css/custom_admin.css',)
+        }
+    
+    def has_add_permission(self, request):
+        """追加権限を無効化（ワーカーが自動作成するため）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限を無効化（読み取り専用、削除するとロックを強制解放）"""
+        return False
+
+
+@admin.register(ImportShard)
+class ImportShardAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'owner', 'lease_expires_at', 'available_at', 'high_water_row', 'last_synced_at', 'run_count']
+    list_filter = ['sheet_name']
+    readonly_fields = [
+        'sheet_name', 'start_row', 'end_row', 'owner', 'leased_at', 'lease_expires_at', 'available_at',
+        'high_water_row', 'last_synced_at', 'run_count', 'created_at', 'updated_at'
+    ]
+    
+    class Media:
+        css = {
+            'all': ('admin/css/custom_admin.css',)
+        }
+    
+    def has_add_permission(self, request):
+        """追加権限を無効化（ワーカーがシートの行数に合わせて自動作成するため）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限を無効化（読み取り専用）"""
+        return False
+
+
+@admin.register(ImportRun)
+class ImportRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'started_at', 'sheet_name', 'status', 'duration_seconds', 'success_count', 'error_count',
+        'updated_count', 'sheets_api_calls', 'books_api_calls', 'lookup_p50_ms', 'lookup_p95_ms'
+    ]
+    list_filter = ['status', 'sheet_name', 'started_at']
+    date_hierarchy = 'started_at'
+    readonly_fields = [
+        'sheet_name', 'status', 'started_at', 'finished_at', 'duration_seconds', 'stage_timings_table',
+        'sheets_api_calls', 'books_api_calls', 'lookup_p50_ms', 'lookup_p95_ms',
+        'scanned_rows', 'pending_rows', 'changed_rows', 'lookup_rows', 'lookup_unique_isbns',
+        'success_count', 'error_count', 'skip_count', 'deferred_count', 'updated_count'
+    ]
+    exclude = ['stage_timings']
+    list_per_page = 50
+    
+    class Media:
+        css = {
+            'all': ('admin/css/custom_admin.css',)
+        }
+    
+    def stage_timings_table(self, obj):
+        """段階別処理時間（処理時間の長い順、全体に占める割合付き）"""
+        if not obj.stage_timings:
+            return '-'
+        total = obj.duration_seconds or sum(obj.stage_timings.values()) or 1
+        rows = sorted(obj.stage_timings.items(), key=lambda item: item[1], reverse=True)
+        return format_html(
+            '<table>{}</table>',
+            format_html_join(
+                '',
+                '<tr><td>{}</td><td style="text-align: right;">{} 秒</td><td style="text-align: right;">{}%</td></tr>',
+                ((name, f'{seconds:.3f}', f'{seconds / total * 100:.1f}') for name, seconds in rows)
+            )
+        )
+    stage_timings_table.short_description = '段階別処理時間'
+    
+    def has_add_permission(self, request):
+        """追加権限を無効化（バッチが実行ごとに自動作成するため）"""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        """変更権限を無効化（読み取り専用）"""
+        return False
@@ -0,0 +1,273 @@
+"""
+取り込みバッチのベンチマークDjango管理コマンド
+
+Google Sheets / Google Books APIをオフラインの代替（books.utils.fake_google）に差し替え、
+合成した申請行で取り込み全体を実行して処理速度・API呼び出し数・DBクエリ数を計測する。
+取り込みは実際と同じくまとまりごとにコミットし、各サイズの実行後に作成したデータ
+（合成した申請番号の書籍・エラーログ・再試行状態、ベンチマーク用シートの同期状態・実行履歴、追加された書籍情報キャッシュ）を削除する。
+
+Usage:
+    python manage.py benchmark_import  # 1,000 / 10,000 / 100,000行
+    python manage.py benchmark_import --rows 1000 --books-latency-ms 50 --books-throttle-rate 0.05
+    python manage.py benchmark_import --rows 10000 --json benchmark.json  # 結果をJSONで保存
+"""
+
+import json
+import time
+import logging
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from books.models import Book, BookInfoCache, ErrorLog, ImportRetryState, ImportRun, SheetRowFingerprint, SheetSyncState
+from books.utils.fake_google import SYNTHETIC_PREFIX, FakeBooksAdapter, FakeSheetsService, synthetic_rows
+from books.utils.google_books_client import GoogleBooksClient
+from books.utils.google_sheets_client import GoogleSheetsClient
+from books.utils.rate_limiter import AdaptiveRateLimiter
+from .import_from_sheets import BookImportBatch
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """connection.execute_wrapperで実行されたSQLの件数を数える"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the book import batch against offline Google Sheets / Books stand-ins'
+    
+    # 実データの同期状態と混ざらないようにベンチマーク専用のシート名を使う
+    SHEET_NAME = 'Benchmark'
+    
+    def add_arguments(self, parser):
+        """コマンドライン引数の追加"""
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Synthetic sheet sizes to benchmark (default: 1000 10000 100000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of concurrent Google Books API lookups (default: settings.IMPORT_WORKERS)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Number of books inserted per bulk transaction (default: settings.IMPORT_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--flush-every',
+            type=int,
+            default=None,
+            help='Write imported flags back every N rows (default: settings.IMPORT_FLAG_FLUSH_SIZE)',
+        )
+        parser.add_argument(
+            '--unique-ratio',
+            type=float,
+            default=0.8,
+            help='Fraction of rows with a distinct ISBN (default: 0.8)',
+        )
+        parser.add_argument(
+            '--sheets-latency-ms',
+            type=float,
+            default=20.0,
+            help='Simulated latency per Sheets request in ms (default: 20)',
+        )
+        parser.add_argument(
+            '--sheets-error-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of Sheets requests answered with HTTP 503 (default: 0)',
+        )
+        parser.add_argument(
+            '--sheets-throttle-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of Sheets requests answered with HTTP 429 (default: 0)',
+        )
+        parser.add_argument(
+            '--books-latency-ms',
+            type=float,
+            default=10.0,
+            help='Simulated latency per Books request in ms (default: 10)',
+        )
+        parser.add_argument(
+            '--books-error-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of Books requests answered with HTTP 503 (default: 0)',
+        )
+        parser.add_argument(
+            '--books-throttle-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of Books requests answered with HTTP 429 (default: 0)',
+        )
+        parser.add_argument(
+            '--books-not-found-rate',
+            type=float,
+            default=0.02,
+            help='Fraction of ISBNs the Books stand-in does not know (default: 0.02)',
+        )
+        parser.add_argument(
+            '--books-rate',
+            type=float,
+            default=1000.0,
+            help='Rate limiter ceiling for Books requests per second (default: 1000)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for synthetic rows and injected failures (default: 1)',
+        )
+        parser.add_argument(
+            '--json',
+            default=None,
+            help='Write the results to this JSON file',
+        )
+    
+    def handle(self, *args, **options):
+        """コマンド実行"""
+        results = []
+        
+        # 行ごとのINFOログが計測に影響しないよう、詳細表示（-v 2以上）以外は抑止する
+        if options['verbosity'] < 2:
+            logging.disable(logging.INFO)
+        try:
+            for row_count in options['rows']:
+                self.stdout.write(f'Benchmarking {row_count} rows...')
+                results.append(self._run(row_count, options))
+        finally:
+            logging.disable(logging.NOTSET)
+        
+        self._write_table(results)
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+    
+    def _run(self, row_count: int, options) -> dict:
+        """
+        1サイズ分の取り込みを実行して計測（作成したデータは実行後に削除）
+        
+        Args:
+            row_count: 合成する行数
+            options: コマンドライン引数
+        
+        Returns:
+            計測結果
+        """
+        seed = options['seed']
+        sheets_service = FakeSheetsService(
+            synthetic_rows(row_count, unique_ratio=options['unique_ratio'], seed=seed),
+            latency=options['sheets_latency_ms'] / 1000,
+            error_rate=options['sheets_error_rate'],
+            throttle_rate=options['sheets_throttle_rate'],
+            seed=seed,
+            sheet_name=self.SHEET_NAME,
+        )
+        sheets_client = GoogleSheetsClient(api_key='benchmark', spreadsheet_id='benchmark')
+        sheets_client.service = sheets_service
+        
+        books_adapter = FakeBooksAdapter(
+            latency=options['books_latency_ms'] / 1000,
+            error_rate=options['books_error_rate'],
+            throttle_rate=options['books_throttle_rate'],
+            not_found_rate=options['books_not_found_rate'],
+            seed=seed,
+        )
+        session = requests.Session()
+        session.mount('https://', books_adapter)
+        books_rate = options['books_rate']
+        books_client = GoogleBooksClient(
+            api_key='benchmark',
+            session=session,
+            limiter=AdaptiveRateLimiter(
+                rate=books_rate,
+                min_rate=min(getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_MIN', 0.5), books_rate),
+                max_rate=books_rate,
+                increase_step=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_INCREASE', 0.5),
+                decrease_factor=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_DECREASE', 0.5),
+            ),
+        )
+        
+        batch = BookImportBatch(
+            workers=options['workers'],
+            flush_every=options['flush_every'],
+            chunk_size=options['chunk_size'],
+            sheet_name=self.SHEET_NAME,
+            sheets_client=sheets_client,
+            books_client=books_client,
+        )
+        queries = QueryCounter()
+        
+        # 外側のトランザクションで囲むとまとまりごとのコミットが計測されないため、実行後に削除する
+        last_cache_pk = BookInfoCache.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        try:
+            with connection.execute_wrapper(queries):
+                started = time.perf_counter()
+                success, error, skip = batch.process()
+                elapsed = time.perf_counter() - started
+        finally:
+            self._cleanup(last_cache_pk)
+        
+        return {
+            'rows': row_count,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(row_count / elapsed, 1) if elapsed else None,
+            'success': success,
+            'error': error,
+            'skip': skip,
+            'sheets_requests': dict(sheets_service.request_counts),
+            'sheets_errors': {str(status): count for status, count in sheets_service.error_counts.items()},
+            'books_requests': books_adapter.request_count,
+            'books_responses': {str(status): count for status, count in books_adapter.status_counts.items()},
+            'db_queries': queries.count,
+            'stage_timings': batch.timer.as_dict(),
+        }
+    
+    def _cleanup(self, last_cache_pk: int) -> None:
+        """
+        1サイズ分の実行で作成したデータを削除（次のサイズの計測にキャッシュ・登録済みの書籍を持ち越さない）
+        
+        Args:
+            last_cache_pk: 実行前の書籍情報キャッシュの最大の主キー（より後に追加された行を削除する）
+        """
+        for model in (Book, ErrorLog, ImportRetryState):
+            model.objects.filter(application_number__startswith=SYNTHETIC_PREFIX).delete()
+        for model in (SheetRowFingerprint, SheetSyncState, ImportRun):
+            model.objects.filter(sheet_name=self.SHEET_NAME).delete()
+        BookInfoCache.objects.filter(pk__gt=last_cache_pk).delete()
+    
+    def _write_table(self, results) -> None:
+        """計測結果を表形式で出力"""
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('=' * 96))
+        self.stdout.write(
+            f"{'rows':>8} {'seconds':>9} {'rows/s':>9} {'success':>8} {'error':>6} "
+            f"{'sheets req':>11} {'books req':>10} {'429':>6} {'db queries':>11}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['rows']:>8} {result['seconds']:>9.2f} {result['rows_per_second'] or 0:>9.1f} "
+                f"{result['success']:>8} {result['error']:>6} "
+                f"{sum(result['sheets_requests'].values()):>11} {result['books_requests']:>10} "
+                f"{result['books_responses'].get('429', 0):>6} {result['db_queries']:>11}"
+            )
+        self.stdout.write(self.style.SUCCESS('=' * 96))
+        for result in results:
+            timings = ', '.join(f'{name}={seconds:.2f}s' for name, seconds in result['stage_timings'].items())
+            self.stdout.write(f"{result['rows']} rows: {timings}")
@@ -8,7 +8,7 @@ Usage:
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from books.models import Book, RentalHistory, ErrorLog
 
 
@@ -38,8 +38,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-001',
                 'applicant_name': '山田太郎',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/01',
-                'approval_date': '2024/10/02',
+                'application_date': date(2024, 10, 1),
+                'approval_date': date(2024, 10, 2),
                 'price': 3960,
                 'isbn': '9784798121963',
                 'title': 'エリック・エヴァンスのドメイン駆動設計',
@@ -55,8 +55,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-002',
                 'applicant_name': '鈴木花子',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/03',
-                'approval_date': '2024/10/03',
+                'application_date': date(2024, 10, 3),
+                'approval_date': date(2024, 10, 3),
                 'price': 3080,
                 'isbn': '9784873119038',
                 'title': 'リーダブルコード',
@@ -72,8 +72,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-003',
                 'applicant_name': '田中一郎',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/05',
-                'approval_date': '2024/10/06',
+                'application_date': date(2024, 10, 5),
+                'approval_date': date(2024, 10, 6),
                 'price': 2970,
                 'isbn': '9784297114688',
                 'title': 'Python実践入門',
@@ -89,8 +89,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-004',
                 'applicant_name': '佐々木美咲',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/08',
-                'approval_date': '2024/10/09',
+                'application_date': date(2024, 10, 8),
+                'approval_date': date(2024, 10, 9),
                 'price': 3520,
                 'isbn': '9784873119755',
                 'title': 'プログラマのためのSQL 第4版',
@@ -106,8 +106,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-005',
                 'applicant_name': '高橋健太',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/10',
-                'approval_date': '2024/10/10',
+                'application_date': date(2024, 10, 10),
+                'approval_date': date(2024, 10, 10),
                 'price': 4180,
                 'isbn': '9784297124021',
                 'title': 'Clean Architecture 達人に学ぶソフトウェアの構造と設計',
@@ -123,8 +123,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-006',
                 'applicant_name': '伊藤直樹',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/12',
-                'approval_date': '2024/10/13',
+                'application_date': date(2024, 10, 12),
+                'approval_date': date(2024, 10, 13),
                 'price': 3300,
                 'isbn': '9784873119700',
                 'title': 'Webを支える技術',
@@ -140,8 +140,8 @@ class Command(BaseCommand):
                 'application_number': 'APP-2024-007',
                 'applicant_name': '中村優子',
                 'approver_name': '佐藤次郎',
-                'application_date': '2024/10/14',
-                'approval_date': '2024/10/14',
+                'application_date': date(2024, 10, 14),
+                'approval_date': date(2024, 10, 14),
                 'price': 2860,
                 'isbn': '9784297133610',
                 'title': 'Git実践入門',
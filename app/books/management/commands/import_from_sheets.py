@@ -5,14 +5,34 @@ Google Sheetsから承認済み申請を取得し、Google Books APIで書籍情
 
 Usage:
     python manage.py import_from_sheets
+    python manage.py import_from_sheets --workers 8  # 書籍情報を8並列で取得
+    python manage.py import_from_sheets --flush-every 50  # フラグを50行ごとに書き戻し
+    python manage.py import_from_sheets --chunk-size 500  # 500行ずつ1トランザクションで登録
+    python manage.py import_from_sheets --dry-run  # 読み込みと書籍情報の取得のみ行い、書き込みは行わない
+    python manage.py import_from_sheets --profile  # cProfile・tracemallocで計測して結果をファイルに出力
+    python manage.py import_from_sheets --wait 600  # 実行中の取り込みがあれば最大600秒待ってから実行
 """
 
+import time
+import cProfile
 import logging
-from typing import Dict, Any, Tuple
+import pstats
+import tracemalloc
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Set, Tuple
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from books.models import Book, ErrorLog
-from books.utils.google_sheets_client import GoogleSheetsClient
-from books.utils.google_books_client import GoogleBooksClient
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from books.models import Book, BookInfoCache, ImportRetryState, ImportRun, ImportShard, SheetSyncState, SheetRowFingerprint
+from books.utils.google_sheets_client import GoogleSheetsClient, SheetRow
+from books.utils.google_books_client import GoogleBooksClient, get_shared_client
+from books.utils.book_info_cache import CachedBookInfoClient
+from books.utils.error_log_writer import ErrorLogWriter
+from books.utils.import_lock import DatabaseLock
+from books.utils.sheet_dates import parse_sheet_date
+from books.utils.stage_timer import StageTimer, percentile
 
 logger = logging.getLogger(__name__)
 
@@ -20,13 +40,81 @@ logger = logging.getLogger(__name__)
 class BookImportBatch:
     """書籍取り込みバッチクラス"""
     
-    def __init__(self):
-        """初期化"""
-        self.sheets_client = None
-        self.books_client = None
+    # 取り込み後の編集でBookに反映するスプレッドシートの項目
+    SHEET_FIELDS = ['applicant_name', 'approver_name', 'application_date', 'approval_date', 'isbn', 'price']
+    
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        flush_every: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        sheet_name: str = 'Sheet1',
+        sheets_client: Optional[GoogleSheetsClient] = None,
+        dry_run: bool = False,
+        books_client: Optional[GoogleBooksClient] = None,
+        shard: Optional[ImportShard] = None
+    ):
+        """
+        初期化
+        
+        Args:
+            workers: Google Books APIへの並列問い合わせ数（省略時は設定から取得）
+            flush_every: 取り込み済みフラグをまとめて書き戻す行数（省略時は設定から取得）
+            chunk_size: 1トランザクションで処理する行数（書籍の一括登録もこの単位、省略時は設定から取得）
+            sheet_name: 取り込み元のシート名
+            sheets_client: 認証済みのGoogle Sheetsクライアント（常駐ワーカーが実行をまたいで再利用する場合に指定）
+            dry_run: Trueの場合は読み込みと書籍情報の取得のみ行い、DB・スプレッドシートへの書き込みを行わない
+            books_client: Google Booksクライアント（省略時はプロセス内の共有クライアント、ベンチマークで差し替える場合に指定）
+            shard: リース中の取り込みシャード（指定時はその行範囲のみを処理し、同期状態もシャードに保存する）
+        """
+        self.shard = shard
+        self.sheet_name = shard.sheet_name if shard else sheet_name
+        self.start_row = shard.start_row if shard else 2
+        self.end_row = shard.end_row if shard else None
+        self.sheets_client = sheets_client
+        self.dry_run = dry_run
+        self.workers = max(1, workers or getattr(settings, 'IMPORT_WORKERS', 1))
+        self.flush_every = max(1, flush_every or getattr(settings, 'IMPORT_FLAG_FLUSH_SIZE', 100))
+        self.chunk_size = max(1, chunk_size or getattr(settings, 'IMPORT_CHUNK_SIZE', 200))
+        self.books_client = books_client
+        self.book_info_cache = None
+        self.pending_flags: List[int] = []
+        self.pending_books: List[Tuple[SheetRow, Book]] = []
+        self.error_log = ErrorLogWriter()  # エラーログは実行の最後にまとめて書き込む
+        self.existing_application_numbers: Set[str] = set()
+        self.retry_states: Dict[str, ImportRetryState] = {}
+        self.sync_state: Optional[SheetSyncState] = None
+        self.fingerprints: Dict[str, str] = {}                       # 保存済みの内容ハッシュ（申請番号 → ハッシュ）
+        self.unseen_fingerprints: Dict[str, Tuple[int, str]] = {}    # 基準の保存候補（申請番号 → (行番号, 内容ハッシュ)）
+        self.pending_fingerprints: Dict[str, Tuple[int, str]] = {}  # 申請番号 → (行番号, 内容ハッシュ)
+        self.unsaved_fingerprint_row: Optional[int] = None          # 内容ハッシュを保存できなかった最初の行
+        self.last_scanned_row = 0
+        self.changed_books: Dict[str, Book] = {}
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.row_isbns: Dict[int, str] = {}                          # 行番号 → 正規化済みISBN
+        self.lookups: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self.lookup_futures: Dict[str, Future] = {}
+        self.retry_base = timedelta(minutes=getattr(settings, 'IMPORT_RETRY_BASE_MINUTES', 60))
+        self.retry_max = timedelta(minutes=getattr(settings, 'IMPORT_RETRY_MAX_MINUTES', 10080))
+        self.retry_max_attempts = getattr(settings, 'IMPORT_RETRY_MAX_ATTEMPTS', 8)
         self.success_count = 0
         self.error_count = 0
         self.skip_count = 0
+        self.deferred_count = 0
+        self.updated_count = 0        # 取り込み後に編集された行の反映件数
+        self.lookup_total_count = 0   # 書籍情報が必要な行数
+        self.lookup_unique_count = 0  # ユニークなISBN数
+        self.api_call_count = 0       # Google Books APIの呼び出し数
+        self.scanned_row_count = 0
+        self.pending_row_count = 0
+        self.changed_row_count = 0
+        self.failed = False           # 初期化失敗・予期しないエラーで中断したか
+        self.timer = StageTimer()     # 段階ごとの処理時間（実行履歴に記録）
+        self.sheets_request_base = 0  # 実行開始時点のSheets APIリクエスト数（共有クライアントの差分を記録）
+        # dry-run時に省略した書き込み
+        self.projected_flag_rows = 0
+        self.projected_sheets_writes = 0  # フラグ書き戻しのbatchUpdateリクエスト数
+        self.projected_error_logs = 0
         
     def initialize_clients(self) -> bool:
         """
@@ -38,13 +126,19 @@ class BookImportBatch:
         try:
             logger.info("Initializing API clients...")
             
-            # Google Sheets クライアント初期化
-            self.sheets_client = GoogleSheetsClient()
-            self.sheets_client.authenticate()
+            # Google Sheets クライアント初期化（渡されたクライアントが認証済みの場合はそのまま使う）
+            if self.sheets_client is None:
+                self.sheets_client = GoogleSheetsClient()
+            if not self.sheets_client.service:
+                self.sheets_client.authenticate()
+            self.sheets_request_base = self.sheets_client.request_count
             logger.info("Google Sheets client initialized")
             
             # Google Books クライアント初期化
-            self.books_client = GoogleBooksClient()
+            if self.books_client is None:
+                self.books_client = get_shared_client()
+            self.books_client.pop_latencies()  # 前回の実行分の計測値を破棄
+            self.book_info_cache = CachedBookInfoClient(self.books_client)
             logger.info("Google Books client initialized")
             
             return True
@@ -61,7 +155,21 @@ class BookImportBatch:
     
     def process(self) -> Tuple[int, int, int]:
         """
-        メイン処理
+        メイン処理（終了時に実行履歴を記録）
+        
+        Returns:
+            (成功件数, エラー件数, スキップ件数)
+        """
+        started_at = timezone.now()
+        self.timer = StageTimer()
+        result = self._run()
+        self._flush_errors()
+        self._record_run(started_at, result)
+        return result
+    
+    def _run(self) -> Tuple[int, int, int]:
+        """
+        取り込み処理の本体
         
         Returns:
             (成功件数, エラー件数, スキップ件数)
@@ -72,24 +180,56 @@ class BookImportBatch:
         
         try:
             # APIクライアント初期化
-            if not self.initialize_clients():
+            with self.timer.stage('initialize'):
+                initialized = self.initialize_clients()
+            if not initialized:
                 logger.error("Batch terminated due to initialization failure")
+                self.failed = True
                 return (0, 1, 0)
             
-            # スプレッドシートから取り込み対象データを取得
-            logger.info("Fetching pending rows from spreadsheet...")
-            pending_rows = self.sheets_client.get_pending_rows()
-            
-            if not pending_rows:
-                logger.info("No pending rows found")
-                return (0, 0, 0)
+            # 判定に必要な列のみをページ単位で読み込みながら前回の同期状態との差分
+            # （未取り込み行・編集された取り込み済み行）を全列取得し、書籍情報の取得を先行して開始する
+            logger.info("Scanning spreadsheet...")
+            with self.timer.stage('db_read'):
+                if self.shard:
+                    # シャードごとに処理済み最終行を持つ（同期状態と同じ項目）
+                    self.sync_state = self.shard
+                elif self.dry_run:
+                    self.sync_state = (
+                        SheetSyncState.objects.filter(sheet_name=self.sheet_name).first()
+                        or SheetSyncState(sheet_name=self.sheet_name)
+                    )
+                else:
+                    self.sync_state, _ = SheetSyncState.objects.get_or_create(sheet_name=self.sheet_name)
+                fingerprints = SheetRowFingerprint.objects.filter(sheet_name=self.sheet_name)
+                if self.shard:
+                    # シャードの行範囲の内容ハッシュのみを読み込む
+                    fingerprints = fingerprints.filter(row_index__gte=self.start_row, row_index__lte=self.end_row)
+                self.fingerprints = dict(fingerprints.values_list('application_number', 'content_hash'))
+            self.last_scanned_row = 0
             
-            logger.info(f"Found {len(pending_rows)} pending rows")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                self.executor = executor
+                with self.timer.stage('sheets_read'):
+                    pending_rows, changed_rows = self._read_sheet()
+                # DB登録・フラグ書き戻しは行順に逐次実行するため、ここで取得完了を待つ
+                with self.timer.stage('lookup_wait'):
+                    lookups = self._collect_lookups()
+            self.executor = None
+            self.pending_row_count = len(pending_rows)
+            self.changed_row_count = len(changed_rows)
+            logger.info(f"Found {len(pending_rows)} pending rows and {len(changed_rows)} changed rows")
             
-            # 各行を処理
-            for idx, row_data in enumerate(pending_rows, 1):
-                logger.info(f"Processing row {idx}/{len(pending_rows)}: Application #{row_data.get('application_number')}")
-                self._process_row(row_data)
+            # 各行をchunk_size行ずつ1トランザクションで処理する
+            with self.timer.stage('process'):
+                rows = [(row, False) for row in pending_rows] + [(row, True) for row in changed_rows]
+                for start in range(0, len(rows), self.chunk_size):
+                    self._process_chunk(rows[start:start + self.chunk_size], lookups, start, len(pending_rows))
+                
+                # 処理する行がなかった場合の基準の内容ハッシュと、未送信の取り込み済みフラグを書き戻す
+                self._flush_fingerprints()
+                self._flush_flags()
+                self._save_sync_state()
             
             # 結果サマリー
             logger.info("=" * 50)
@@ -97,30 +237,420 @@ class BookImportBatch:
             logger.info(f"Success: {self.success_count}")
             logger.info(f"Error: {self.error_count}")
             logger.info(f"Skip: {self.skip_count}")
+            logger.info(f"Deferred: {self.deferred_count}")
+            logger.info(f"Updated: {self.updated_count}")
+            logger.info(f"Lookups: {self.lookup_unique_count} unique ISBNs / {self.lookup_total_count} rows ({self.api_call_count} API calls)")
+            logger.info(
+                "Stage timings: " + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.timer.timings.items())
+            )
             logger.info("=" * 50)
             
             return (self.success_count, self.error_count, self.skip_count)
             
         except Exception as e:
             logger.error(f"Unexpected error in batch process: {str(e)}")
+            # 登録済みの書籍が次回再処理されないよう、溜まっている書籍とフラグは書き戻しておく
+            try:
+                self._flush_books()
+                self._flush_flags()
+                self._flush_fingerprints()
+            except Exception as flush_error:
+                logger.error(f"Failed to flush imported flags: {str(flush_error)}")
             self._record_error(
                 application_number=None,
                 isbn=None,
                 error_type="BATCH_ERROR",
                 error_message=f"Batch process failed: {str(e)}"
             )
+            self.failed = True
             return (self.success_count, self.error_count + 1, self.skip_count)
     
-    def _process_row(self, row_data: Dict[str, Any]) -> None:
+    def _record_run(self, started_at, result: Tuple[int, int, int]) -> None:
+        """
+        実行履歴（段階ごとの処理時間・API呼び出し数・件数）を保存
+        
+        Args:
+            started_at: 開始日時
+            result: processの戻り値（成功件数, エラー件数, スキップ件数）
+        """
+        if self.dry_run:
+            return
+        
+        success, error, skip = result
+        if self.failed:
+            status = 'failed'
+        else:
+            status = 'error' if error > 0 else 'success'
+        
+        latencies = self.books_client.pop_latencies() if self.books_client else []
+        p50 = percentile(latencies, 50)
+        p95 = percentile(latencies, 95)
+        
+        try:
+            ImportRun.objects.create(
+                sheet_name=self.sheet_name,
+                status=status,
+                started_at=started_at,
+                finished_at=timezone.now(),
+                duration_seconds=round(self.timer.elapsed(), 3),
+                stage_timings=self.timer.as_dict(),
+                sheets_api_calls=(self.sheets_client.request_count - self.sheets_request_base) if self.sheets_client else 0,
+                books_api_calls=self.api_call_count,
+                lookup_p50_ms=round(p50 * 1000, 1) if p50 is not None else None,
+                lookup_p95_ms=round(p95 * 1000, 1) if p95 is not None else None,
+                scanned_rows=self.scanned_row_count,
+                pending_rows=self.pending_row_count,
+                changed_rows=self.changed_row_count,
+                lookup_rows=self.lookup_total_count,
+                lookup_unique_isbns=self.lookup_unique_count,
+                success_count=success,
+                error_count=error,
+                skip_count=skip,
+                deferred_count=self.deferred_count,
+                updated_count=self.updated_count,
+            )
+        except Exception as e:
+            logger.error(f"Failed to record import run: {str(e)}")
+    
+    def record_skipped(self, started_at) -> None:
+        """
+        他の実行が取り込みロックを保持していたため取り込みを行わなかったことを実行履歴に記録
+        
+        Args:
+            started_at: ロックの取得を試み始めた日時
+        """
+        finished_at = timezone.now()
+        try:
+            ImportRun.objects.create(
+                sheet_name=self.sheet_name,
+                status='skipped',
+                started_at=started_at,
+                finished_at=finished_at,
+                duration_seconds=round((finished_at - started_at).total_seconds(), 3),
+            )
+        except Exception as e:
+            logger.error(f"Failed to record skipped import run: {str(e)}")
+    
+    def _read_sheet(self) -> Tuple[List[SheetRow], List[SheetRow]]:
+        """
+        シートをページ単位で読み込み、差分の行をchunk_size行ごとに全列取得する（シャード指定時はその行範囲のみ）
+        
+        再試行待ちの除外は走査した列で済ませてから全列取得し、すぐに書籍情報の取得を投入するため、
+        先頭の行の書籍情報取得は後続のページの読み込みと並行して進む。
+        
+        Returns:
+            (取り込み対象行のリスト, 編集された取り込み済み行のリスト)
+        """
+        pending_rows: List[SheetRow] = []
+        changed_rows: List[SheetRow] = []
+        pending_candidates: List[SheetRow] = []  # 走査した取り込み対象行
+        changed_candidates: List[SheetRow] = []  # 走査した編集された行
+        
+        for row in self.sheets_client.scan_rows(self.sheet_name, start_row=self.start_row, end_row=self.end_row):
+            self.last_scanned_row = row.row_index
+            self.scanned_row_count += 1
+            is_pending = self._classify_row(row)
+            if is_pending is not None:
+                (pending_candidates if is_pending else changed_candidates).append(row)
+            
+            if len(pending_candidates) + len(changed_candidates) >= self.chunk_size:
+                self._read_candidates(pending_candidates, changed_candidates, pending_rows, changed_rows)
+                pending_candidates, changed_candidates = [], []
+            if len(self.unseen_fingerprints) >= self.chunk_size:
+                self._resolve_baseline()
+        
+        self._read_candidates(pending_candidates, changed_candidates, pending_rows, changed_rows)
+        self._resolve_baseline()
+        return pending_rows, changed_rows
+    
+    def _classify_row(self, row: SheetRow) -> Optional[bool]:
+        """
+        走査した行を保存済みの内容ハッシュ・処理済み最終行と比較して分類
+        
+        - 未取り込みの行: 取り込み対象
+        - 内容ハッシュが保存済みの値と異なる取り込み済みの行: 取り込み後に編集された行
+        - 内容ハッシュのない取り込み済みの行: 処理済み最終行より後の行のみ基準の保存候補とする
+          （初回同期時は全行が対象となり、既存の履歴は編集として扱わない）
+        
+        Args:
+            row: scan_rowsの行レコード
+        
+        Returns:
+            取り込み対象の場合True、編集された行の場合False、処理不要の場合None
+        """
+        if self.sheets_client.is_pending(row):
+            return True
+        
+        application_number = row.application_number
+        if not row.db_imported or not application_number:
+            return None
+        
+        content_hash = self.sheets_client.fingerprint(row)
+        stored_hash = self.fingerprints.get(application_number)
+        if stored_hash is None:
+            if row.row_index > self.sync_state.high_water_row:
+                self.unseen_fingerprints[application_number] = (row.row_index, content_hash)
+            return None
+        return False if stored_hash != content_hash else None
+    
+    def _read_candidates(
+        self,
+        pending_candidates: List[SheetRow],
+        changed_candidates: List[SheetRow],
+        pending_rows: List[SheetRow],
+        changed_rows: List[SheetRow]
+    ) -> None:
+        """
+        差分の行を全列取得し、書籍情報の取得を投入する
+        
+        Args:
+            pending_candidates: 走査した取り込み対象行
+            changed_candidates: 走査した編集された行
+            pending_rows: 取り込み対象行の追加先
+            changed_rows: 編集された行の追加先
+        """
+        if not pending_candidates and not changed_candidates:
+            return
+        
+        # 再試行待ち・保留中の行は走査した列（申請番号・ISBN）で判定し、全列取得・API呼び出しの前に除外
+        with self.timer.stage('db_read'):
+            due_indices = {row.row_index for row in self._filter_due_rows(pending_candidates)}
+        changed_indices = {row.row_index for row in changed_candidates}
+        row_indices = sorted(due_indices | changed_indices)
+        if not row_indices:
+            return
+        
+        # 走査と全列取得の間に編集された行は次回に回す
+        rows = self.sheets_client.get_row_records(row_indices, self.sheet_name)
+        pending = [row for row in rows if row.row_index in due_indices and self.sheets_client.is_pending(row)]
+        changed = [row for row in rows if row.row_index in changed_indices and row.db_imported]
+        
+        with self.timer.stage('db_read'):
+            # 登録済みの申請番号を1クエリで取得（行ごとの重複チェッククエリを省く）
+            self.existing_application_numbers |= self._load_existing_application_numbers(pending)
+            
+            # 編集された行の書籍を1クエリで取得し、ISBNが変わった行のみ書籍情報を取り直す
+            books = Book.objects.filter(application_number__in=[row.application_number for row in changed])
+            self.changed_books.update((book.application_number, book) for book in books)
+        isbn_changed = [
+            row for row in changed
+            if row.application_number in self.changed_books and self._isbn_changed(row, self.changed_books[row.application_number])
+        ]
+        
+        self._submit_lookups(pending + isbn_changed)
+        pending_rows.extend(pending)
+        changed_rows.extend(changed)
+    
+    def _resolve_baseline(self) -> None:
+        """基準の保存候補のうち、登録済みの書籍に対応する行のみ保存対象にする（手動でフラグを立てた行などは対象外）"""
+        if not self.unseen_fingerprints:
+            return
+        
+        unseen, self.unseen_fingerprints = self.unseen_fingerprints, {}
+        with self.timer.stage('db_read'):
+            baselined = Book.objects.filter(application_number__in=unseen).values_list('application_number', flat=True)
+            for application_number in baselined:
+                self.pending_fingerprints[application_number] = unseen[application_number]
+        logger.info(f"Baselined {len(self.pending_fingerprints)} imported rows")
+    
+    def _save_sync_state(self) -> None:
+        """処理済み最終行と同期日時を保存（内容ハッシュを保存できなかった行がある場合はその手前まで）"""
+        if self.dry_run:
+            return
+        high_water_row = self.last_scanned_row
+        if self.unsaved_fingerprint_row is not None:
+            # 次回の同期でその行以降の内容ハッシュのない取り込み済み行の基準を作り直す
+            high_water_row = min(high_water_row, self.unsaved_fingerprint_row - 1)
+        self.sync_state.high_water_row = high_water_row
+        self.sync_state.last_synced_at = timezone.now()
+        with self.timer.stage('db_write'):
+            self.sync_state.save(update_fields=['high_water_row', 'last_synced_at', 'updated_at'])
+    
+    def _queue_fingerprint(self, row_data: SheetRow) -> None:
+        """
+        取り込み済み・編集反映済みの行の内容ハッシュをバッファに積む
+        
+        Args:
+            row_data: スプレッドシートの行データ
+        """
+        self.pending_fingerprints[row_data.application_number] = (
+            row_data.row_index,
+            self.sheets_client.fingerprint(row_data),
+        )
+    
+    def _flush_fingerprints(self) -> None:
+        """バッファ内の内容ハッシュをまとめて保存（既存の値は上書き）"""
+        if not self.pending_fingerprints or self.dry_run:
+            self.pending_fingerprints = {}
+            return
+        
+        fingerprints, self.pending_fingerprints = self.pending_fingerprints, {}
+        now = timezone.now()
+        options = {
+            'update_conflicts': True,
+            'update_fields': ['row_index', 'content_hash', 'synced_at'],
+        }
+        # MySQLのON DUPLICATE KEY UPDATEは対象列を指定できない
+        if connection.features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['sheet_name', 'application_number']
+        
+        try:
+            with self.timer.stage('db_write'), transaction.atomic():
+                SheetRowFingerprint.objects.bulk_create(
+                    [
+                        SheetRowFingerprint(
+                            sheet_name=self.sheet_name,
+                            application_number=application_number,
+                            row_index=row_index,
+                            content_hash=content_hash,
+                            synced_at=now,
+                        )
+                        for application_number, (row_index, content_hash) in fingerprints.items()
+                    ],
+                    **options
+                )
+        except Exception as e:
+            # 処理済み最終行を保存できなかった最初の行の手前に留め、次回基準を作り直す
+            # （編集を反映した行は保存済みの古い内容ハッシュと異なるため、次回も編集として再反映される）
+            logger.error(f"Failed to store {len(fingerprints)} row fingerprints: {str(e)}")
+            first_row = min(row_index for row_index, _ in fingerprints.values())
+            if self.unsaved_fingerprint_row is None or first_row < self.unsaved_fingerprint_row:
+                self.unsaved_fingerprint_row = first_row
+    
+    def _filter_due_rows(self, pending_rows: List[SheetRow]) -> List[SheetRow]:
+        """
+        再試行状態を1クエリで取得し、再試行時期が来ていない行・保留中の行を除外
+        
+        Args:
+            pending_rows: 取り込み対象行のリスト
+        
+        Returns:
+            今回処理する行のリスト
+        """
+        application_numbers = {row.application_number for row in pending_rows}
+        retry_states = {
+            state.application_number: state
+            for state in ImportRetryState.objects.filter(application_number__in=application_numbers)
+        }
+        if not retry_states:
+            return pending_rows
+        self.retry_states.update(retry_states)
+        
+        now = timezone.now()
+        due_rows = []
+        for row in pending_rows:
+            state = retry_states.get(row.application_number)
+            isbn = self.books_client.normalize_isbn(row.isbn)
+            if state and not state.is_due(isbn, now):
+                self.deferred_count += 1
+                continue
+            due_rows.append(row)
+        
+        logger.info(f"Deferred {len(pending_rows) - len(due_rows)} rows waiting for retry")
+        return due_rows
+    
+    def _load_existing_application_numbers(self, pending_rows: List[SheetRow]) -> Set[str]:
+        """
+        取り込み対象行のうちDB登録済みの申請番号を取得
+        
+        Args:
+            pending_rows: 取り込み対象行のリスト
+        
+        Returns:
+            登録済み申請番号の集合
+        """
+        application_numbers = {row.application_number for row in pending_rows}
+        return set(
+            Book.objects.filter(application_number__in=application_numbers)
+            .values_list('application_number', flat=True)
+        )
+    
+    def _submit_lookups(self, rows: List[SheetRow]) -> None:
+        """
+        行の書籍情報の取得をワーカープールに投入（結果は_collect_lookupsで受け取る）
+        
+        ISBNが空または形式不正の行はAPIを呼ばずに除外する（_process_rowでエラー処理）。
+        同じ本を複数冊申請した場合などに備え、正規化したISBNごとに1回だけ取得して各行に割り当てる。
+        キャッシュの参照・保存はメインスレッドで行い、ワーカーはキャッシュ未ヒットの
+        ISBNのAPI呼び出しのみを担当する。
+        
+        Args:
+            rows: 書籍情報が必要な行のリスト
+        """
+        targets = {}
+        for row in rows:
+            isbn = row.isbn.strip()
+            if isbn and self.books_client.validate_isbn(isbn):
+                targets[row.row_index] = self.books_client.normalize_isbn(isbn)
+        
+        if not targets:
+            return
+        
+        self.row_isbns.update(targets)
+        self.lookup_total_count += len(targets)
+        
+        # 取得済み・取得中のISBNは投入しない（dictは挿入順を保つため、取得順は初出の行順になる）
+        unique_isbns = [
+            isbn for isbn in dict.fromkeys(targets.values())
+            if isbn not in self.lookups and isbn not in self.lookup_futures
+        ]
+        self.lookup_unique_count += len(unique_isbns)
+        
+        # キャッシュ済みのISBNはAPIを呼ばない
+        with self.timer.stage('db_read'):
+            cached = self.book_info_cache.get_cached(unique_isbns)
+        for isbn, book_info in cached.items():
+            self.lookups[isbn] = ((GoogleBooksClient.LOOKUP_FOUND if book_info else GoogleBooksClient.LOOKUP_NOT_FOUND), book_info)
+        misses = [isbn for isbn in unique_isbns if isbn not in self.lookups]
+        logger.info(
+            f"Book info lookups: {len(unique_isbns)} new unique ISBNs for {len(targets)} rows "
+            f"(cache: {len(unique_isbns) - len(misses)} hits, {len(misses)} misses)"
+        )
+        
+        for isbn in misses:
+            self.lookup_futures[isbn] = self.executor.submit(self.book_info_cache.fetch, isbn)
+        self.api_call_count += len(misses)
+    
+    def _collect_lookups(self) -> Dict[int, Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        投入済みの書籍情報の取得完了を待ち、キャッシュに保存
+        
+        Returns:
+            行番号をキー、(結果の種別 GoogleBooksClient.LOOKUP_*, 書籍情報)を値とする辞書
+        """
+        if self.lookup_futures:
+            logger.info(f"Waiting for {len(self.lookup_futures)} book info lookups with {self.workers} workers")
+        
+        fetched = {}
+        futures, self.lookup_futures = self.lookup_futures, {}
+        for isbn, future in futures.items():
+            status, book_info = future.result()
+            self.lookups[isbn] = (status, book_info)
+            if self.book_info_cache.is_cacheable(status):
+                fetched[isbn] = book_info
+        if not self.dry_run:
+            with self.timer.stage('db_write'):
+                self.book_info_cache.store(fetched)
+        
+        return {row_index: self.lookups[isbn] for row_index, isbn in self.row_isbns.items()}
+    
+    def _process_row(
+        self,
+        row_data: SheetRow,
+        book_info: Optional[Dict[str, Any]] = None,
+        lookup_status: str = GoogleBooksClient.LOOKUP_NOT_FOUND
+    ) -> None:
         """
         1行分のデータを処理
         
         Args:
             row_data: スプレッドシートの行データ
+            book_info: _submit_lookupsで先読みした書籍情報（取得失敗時はNone）
+            lookup_status: 書籍情報取得結果の種別（GoogleBooksClient.LOOKUP_*）
         """
-        application_number = row_data.get('application_number', '')
-        isbn = row_data.get('isbn', '').strip()
-        row_index = row_data.get('row_index')
+        application_number = row_data.application_number
+        isbn = row_data.isbn.strip()
+        row_index = row_data.row_index
         
         try:
             # ISBNの妥当性チェック
@@ -137,12 +667,32 @@ class BookImportBatch:
                     error_type="INVALID_ISBN",
                     error_message=f"Invalid ISBN format: {isbn}"
                 )
+                self._schedule_retry(row_data, "INVALID_ISBN")
                 self.error_count += 1
                 return
             
-            # Google Books APIから書籍情報を取得
-            logger.info(f"Fetching book info for ISBN: {isbn}")
-            book_info = self.books_client.get_book_info_by_isbn(isbn)
+            if lookup_status == GoogleBooksClient.LOOKUP_THROTTLED:
+                # レート制限は一時的な失敗のため再試行スケジュールに載せず、次回実行時に再処理
+                logger.error(f"Application #{application_number}: Rate limited while fetching ISBN: {isbn}")
+                self._record_error(
+                    application_number=application_number,
+                    isbn=isbn,
+                    error_type="RATE_LIMITED",
+                    error_message=f"Google Books API rate limit exceeded for ISBN: {isbn}"
+                )
+                self.error_count += 1
+                return
+            
+            if lookup_status == GoogleBooksClient.LOOKUP_ERROR:
+                logger.error(f"Application #{application_number}: API request failed for ISBN: {isbn}")
+                self._record_error(
+                    application_number=application_number,
+                    isbn=isbn,
+                    error_type="API_ERROR",
+                    error_message=f"Google Books API request failed for ISBN: {isbn}"
+                )
+                self.error_count += 1
+                return
             
             if not book_info:
                 logger.error(f"Application #{application_number}: Book not found for ISBN: {isbn}")
@@ -152,22 +702,22 @@ class BookImportBatch:
                     error_type="BOOK_NOT_FOUND",
                     error_message=f"Book information not found for ISBN: {isbn}"
                 )
+                self._schedule_retry(row_data, "BOOK_NOT_FOUND")
                 self.error_count += 1
                 return
             
-            # DBに書籍を登録（重複チェック付き）
-            book, is_created = self._create_book(row_data, book_info)
-            
-            if is_created:
-                logger.info(f"Successfully created book: {book.title} (ID: {book.id})")
-                self.success_count += 1
-            else:
-                logger.info(f"Book already exists, skipping: {book.title} (ID: {book.id})")
+            # 申請番号での重複チェック（登録済みならフラグのみ書き戻す）
+            if application_number in self.existing_application_numbers:
+                logger.warning(f"Book with application number {application_number} already exists, skipping")
                 self.skip_count += 1
+                self._clear_retry_states([application_number])
+                self._queue_flag(row_index)
+                self._queue_fingerprint(row_data)
+                return
             
-            # スプレッドシートにフラグを立てる
-            self.sheets_client.mark_as_imported(row_index)
-            logger.info(f"Marked row {row_index} as imported")
+            # DB登録をバッファに積む（まとまりの最後に一括登録し、コミット後にフラグを書き戻す）
+            self.existing_application_numbers.add(application_number)
+            self.pending_books.append((row_data, self._build_book(row_data, book_info)))
             
         except Exception as e:
             logger.error(f"Failed to process row {row_index}: {str(e)}")
@@ -179,46 +729,326 @@ class BookImportBatch:
             )
             self.error_count += 1
     
-    def _create_book(self, row_data: Dict[str, Any], book_info: Dict[str, Any]) -> Tuple[Book, bool]:
+    def _process_chunk(
+        self,
+        rows: List[Tuple[SheetRow, bool]],
+        lookups: Dict[int, Tuple[str, Optional[Dict[str, Any]]]],
+        offset: int,
+        pending_total: int
+    ) -> None:
+        """
+        行のまとまりを1トランザクションで処理し、コミット後に取り込み済みフラグを書き戻す
+        
+        書籍・再試行状態・内容ハッシュの書き込みはまとめてコミットされるため、
+        フラグが立っているのに書籍が登録されていない行は生じない。
+        コミットに失敗した場合、このまとまりのフラグ・内容ハッシュは送らずに例外を送出する（次回実行時に再処理）。
+        
+        Args:
+            rows: (スプレッドシートの行データ, 取り込み後に編集された行か)のリスト
+            lookups: _collect_lookupsの戻り値
+            offset: 先頭の行の通し番号（0始まり、ログ出力用）
+            pending_total: 取り込み対象行の総数（ログ出力用）
+        """
+        committed_flags = len(self.pending_flags)
+        try:
+            # コミットにかかった時間はdb_writeに計上する
+            with self.timer.stage('db_write'), transaction.atomic(), self.timer.stage('process'):
+                for idx, (row, is_update) in enumerate(rows, offset + 1):
+                    lookup_status, book_info = lookups.get(row.row_index, (GoogleBooksClient.LOOKUP_NOT_FOUND, None))
+                    if is_update:
+                        self._process_update(row, self.changed_books.get(row.application_number), book_info, lookup_status)
+                    else:
+                        logger.info(f"Processing row {idx}/{pending_total}: Application #{row.application_number}")
+                        self._process_row(row, book_info, lookup_status)
+                self._flush_books()
+                self._flush_fingerprints()
+        except Exception:
+            # ロールバックされた書籍のフラグを立てないよう、このまとまりで積んだ分を破棄
+            del self.pending_flags[committed_flags:]
+            self.pending_books = []
+            self.pending_fingerprints = {}
+            raise
+        
+        self._flush_flags(partial=True)
+    
+    def _isbn_changed(self, row_data: SheetRow, book: Book) -> bool:
         """
-        書籍をDBに登録（重複チェック付き）
+        スプレッドシートのISBNが登録済みの書籍から変わったかどうか（ハイフンの有無は区別しない）
         
         Args:
             row_data: スプレッドシートの行データ
-            book_info: Google Books APIから取得した書籍情報
+            book: 登録済みの書籍
         
         Returns:
-            (Bookオブジェクト, 新規作成されたかどうか)
+            変わった場合True
+        """
+        return self.books_client.normalize_isbn(row_data.isbn) != self.books_client.normalize_isbn(book.isbn)
+    
+    def _process_update(
+        self,
+        row_data: SheetRow,
+        book: Optional[Book],
+        book_info: Optional[Dict[str, Any]] = None,
+        lookup_status: str = GoogleBooksClient.LOOKUP_NOT_FOUND
+    ) -> None:
         """
-        application_number = row_data.get('application_number', '')
+        取り込み後に編集された行の内容を登録済みの書籍に反映
         
-        # 申請番号での重複チェック
-        existing_book = Book.objects.filter(application_number=application_number).first()
-        if existing_book:
-            logger.warning(f"Book with application number {application_number} already exists (ID: {existing_book.id}), skipping")
-            return existing_book, False
+        ISBNが変わった場合は取り直した書籍情報で書籍名・著者なども更新する。書籍情報を取得できなかった場合は
+        反映せずにエラーを記録し、内容ハッシュを更新しないことで次回実行時に再度反映を試みる。
+        
+        Args:
+            row_data: スプレッドシートの行データ
+            book: 申請番号に対応する登録済みの書籍（削除済みの場合はNone）
+            book_info: _submit_lookupsで先読みした書籍情報
+            lookup_status: 書籍情報取得結果の種別（GoogleBooksClient.LOOKUP_*）
+        """
+        application_number = row_data.application_number
+        isbn = row_data.isbn.strip()
+        
+        if book is None:
+            # 書籍が削除されている場合は反映先がないため、現在の内容を基準として保存する
+            logger.warning(f"Application #{application_number}: edited row has no book, skipping update")
+            self._queue_fingerprint(row_data)
+            return
         
-        # 価格の処理（文字列から数値に変換）
-        price_str = row_data.get('price', '0')
         try:
-            # カンマを除去して数値に変換
-            price = float(price_str.replace(',', '')) if price_str else 0
-        except (ValueError, AttributeError):
-            price = 0
-            logger.warning(f"Invalid price format: {price_str}, set to 0")
+            isbn_changed = self._isbn_changed(row_data, book)
+            if isbn_changed and not book_info:
+                error_type = {
+                    GoogleBooksClient.LOOKUP_THROTTLED: "RATE_LIMITED",
+                    GoogleBooksClient.LOOKUP_ERROR: "API_ERROR",
+                }.get(lookup_status, "BOOK_NOT_FOUND" if isbn and self.books_client.validate_isbn(isbn) else "INVALID_ISBN")
+                logger.error(f"Application #{application_number}: cannot apply edited ISBN {isbn} ({error_type})")
+                self._record_error(
+                    application_number=application_number,
+                    isbn=isbn,
+                    error_type=error_type,
+                    error_message=f"Failed to apply edited ISBN to imported book: {isbn}"
+                )
+                self.error_count += 1
+                return
+            
+            update_fields = list(self.SHEET_FIELDS)
+            for field, value in self._sheet_values(row_data).items():
+                setattr(book, field, value)
+            if isbn_changed:
+                for field in BookInfoCache.BOOK_INFO_FIELDS:
+                    setattr(book, field, book_info.get(field, ''))
+                update_fields += BookInfoCache.BOOK_INFO_FIELDS
+            if not self.dry_run:
+                with self.timer.stage('db_write'), transaction.atomic():
+                    book.save(update_fields=update_fields + ['updated_at'])
+            
+            logger.info(f"Updated book from edited row: {book.title} (Application #{application_number})")
+            self.updated_count += 1
+            self._queue_fingerprint(row_data)
+            
+        except Exception as e:
+            logger.error(f"Failed to update book for row {row_data.row_index}: {str(e)}")
+            self._record_error(
+                application_number=application_number,
+                isbn=isbn,
+                error_type="PROCESSING_ERROR",
+                error_message=f"Failed to apply edited row: {str(e)}"
+            )
+            self.error_count += 1
+    
+    def _schedule_retry(self, row_data: SheetRow, error_type: str) -> None:
+        """
+        失敗した行の次回再試行日時を指数バックオフで設定（試行上限に達したら保留）
         
+        Args:
+            row_data: スプレッドシートの行データ
+            error_type: エラー種別
+        """
+        if self.dry_run:
+            return
+        
+        application_number = row_data.application_number
+        isbn = self.books_client.normalize_isbn(row_data.isbn)
+        
+        try:
+            state = self.retry_states.get(application_number)
+            if state is None or state.isbn != isbn:
+                # 初回失敗またはISBNが修正された場合は試行回数をリセット
+                state = state or ImportRetryState(application_number=application_number)
+                state.attempt_count = 0
+                state.is_parked = False
+            
+            state.row_index = row_data.row_index
+            state.isbn = isbn
+            state.last_error_type = error_type
+            state.attempt_count += 1
+            delay = min(self.retry_base * (2 ** (state.attempt_count - 1)), self.retry_max)
+            state.next_attempt_at = timezone.now() + delay
+            state.is_parked = state.attempt_count >= self.retry_max_attempts
+            # 失敗してもまとまりのトランザクションが中断しないようセーブポイント内で保存
+            with transaction.atomic():
+                state.save()
+            self.retry_states[application_number] = state
+            
+            if state.is_parked:
+                logger.warning(f"Application #{application_number}: parked after {state.attempt_count} failed attempts")
+            else:
+                logger.info(f"Application #{application_number}: retry #{state.attempt_count + 1} scheduled at {state.next_attempt_at}")
+        except Exception as e:
+            logger.error(f"Failed to schedule retry for application #{application_number}: {str(e)}")
+    
+    def _clear_retry_states(self, application_numbers: List[str]) -> None:
+        """
+        取り込みに成功した行の再試行状態を削除
+        
+        Args:
+            application_numbers: 申請番号のリスト
+        """
+        resolved = [number for number in application_numbers if self.retry_states.pop(number, None)]
+        if resolved and not self.dry_run:
+            ImportRetryState.objects.filter(application_number__in=resolved).delete()
+    
+    def _queue_flag(self, row_index: int) -> None:
+        """
+        取り込み済みフラグの書き戻しをバッファに積む（送信はトランザクションのコミット後）
+        
+        Args:
+            row_index: 行番号（1始まり）
+        """
+        self.pending_flags.append(row_index)
+    
+    def _flush_flags(self, partial: bool = False) -> None:
+        """
+        バッファ内の取り込み済みフラグをflush_every行ずつスプレッドシートにまとめて書き戻す
+        
+        Args:
+            partial: Trueの場合はflush_every行に満たない残りを次回の書き戻しまでバッファに残す
+        """
+        while self.pending_flags and (len(self.pending_flags) >= self.flush_every or not partial):
+            row_indices = self.pending_flags[:self.flush_every]
+            del self.pending_flags[:self.flush_every]
+            self._send_flags(row_indices)
+    
+    def _send_flags(self, row_indices: List[int]) -> None:
+        """
+        取り込み済みフラグを1リクエストで書き戻す
+        
+        Args:
+            row_indices: 行番号（1始まり）のリスト
+        """
+        if self.dry_run:
+            self.projected_flag_rows += len(row_indices)
+            self.projected_sheets_writes += 1
+            return
+        
+        with self.timer.stage('sheets_write'):
+            failed = self.sheets_client.mark_many_as_imported(row_indices, sheet_name=self.sheet_name)
+        
+        if failed:
+            # 書籍は登録済みのため、次回実行時は重複としてスキップされフラグが再送される
+            self._record_error(
+                application_number=None,
+                isbn=None,
+                error_type="SHEET_UPDATE_ERROR",
+                error_message=f"Failed to mark rows as imported: {', '.join(map(str, failed))}"
+            )
+            self.error_count += len(failed)
+    
+    def _flush_books(self) -> None:
+        """
+        バッファ内の書籍を一括登録し、取り込み済みフラグを積む
+        
+        まとまりのトランザクション内ではセーブポイントとなり、登録に失敗してもほかの行の書き込みは残る。
+        
+        実行開始後に別の実行が登録した申請は、登録直前の確認で登録済みとしてスキップする。
+        """
+        if not self.pending_books:
+            return
+        
+        chunk, self.pending_books = self.pending_books, []
+        
+        if self.dry_run:
+            for row_data, book in chunk:
+                logger.info(f"[DRY RUN] Would create book: {book.title} (Application #{book.application_number})")
+                self.success_count += 1
+                self._queue_flag(row_data.row_index)
+            return
+        
+        try:
+            created, existing = self._insert_books(chunk)
+        except Exception as e:
+            logger.error(f"Failed to bulk create {len(chunk)} books: {str(e)}")
+            for _, book in chunk:
+                self.existing_application_numbers.discard(book.application_number)
+                self._record_error(
+                    application_number=book.application_number,
+                    isbn=book.isbn,
+                    error_type="PROCESSING_ERROR",
+                    error_message=f"Failed to process row: {str(e)}"
+                )
+            self.error_count += len(chunk)
+            return
+        
+        for row_data, book in existing:
+            logger.warning(f"Book with application number {book.application_number} already exists, skipping")
+            self.skip_count += 1
+            self._queue_flag(row_data.row_index)
+            self._queue_fingerprint(row_data)
+        
+        for row_data, book in created:
+            logger.info(f"Successfully created book: {book.title} (Application #{book.application_number})")
+            self.success_count += 1
+            self._queue_flag(row_data.row_index)
+            self._queue_fingerprint(row_data)
+        
+        self._clear_retry_states([book.application_number for _, book in chunk])
+    
+    def _insert_books(self, chunk: List[Tuple[SheetRow, Book]]) -> Tuple[List[Tuple[SheetRow, Book]], List[Tuple[SheetRow, Book]]]:
+        """
+        登録済みの申請番号を除いて書籍を一括登録
+        
+        確認から登録までの間に別の実行が同じ申請を登録してユニーク制約に衝突した場合は、
+        登録をロールバックしてもう一度確認から行う。
+        
+        Args:
+            chunk: (行データ, 未保存の書籍)のリスト
+        
+        Returns:
+            (登録した行, 登録済みだった行)
+        """
+        application_numbers = [book.application_number for _, book in chunk]
+        for attempt in range(2):
+            try:
+                with self.timer.stage('db_write'), transaction.atomic():
+                    existing = set(
+                        Book.objects.filter(application_number__in=application_numbers)
+                        .values_list('application_number', flat=True)
+                    )
+                    created = [(row_data, book) for row_data, book in chunk if book.application_number not in existing]
+                    Book.objects.bulk_create([book for _, book in created])
+            except IntegrityError:
+                if attempt:
+                    raise
+                logger.warning(f"Application numbers in a chunk of {len(chunk)} books were registered concurrently, retrying")
+                continue
+            return created, [(row_data, book) for row_data, book in chunk if book.application_number in existing]
+    
+    def _build_book(self, row_data: SheetRow, book_info: Dict[str, Any]) -> Book:
+        """
+        行データと書籍情報から未保存のBookオブジェクトを作成
+        
+        Args:
+            row_data: スプレッドシートの行データ
+            book_info: Google Books APIから取得した書籍情報
+        
+        Returns:
+            未保存のBookオブジェクト
+        """
         # Bookオブジェクト作成
-        book = Book.objects.create(
-            # 申請情報
-            application_number=row_data.get('application_number', ''),
-            applicant_name=row_data.get('applicant_name', ''),
-            approver_name=row_data.get('approver_name', ''),
-            application_date=row_data.get('application_date', ''),
-            approval_date=row_data.get('approval_date', ''),
-            price=price,
+        book = Book(
+            # 申請情報（ISBNを含む）
+            application_number=row_data.application_number,
+            **self._sheet_values(row_data),
             
             # 書籍情報
-            isbn=row_data.get('isbn', ''),
             title=book_info.get('title', ''),
             author=book_info.get('author', ''),
             publisher=book_info.get('publisher', ''),
@@ -229,8 +1059,60 @@ class BookImportBatch:
             # 初期ステータス
             status='ordered',
         )
+        book.refresh_search_key()  # bulk_createではsaveが呼ばれない
+        return book
+    
+    def _sheet_values(self, row_data: SheetRow) -> Dict[str, Any]:
+        """
+        行データのうち書籍に保存する項目（SHEET_FIELDS）を型変換して取得
+        
+        Args:
+            row_data: スプレッドシートの行データ
+        
+        Returns:
+            フィールド名 → 値
+        """
+        return {
+            'applicant_name': row_data.applicant_name,
+            'approver_name': row_data.approver_name,
+            'application_date': self._parse_date(row_data.application_date, row_data),
+            'approval_date': self._parse_date(row_data.approval_date, row_data),
+            'isbn': row_data.isbn,
+            'price': self._parse_price(row_data.price),
+        }
+    
+    def _parse_date(self, date_str: Optional[str], row_data: SheetRow) -> Optional[date]:
+        """
+        日付の文字列を日付に変換（変換できない場合はNone）
+        
+        Args:
+            date_str: スプレッドシートの日付
+            row_data: スプレッドシートの行データ（ログ出力用）
+        
+        Returns:
+            日付
+        """
+        value = parse_sheet_date(date_str)
+        if value is None and date_str and date_str.strip():
+            logger.warning(f"Application #{row_data.application_number}: Invalid date format: {date_str}, set to empty")
+        return value
+    
+    def _parse_price(self, price_str: Optional[str]) -> float:
+        """
+        価格の文字列を数値に変換（変換できない場合は0）
         
-        return book, True
+        Args:
+            price_str: スプレッドシートの価格
+        
+        Returns:
+            価格
+        """
+        try:
+            # カンマを除去して数値に変換
+            return float(price_str.replace(',', '')) if price_str else 0
+        except (ValueError, AttributeError):
+            logger.warning(f"Invalid price format: {price_str}, set to 0")
+            return 0
     
     def _record_error(
         self,
@@ -240,7 +1122,7 @@ class BookImportBatch:
         error_message: str = ''
     ) -> None:
         """
-        エラーログをDBに記録
+        エラーログをバッファに積む（実行の最後に_flush_errorsでまとめて書き込む）
         
         Args:
             application_number: 申請番号
@@ -248,27 +1130,71 @@ class BookImportBatch:
             error_type: エラー種別
             error_message: エラーメッセージ
         """
+        if self.dry_run:
+            self.projected_error_logs += 1
+            return
+        
+        self.error_log.add(application_number, isbn, error_type, error_message)
+        logger.info(f"Error log recorded: {error_type}")
+    
+    def _flush_errors(self) -> None:
+        """バッファ内のエラーログを一括で書き込む（同じエラーは発生回数を加算）"""
+        if not self.error_log:
+            return
+        
         try:
-            ErrorLog.objects.create(
-                application_number=application_number,
-                isbn=isbn,
-                error_type=error_type,
-                error_message=error_message
-            )
-            logger.info(f"Error log recorded: {error_type}")
+            with self.timer.stage('db_write'):
+                self.error_log.flush()
         except Exception as e:
-            logger.error(f"Failed to record error log: {str(e)}")
+            logger.error(f"Failed to record error logs: {str(e)}")
 
 
 class Command(BaseCommand):
     help = 'Import approved book applications from Google Sheets'
     
+    # --wait指定時にロックの取得を再試行する間隔（秒）
+    LOCK_POLL_SECONDS = 5
+    
     def add_arguments(self, parser):
         """コマンドライン引数の追加"""
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Dry run mode (no DB updates)',
+            help='Read the sheet and look up book info, but skip all DB and sheet writes',
+        )
+        parser.add_argument(
+            '--profile',
+            action='store_true',
+            help='Run under cProfile and tracemalloc and write <prefix>.prof and <prefix>.txt',
+        )
+        parser.add_argument(
+            '--profile-output',
+            default=None,
+            help='Output path prefix for --profile (default: import_profile_YYYYmmdd_HHMMSS)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of concurrent Google Books API lookups (default: settings.IMPORT_WORKERS)',
+        )
+        parser.add_argument(
+            '--flush-every',
+            type=int,
+            default=None,
+            help='Write imported flags back to the sheet every N rows (default: settings.IMPORT_FLAG_FLUSH_SIZE)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Number of rows processed per DB transaction (default: settings.IMPORT_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--wait',
+            type=float,
+            default=0,
+            help='Seconds to wait for another running import of the same spreadsheet to finish (default: 0, skip immediately)',
         )
     
     def handle(self, *args, **options):
@@ -278,13 +1204,30 @@ class Command(BaseCommand):
         # dry-runモードの場合は警告
         if options['dry_run']:
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
-            self.stdout.write(self.style.ERROR('Dry run mode not implemented yet'))
-            return
+        
+        batch = BookImportBatch(
+            workers=options['workers'],
+            flush_every=options['flush_every'],
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        
+        # 同じスプレッドシートの取り込み（前回のcron実行・常駐ワーカー）と重ならないようロックを取得
+        # （dry-runは書き込みを行わないためロックしない）
+        lock = None
+        if not options['dry_run']:
+            lock = DatabaseLock.for_spreadsheet(settings.GOOGLE_SHEETS_SPREADSHEET_ID)
+            if not self._acquire_lock(lock, batch, options['wait']):
+                return
+            lock.start_heartbeat()
         
         # バッチ処理実行
         try:
-            batch = BookImportBatch()
-            success, error, skip = batch.process()
+            if options['profile']:
+                prefix = options['profile_output'] or f"import_profile_{timezone.localtime():%Y%m%d_%H%M%S}"
+                success, error, skip = self._run_profiled(batch, prefix)
+            else:
+                success, error, skip = batch.process()
             
             # 結果表示
             self.stdout.write('')
@@ -302,6 +1245,28 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(self.style.SUCCESS(f'Skip: {skip}'))
             
+            self.stdout.write(f'Deferred (waiting for retry): {batch.deferred_count}')
+            self.stdout.write(f'Updated (edited after import): {batch.updated_count}')
+            self.stdout.write(
+                f'Lookups: {batch.lookup_unique_count} unique ISBNs / {batch.lookup_total_count} rows '
+                f'({batch.api_call_count} API calls)'
+            )
+            self.stdout.write(
+                'Stage timings: ' + ', '.join(f'{name}={seconds:.2f}s' for name, seconds in batch.timer.timings.items())
+            )
+            
+            if batch.dry_run:
+                sheets_reads = batch.sheets_client.request_count - batch.sheets_request_base if batch.sheets_client else 0
+                self.stdout.write(self.style.WARNING(
+                    f'Projected API calls: {sheets_reads} Sheets reads, '
+                    f'{batch.projected_sheets_writes} Sheets writes ({batch.projected_flag_rows} flag rows), '
+                    f'{batch.api_call_count} Books lookups'
+                ))
+                self.stdout.write(self.style.WARNING(
+                    f'Projected writes: {success} books created, {batch.updated_count} books updated, '
+                    f'{batch.projected_error_logs} error logs'
+                ))
+            
             self.stdout.write(self.style.SUCCESS('=' * 50))
             
             # エラーがある場合は終了コード1
@@ -313,3 +1278,68 @@ class Command(BaseCommand):
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Batch failed: {str(e)}'))
             raise
+        finally:
+            if lock:
+                lock.release()
+    
+    def _acquire_lock(self, lock: DatabaseLock, batch: BookImportBatch, wait: float) -> bool:
+        """
+        取り込みロックを取得（他の実行が保持している場合はwait秒まで待つ）
+        
+        取得できなかった場合はスキップとして実行履歴に記録する。
+        
+        Args:
+            lock: 取り込みロック
+            batch: 実行するバッチ（実行履歴のシート名に使う）
+            wait: 待機する最大秒数
+        
+        Returns:
+            取得できた場合True
+        """
+        started_at = timezone.now()
+        deadline = time.monotonic() + max(0.0, wait)
+        while not lock.acquire():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.stdout.write(self.style.WARNING(
+                    f'Another import run holds {lock.name}, skipping this run'
+                ))
+                batch.record_skipped(started_at)
+                return False
+            logger.info(f"Import lock {lock.name} is held by another run, waiting")
+            time.sleep(min(self.LOCK_POLL_SECONDS, remaining))
+        return True
+    
+    def _run_profiled(self, batch: BookImportBatch, prefix: str) -> Tuple[int, int, int]:
+        """
+        バッチをcProfile・tracemallocで計測しながら実行
+        
+        <prefix>.prof にpstats形式の統計（python -m pstats で並べ替えて参照可能）、
+        <prefix>.txt に段階ごとの処理時間・確保メモリのピークと累積時間上位の関数を出力する。
+        cProfileはメインスレッドのみ計測するため、書籍情報取得スレッドの時間は lookup_wait に現れる。
+        
+        Args:
+            batch: 実行するバッチ
+            prefix: 出力ファイルのパス（拡張子なし）
+        
+        Returns:
+            (成功件数, エラー件数, スキップ件数)
+        """
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        try:
+            result = profiler.runcall(batch.process)
+        finally:
+            tracemalloc.stop()
+        
+        profiler.dump_stats(f'{prefix}.prof')
+        with open(f'{prefix}.txt', 'w', encoding='utf-8') as report:
+            report.write(f"{'stage':<16}{'seconds':>12}{'peak MiB':>12}\n")
+            for name, seconds in sorted(batch.timer.timings.items(), key=lambda item: item[1], reverse=True):
+                peak = batch.timer.peak_memory.get(name, 0) / (1024 * 1024)
+                report.write(f"{name:<16}{seconds:>12.3f}{peak:>12.1f}\n")
+            report.write(f"{'total':<16}{batch.timer.elapsed():>12.3f}\n\n")
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+        
+        self.stdout.write(f'Profile written to {prefix}.prof and {prefix}.txt')
+        return result
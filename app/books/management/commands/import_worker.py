@@ -0,0 +1,178 @@
+"""
+書籍取り込みワーカー（常駐）Django管理コマンド
+
+import_from_sheetsを短い間隔で繰り返し実行する常駐プロセス。
+Django・APIクライアントの初期化と認証、DB接続を実行をまたいで再利用する。
+スプレッドシートごとのロック（import_locksテーブル）を保持したワーカーのみが取り込みを行い、
+他のワーカーは待機してロックが期限切れになったら引き継ぐ。
+
+シャード行数（--shard-rows または IMPORT_SHARD_ROWS）を指定した場合は、シートを行範囲の
+シャード（import_shardsテーブル）に分割し、複数のワーカーがそれぞれシャードをリースして並行して取り込む。
+シャードのリース中はワーカー共通の所有者で同じロックを保持するため、cronのimport_from_sheetsとは同時に実行されない。
+
+Usage:
+    python manage.py import_worker
+    python manage.py import_worker --interval 30 --jitter 5  # 30〜35秒ごとに実行
+    python manage.py import_worker --max-runs 1  # 1回実行して終了
+    python manage.py import_worker --shard-rows 1000  # 1000行ずつのシャードを他のワーカーと分担
+"""
+
+import random
+import signal
+import logging
+import threading
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from books.utils.google_sheets_client import GoogleSheetsClient
+from books.utils.import_lock import DatabaseLock
+from books.utils.import_shards import ImportShardQueue
+from .import_from_sheets import BookImportBatch
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run the book import batch continuously as a long-running worker'
+    
+    def add_arguments(self, parser):
+        """コマンドライン引数の追加"""
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Seconds between runs (default: settings.IMPORT_WORKER_INTERVAL_SECONDS)',
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=None,
+            help='Maximum random seconds added to each interval (default: settings.IMPORT_WORKER_JITTER_SECONDS)',
+        )
+        parser.add_argument(
+            '--max-runs',
+            type=int,
+            default=None,
+            help='Exit after N import runs (default: run until SIGTERM)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Number of concurrent Google Books API lookups (default: settings.IMPORT_WORKERS)',
+        )
+        parser.add_argument(
+            '--shard-rows',
+            type=int,
+            default=None,
+            help='Split the sheet into leased row-range shards of N rows shared by all workers '
+                 '(default: settings.IMPORT_SHARD_ROWS, 0 disables sharding)',
+        )
+    
+    def handle(self, *args, **options):
+        """コマンド実行"""
+        interval = options['interval'] if options['interval'] is not None else getattr(settings, 'IMPORT_WORKER_INTERVAL_SECONDS', 60)
+        jitter = options['jitter'] if options['jitter'] is not None else getattr(settings, 'IMPORT_WORKER_JITTER_SECONDS', 10)
+        max_runs = options['max_runs']
+        shard_rows = options['shard_rows'] if options['shard_rows'] is not None else getattr(settings, 'IMPORT_SHARD_ROWS', 0)
+        
+        self.stop_event = threading.Event()
+        previous_handlers = {
+            signum: signal.signal(signum, self._request_stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        
+        # 認証済みのクライアントを実行をまたいで再利用する
+        sheets_client = GoogleSheetsClient()
+        if shard_rows > 0:
+            lock = ImportShardQueue(shard_rows=shard_rows, spreadsheet_id=sheets_client.spreadsheet_id)
+        else:
+            lock = DatabaseLock.for_spreadsheet(sheets_client.spreadsheet_id)
+        # 取り込み中もロック（シャードのリース）の有効期限を延長し続ける
+        lock.start_heartbeat()
+        
+        mode = f'shards of {shard_rows} rows' if shard_rows > 0 else 'single lock'
+        self.stdout.write(self.style.SUCCESS(f'Import worker started (interval: {interval}s, jitter: {jitter}s, {mode})'))
+        runs = 0
+        try:
+            while not self.stop_event.is_set():
+                # 期限切れ・切断済みのDB接続を破棄（CONN_MAX_AGE内の接続は再利用）
+                close_old_connections()
+                
+                if isinstance(lock, ImportShardQueue):
+                    runs = self._run_shards(lock, sheets_client, options['workers'], interval, runs, max_runs)
+                elif lock.acquire():
+                    batch = BookImportBatch(workers=options['workers'], sheets_client=sheets_client)
+                    success, error, skip = batch.process()
+                    runs += 1
+                    self.stdout.write(
+                        f'Run #{runs}: success {success}, error {error}, skip {skip}, '
+                        f'updated {batch.updated_count}, deferred {batch.deferred_count}'
+                    )
+                else:
+                    logger.info(f"Import lock {lock.name} is held by another worker, standing by")
+                
+                close_old_connections()
+                if max_runs is not None and runs >= max_runs:
+                    break
+                self.stop_event.wait(interval + random.uniform(0, jitter))
+        finally:
+            lock.stop_heartbeat()
+            lock.release()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            self.stdout.write(self.style.SUCCESS('Import worker stopped'))
+    
+    def _request_stop(self, signum, frame):
+        """SIGTERM/SIGINT受信時は実行中の取り込みを最後まで処理してから終了する"""
+        logger.info(f"Received signal {signum}, stopping after the current run")
+        self.stop_event.set()
+    
+    def _run_shards(
+        self,
+        queue: ImportShardQueue,
+        sheets_client: GoogleSheetsClient,
+        workers: Optional[int],
+        interval: float,
+        runs: int,
+        max_runs: Optional[int]
+    ) -> int:
+        """
+        シートの行数までシャードを作成し、処理可能なシャードがなくなるまで1つずつリースして取り込む
+        
+        Args:
+            queue: シャードのキュー
+            sheets_client: 認証済みのGoogle Sheetsクライアント
+            workers: Google Books APIへの並列問い合わせ数
+            interval: 処理したシャードを次に処理できるようになるまでの秒数
+            runs: これまでの実行回数
+            max_runs: 実行回数の上限（Noneは無制限）
+        
+        Returns:
+            これまでの実行回数
+        """
+        try:
+            queue.plan(sheets_client.get_row_count(queue.sheet_name))
+        except Exception as e:
+            # 行数を取得できない場合は作成済みのシャードのみ処理する
+            logger.error(f"Failed to plan import shards: {str(e)}")
+        
+        while not self.stop_event.is_set() and (max_runs is None or runs < max_runs):
+            shard = queue.claim()
+            if shard is None:
+                logger.info(f"No import shards of {queue.sheet_name} can be leased, standing by")
+                break
+            
+            batch = BookImportBatch(workers=workers, sheets_client=sheets_client, shard=shard)
+            success, error, skip = batch.process()
+            queue.release(available_at=timezone.now() + timedelta(seconds=interval))
+            runs += 1
+            self.stdout.write(
+                f'Run #{runs} (rows {shard.start_row}-{shard.end_row}): success {success}, error {error}, '
+                f'skip {skip}, updated {batch.updated_count}, deferred {batch.deferred_count}'
+            )
+            close_old_connections()
+        return runs
@@ -0,0 +1,63 @@
+"""
+古いエラーログの削除コマンド
+
+最終発生日時が保存期間（settings.ERROR_LOG_RETENTION_DAYS）より古いエラーログを削除する。
+大量の行を1回のDELETEで消すとテーブルを長時間ロックするため、主キーを指定して一定件数ずつ削除する。
+
+Usage:
+    python manage.py purge_error_logs
+    python manage.py purge_error_logs --days 30 --chunk-size 500
+    python manage.py purge_error_logs --dry-run  # 削除対象の件数のみ表示
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from books.models import ErrorLog
+
+
+class Command(BaseCommand):
+    help = 'Delete error logs last seen before the retention period, in chunks'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Delete error logs last seen more than N days ago (default: settings.ERROR_LOG_RETENTION_DAYS)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of rows deleted per query',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be deleted',
+        )
+    
+    def handle(self, *args, **options):
+        """コマンド実行"""
+        days = options['days']
+        if days is None:
+            days = getattr(settings, 'ERROR_LOG_RETENTION_DAYS', 90)
+        chunk_size = max(1, options['chunk_size'])
+        cutoff = timezone.now() - timedelta(days=days)
+        expired = ErrorLog.objects.filter(last_seen_at__lt=cutoff)
+        
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} error logs last seen before {cutoff:%Y-%m-%d %H:%M} would be deleted')
+            return
+        
+        deleted = 0
+        while True:
+            pks = list(expired.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            count, _ = ErrorLog.objects.filter(pk__in=pks).delete()
+            deleted += count
+        
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} error logs last seen before {cutoff:%Y-%m-%d %H:%M}'))
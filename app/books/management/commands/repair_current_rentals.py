@@ -0,0 +1,102 @@
+"""
+書籍の現在の貸出の再計算コマンド
+
+書籍に保持している現在の貸出（current_rental・current_borrower_name・current_due_date）を
+未返却の貸出履歴から一括で再計算し、ずれている書籍だけを更新する。
+通常は貸出履歴の保存・削除時に更新されるが、クエリセットのupdateやSQLで貸出履歴を直接変更した場合に実行する。
+書籍を主キー順に一定件数ずつロックして処理するため、実行中も貸出・返却の登録は止まらない。
+
+Usage:
+    python manage.py repair_current_rentals
+    python manage.py repair_current_rentals --chunk-size 500
+    python manage.py repair_current_rentals --dry-run  # ずれている書籍の件数のみ表示
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from books.models import Book, RentalHistory
+
+FIELDS = ['current_rental', 'current_borrower_name', 'current_due_date']
+
+
+class Command(BaseCommand):
+    help = 'Recompute the current rental cached on each book from open rental history rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of books locked and recomputed per transaction',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many books are out of sync',
+        )
+    
+    def handle(self, *args, **options):
+        """コマンド実行"""
+        chunk_size = max(1, options['chunk_size'])
+        dry_run = options['dry_run']
+        
+        checked = repaired = 0
+        last_pk = 0
+        while True:
+            count, stale, last_pk = self._repair_chunk(last_pk, chunk_size, dry_run)
+            if not count:
+                break
+            checked += count
+            repaired += stale
+        
+        if dry_run:
+            self.stdout.write(f'Checked {checked} books, {repaired} would be repaired')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Checked {checked} books, repaired {repaired}'))
+    
+    def _repair_chunk(self, last_pk, chunk_size, dry_run):
+        """
+        主キーがlast_pkより大きい書籍をchunk_size件再計算
+        
+        Args:
+            last_pk: 前回処理した最後の書籍ID
+            chunk_size: 処理する書籍の件数
+            dry_run: Trueの場合は更新しない
+        
+        Returns:
+            (処理した書籍数, ずれていた書籍数, 最後の書籍ID)
+        """
+        with transaction.atomic():
+            books = Book.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', *FIELDS)
+            if not dry_run:
+                books = books.select_for_update()
+            books = list(books[:chunk_size])
+            if not books:
+                return 0, 0, last_pk
+            
+            # 貸出日の古い順に読み、書籍ごとに最後（最も新しい）の未返却の貸出履歴を残す
+            current = {}
+            open_rentals = RentalHistory.objects.filter(
+                book_id__in=[book.pk for book in books],
+                actual_return_date__isnull=True,
+            ).order_by('rental_date', 'pk')
+            for rental in open_rentals:
+                current[rental.book_id] = rental
+            
+            stale = []
+            for book in books:
+                values = Book.current_rental_values(current.get(book.pk))
+                rental = values['current_rental']
+                if (
+                    book.current_rental_id != (rental.pk if rental else None)
+                    or book.current_borrower_name != values['current_borrower_name']
+                    or book.current_due_date != values['current_due_date']
+                ):
+                    for name, value in values.items():
+                        setattr(book, name, value)
+                    stale.append(book)
+            
+            if stale and not dry_run:
+                Book.objects.bulk_update(stale, FIELDS)
+        
+        return len(books), len(stale), books[-1].pk
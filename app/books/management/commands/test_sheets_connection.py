@@ -5,6 +5,7 @@ Usage:
     python manage.py test_sheets_connection
 """
 
+import itertools
 from django.core.management.base import BaseCommand
 from books.utils.google_sheets_client import GoogleSheetsClient
 from django.conf import settings
@@ -52,29 +53,26 @@ class Command(BaseCommand):
             # データ取得テスト
             self.stdout.write('')
             self.stdout.write(self.style.WARNING('【データ取得テスト】'))
-            rows = client.get_all_rows(sheet_name='Sheet1', start_row=2)
+            # 先頭のページのみ取得し、サンプル表示用に最大5行を取り出す
+            rows = list(itertools.islice(client.iter_rows(sheet_name='Sheet1', start_row=2), 5))
             
-            self.stdout.write(f'✓ データ取得成功: {len(rows)}行')
+            self.stdout.write(f'✓ データ取得成功: {len(rows)}行（先頭から最大5行）')
             self.stdout.write('')
             
             # データの一部を表示
             if rows:
                 self.stdout.write(self.style.WARNING('【取得データサンプル（最大5行）】'))
-                for idx, row in enumerate(rows[:5], start=2):
-                    # 行の長さを9列に調整
-                    if len(row) < 9:
-                        row.extend([''] * (9 - len(row)))
-                    
-                    self.stdout.write(f'行{idx}:')
-                    self.stdout.write(f'  申請番号: {row[0]}')
-                    self.stdout.write(f'  申請者名: {row[1]}')
-                    self.stdout.write(f'  承認者名: {row[2]}')
-                    self.stdout.write(f'  申請日: {row[3]}')
-                    self.stdout.write(f'  承認日: {row[4]}')
-                    self.stdout.write(f'  書籍名: {row[5]}')
-                    self.stdout.write(f'  ISBNコード: {row[6]}')
-                    self.stdout.write(f'  価格: {row[7]}')
-                    self.stdout.write(f'  DB取り込み済み: {row[8]}')
+                for row in rows:
+                    self.stdout.write(f'行{row.row_index}:')
+                    self.stdout.write(f'  申請番号: {row.application_number}')
+                    self.stdout.write(f'  申請者名: {row.applicant_name}')
+                    self.stdout.write(f'  承認者名: {row.approver_name}')
+                    self.stdout.write(f'  申請日: {row.application_date}')
+                    self.stdout.write(f'  承認日: {row.approval_date}')
+                    self.stdout.write(f'  書籍名: {row.book_name}')
+                    self.stdout.write(f'  ISBNコード: {row.isbn}')
+                    self.stdout.write(f'  価格: {row.price}')
+                    self.stdout.write(f'  DB取り込み済み: {row.db_imported}')
                     self.stdout.write('')
             else:
                 self.stdout.write(self.style.WARNING('データが空です'))
@@ -88,12 +86,12 @@ class Command(BaseCommand):
                 self.stdout.write('')
                 self.stdout.write('【取り込み対象データサンプル（最大3行）】')
                 for row in pending_rows[:3]:
-                    self.stdout.write(f'行{row["row_index"]}:')
-                    self.stdout.write(f'  申請番号: {row["application_number"]}')
-                    self.stdout.write(f'  申請者名: {row["applicant_name"]}')
-                    self.stdout.write(f'  承認者名: {row["approver_name"]}')
-                    self.stdout.write(f'  書籍名: {row["book_name"]}')
-                    self.stdout.write(f'  ISBNコード: {row["isbn"]}')
+                    self.stdout.write(f'行{row.row_index}:')
+                    self.stdout.write(f'  申請番号: {row.application_number}')
+                    self.stdout.write(f'  申請者名: {row.applicant_name}')
+                    self.stdout.write(f'  承認者名: {row.approver_name}')
+                    self.stdout.write(f'  書籍名: {row.book_name}')
+                    self.stdout.write(f'  ISBNコード: {row.isbn}')
                     self.stdout.write('')
             
             # 成功メッセージ
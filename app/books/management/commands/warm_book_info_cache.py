@@ -0,0 +1,65 @@
+"""
+ISBN書籍情報キャッシュのウォームアップコマンド
+
+登録済みの書籍（Book）の書籍情報からキャッシュを作成する（Google Books APIは呼ばない）
+
+Usage:
+    python manage.py warm_book_info_cache
+    python manage.py warm_book_info_cache --force  # 有効期限内のキャッシュも上書き
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from books.models import Book, BookInfoCache
+from books.utils.google_books_client import GoogleBooksClient
+from books.utils.book_info_cache import CachedBookInfoClient
+
+
+class Command(BaseCommand):
+    help = 'Warm the ISBN book info cache from existing Book rows'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Overwrite cache entries that are still fresh',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of cache entries written per query',
+        )
+    
+    def handle(self, *args, **options):
+        """コマンド実行"""
+        cache = CachedBookInfoClient()
+        batch_size = max(1, options['batch_size'])
+        # 実行中にAPIから取得・保存されたエントリはこの日時より後のため上書きしない
+        started_at = timezone.now()
+        
+        # 書籍名が登録されている書籍のみ対象（正規化したISBNごとに最後に更新された書籍の内容を採用）
+        books = (
+            Book.objects.exclude(title__isnull=True).exclude(title='')
+            .order_by('-updated_at', '-pk')
+            .values('isbn', *BookInfoCache.BOOK_INFO_FIELDS)
+        )
+        
+        results = {}
+        for book in books.iterator(chunk_size=batch_size):
+            isbn = GoogleBooksClient.normalize_isbn(book['isbn'] or '')
+            if isbn and isbn not in results:
+                results[isbn] = {field: book[field] or '' for field in BookInfoCache.BOOK_INFO_FIELDS}
+        
+        if not options['force']:
+            fresh = set()
+            isbns = list(results)
+            for i in range(0, len(isbns), batch_size):
+                fresh.update(cache.get_cached(isbns[i:i + batch_size]))
+            results = {isbn: info for isbn, info in results.items() if isbn not in fresh}
+        
+        items = list(results.items())
+        for i in range(0, len(items), batch_size):
+            cache.store(dict(items[i:i + batch_size]), fetched_at=started_at)
+        
+        self.stdout.write(self.style.SUCCESS(f'Warmed {len(items)} book info cache entries'))
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.9 on 2026-10-18 05:52
+
+import logging
+from django.db import migrations, models
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+def merge_duplicate_books(apps, schema_editor):
+    """
+    同じ申請番号の書籍を1件に統合する（ユニーク制約の追加前）
+
+    最も古い書籍（主キーが最小のもの）を残し、残りの書籍の貸出履歴を付け替えてから削除する。
+    統合した申請番号と削除した書籍IDはログに出力する。
+    """
+    Book = apps.get_model('books', 'Book')
+    RentalHistory = apps.get_model('books', 'RentalHistory')
+    duplicated = (
+        Book.objects.values('application_number')
+        .annotate(count=Count('pk'))
+        .filter(count__gt=1)
+        .values_list('application_number', flat=True)
+    )
+    for application_number in list(duplicated):
+        pks = list(Book.objects.filter(application_number=application_number).order_by('pk').values_list('pk', flat=True))
+        survivor, duplicates = pks[0], pks[1:]
+        RentalHistory.objects.filter(book_id__in=duplicates).update(book_id=survivor)
+        Book.objects.filter(pk__in=duplicates).delete()
+        logger.warning(
+            f"Merged duplicate books for application #{application_number}: kept {survivor}, deleted {duplicates}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_alter_book_isbn_alter_errorlog_isbn'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_books, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='book',
+            constraint=models.UniqueConstraint(fields=('application_number',), name='uniq_application_number'),
+        ),
+        # ユニーク制約のインデックスで検索できるため、通常のインデックスは削除する
+        migrations.RemoveIndex(
+            model_name='book',
+            name='idx_application_number',
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.9 on 2026-10-18 05:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_uniq_application_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookInfoCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('isbn', models.CharField(max_length=20, unique=True, verbose_name='ISBNコード')),
+                ('is_found', models.BooleanField(default=True, verbose_name='書籍情報あり')),
+                ('title', models.CharField(blank=True, max_length=255, null=True, verbose_name='書籍名')),
+                ('author', models.CharField(blank=True, max_length=255, null=True, verbose_name='著者')),
+                ('publisher', models.CharField(blank=True, max_length=255, null=True, verbose_name='出版社')),
+                ('published_date', models.CharField(blank=True, max_length=50, null=True, verbose_name='出版日')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='書籍概要')),
+                ('thumbnail_url', models.CharField(blank=True, max_length=512, null=True, verbose_name='書影URL')),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='取得日時')),
+            ],
+            options={
+                'verbose_name': 'ISBN書籍情報キャッシュ',
+                'verbose_name_plural': 'ISBN書籍情報キャッシュ',
+                'db_table': 'book_info_cache',
+                'indexes': [models.Index(fields=['fetched_at'], name='idx_cache_fetched_at')],
+            },
+        ),
+    ]
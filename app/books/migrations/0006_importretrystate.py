@@ -0,0 +1,36 @@
+# Generated by Django 5.0.9 on 2026-10-18 05:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_bookinfocache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRetryState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('application_number', models.CharField(max_length=50, unique=True, verbose_name='申請番号')),
+                ('row_index', models.PositiveIntegerField(verbose_name='行番号')),
+                ('isbn', models.CharField(blank=True, max_length=20, verbose_name='ISBNコード')),
+                ('attempt_count', models.PositiveIntegerField(default=0, verbose_name='試行回数')),
+                ('last_error_type', models.CharField(max_length=50, verbose_name='最終エラー種別')),
+                ('next_attempt_at', models.DateTimeField(verbose_name='次回試行日時')),
+                ('is_parked', models.BooleanField(default=False, verbose_name='保留中')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '取り込み再試行状態',
+                'verbose_name_plural': '取り込み再試行状態',
+                'db_table': 'import_retry_states',
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['next_attempt_at'], name='idx_retry_next_attempt_at')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_importretrystate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SheetRowFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet_name', models.CharField(max_length=100, verbose_name='シート名')),
+                ('application_number', models.CharField(max_length=50, verbose_name='申請番号')),
+                ('row_index', models.PositiveIntegerField(verbose_name='行番号')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='内容ハッシュ')),
+                ('synced_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='同期日時')),
+            ],
+            options={
+                'verbose_name': 'シート行フィンガープリント',
+                'verbose_name_plural': 'シート行フィンガープリント',
+                'db_table': 'sheet_row_fingerprints',
+            },
+        ),
+        migrations.CreateModel(
+            name='SheetSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet_name', models.CharField(max_length=100, unique=True, verbose_name='シート名')),
+                ('high_water_row', models.PositiveIntegerField(default=0, verbose_name='処理済み最終行')),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True, verbose_name='最終同期日時')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': 'シート同期状態',
+                'verbose_name_plural': 'シート同期状態',
+                'db_table': 'sheet_sync_states',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='sheetrowfingerprint',
+            constraint=models.UniqueConstraint(fields=('sheet_name', 'application_number'), name='uniq_sheet_application_number'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_sheet_sync_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True, verbose_name='ロック名')),
+                ('owner', models.CharField(max_length=150, verbose_name='所有者')),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='取得日時')),
+                ('heartbeat_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='最終更新日時')),
+                ('expires_at', models.DateTimeField(verbose_name='有効期限')),
+            ],
+            options={
+                'verbose_name': '取り込みロック',
+                'verbose_name_plural': '取り込みロック',
+                'db_table': 'import_locks',
+            },
+        ),
+    ]
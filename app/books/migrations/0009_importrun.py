@@ -0,0 +1,46 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_importlock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet_name', models.CharField(max_length=100, verbose_name='シート名')),
+                ('status', models.CharField(choices=[('success', '成功'), ('error', 'エラーあり'), ('failed', '失敗')], max_length=10, verbose_name='結果')),
+                ('started_at', models.DateTimeField(verbose_name='開始日時')),
+                ('finished_at', models.DateTimeField(verbose_name='終了日時')),
+                ('duration_seconds', models.FloatField(verbose_name='処理時間（秒）')),
+                ('stage_timings', models.JSONField(default=dict, verbose_name='段階別処理時間（秒）')),
+                ('sheets_api_calls', models.PositiveIntegerField(default=0, verbose_name='Sheets API呼び出し数')),
+                ('books_api_calls', models.PositiveIntegerField(default=0, verbose_name='Books API呼び出し数')),
+                ('lookup_p50_ms', models.FloatField(blank=True, null=True, verbose_name='書籍情報取得p50（ms）')),
+                ('lookup_p95_ms', models.FloatField(blank=True, null=True, verbose_name='書籍情報取得p95（ms）')),
+                ('scanned_rows', models.PositiveIntegerField(default=0, verbose_name='走査行数')),
+                ('pending_rows', models.PositiveIntegerField(default=0, verbose_name='取り込み対象行数')),
+                ('changed_rows', models.PositiveIntegerField(default=0, verbose_name='編集行数')),
+                ('lookup_rows', models.PositiveIntegerField(default=0, verbose_name='書籍情報取得行数')),
+                ('lookup_unique_isbns', models.PositiveIntegerField(default=0, verbose_name='ユニークISBN数')),
+                ('success_count', models.PositiveIntegerField(default=0, verbose_name='成功件数')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='エラー件数')),
+                ('skip_count', models.PositiveIntegerField(default=0, verbose_name='スキップ件数')),
+                ('deferred_count', models.PositiveIntegerField(default=0, verbose_name='再試行待ち件数')),
+                ('updated_count', models.PositiveIntegerField(default=0, verbose_name='編集反映件数')),
+            ],
+            options={
+                'verbose_name': '取り込み実行履歴',
+                'verbose_name_plural': '取り込み実行履歴',
+                'db_table': 'import_runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['started_at'], name='idx_import_run_started_at')],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:40
+
+import hashlib
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def merge_duplicate_error_logs(apps, schema_editor):
+    """
+    既存のエラーログを(申請番号, ISBN, エラー種別)ごとに1行へ統合する
+
+    最も古い行を残し、発生回数・最終発生日時・最後のエラーメッセージを集約して、残りの行を削除する。
+    """
+    ErrorLog = apps.get_model('books', 'ErrorLog')
+    survivors = {}  # 重複判定キー → 残す行
+    duplicate_ids = []
+
+    for log in ErrorLog.objects.order_by('created_at', 'pk').iterator(chunk_size=2000):
+        value = '\x1f'.join([log.application_number or '', log.isbn or '', log.error_type])
+        key = hashlib.sha256(value.encode('utf-8')).hexdigest()
+        survivor = survivors.get(key)
+        if survivor is None:
+            log.dedupe_key = key
+            log.occurrence_count = 1
+            log.last_seen_at = log.created_at
+            survivors[key] = log
+        else:
+            survivor.occurrence_count += 1
+            survivor.last_seen_at = log.created_at
+            survivor.error_message = log.error_message
+            duplicate_ids.append(log.pk)
+
+    ErrorLog.objects.bulk_update(
+        list(survivors.values()),
+        ['dedupe_key', 'occurrence_count', 'last_seen_at', 'error_message'],
+        batch_size=1000
+    )
+    for i in range(0, len(duplicate_ids), 1000):
+        ErrorLog.objects.filter(pk__in=duplicate_ids[i:i + 1000]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_importrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='errorlog',
+            name='dedupe_key',
+            field=models.CharField(editable=False, max_length=64, null=True, verbose_name='重複判定キー'),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='occurrence_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='発生回数'),
+        ),
+        migrations.AddField(
+            model_name='errorlog',
+            name='last_seen_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='最終発生日時'),
+        ),
+        migrations.RunPython(merge_duplicate_error_logs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='errorlog',
+            name='dedupe_key',
+            field=models.CharField(editable=False, max_length=64, unique=True, verbose_name='重複判定キー'),
+        ),
+        migrations.AlterField(
+            model_name='errorlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='初回発生日時'),
+        ),
+        migrations.AlterModelOptions(
+            name='errorlog',
+            options={'ordering': ['-last_seen_at'], 'verbose_name': 'エラーログ', 'verbose_name_plural': 'エラーログ'},
+        ),
+        migrations.AddIndex(
+            model_name='errorlog',
+            index=models.Index(fields=['last_seen_at'], name='idx_error_last_seen_at'),
+        ),
+    ]
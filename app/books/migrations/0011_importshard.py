@@ -0,0 +1,43 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0010_errorlog_dedupe'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sheet_name', models.CharField(max_length=100, verbose_name='シート名')),
+                ('start_row', models.PositiveIntegerField(verbose_name='開始行')),
+                ('end_row', models.PositiveIntegerField(verbose_name='終了行')),
+                ('owner', models.CharField(blank=True, default='', max_length=150, verbose_name='リース所有者')),
+                ('leased_at', models.DateTimeField(blank=True, null=True, verbose_name='リース取得日時')),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True, verbose_name='リース有効期限')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='次回処理可能日時')),
+                ('high_water_row', models.PositiveIntegerField(default=0, verbose_name='処理済み最終行')),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True, verbose_name='最終同期日時')),
+                ('run_count', models.PositiveIntegerField(default=0, verbose_name='処理回数')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='作成日時')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '取り込みシャード',
+                'verbose_name_plural': '取り込みシャード',
+                'db_table': 'import_shards',
+                'ordering': ['sheet_name', 'start_row'],
+                'indexes': [models.Index(fields=['sheet_name', 'available_at'], name='idx_shard_available_at')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='importshard',
+            constraint=models.UniqueConstraint(fields=('sheet_name', 'start_row'), name='uniq_shard_sheet_start_row'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_importshard'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importrun',
+            name='status',
+            field=models.CharField(choices=[('success', '成功'), ('error', 'エラーあり'), ('failed', '失敗'), ('skipped', 'スキップ（実行中の取り込みあり）')], max_length=10, verbose_name='結果'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_current_rentals(apps, schema_editor):
+    """
+    未返却の貸出履歴から書籍の現在の貸出を設定する
+
+    未返却の貸出履歴が複数ある書籍は貸出日が最も新しいものを現在の貸出とする。
+    """
+    Book = apps.get_model('books', 'Book')
+    RentalHistory = apps.get_model('books', 'RentalHistory')
+    current = {}  # 書籍ID → 現在の貸出
+
+    open_rentals = RentalHistory.objects.filter(actual_return_date__isnull=True).order_by('rental_date', 'pk')
+    for rental in open_rentals.iterator(chunk_size=2000):
+        current[rental.book_id] = rental
+
+    books = []
+    for book_id, rental in current.items():
+        books.append(Book(
+            pk=book_id,
+            current_rental=rental,
+            current_borrower_name=rental.borrower_name,
+            current_due_date=rental.expected_return_date,
+        ))
+    Book.objects.bulk_update(books, ['current_rental', 'current_borrower_name', 'current_due_date'], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_importrun_skipped'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='current_borrower_name',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, verbose_name='現在の貸出人名'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='current_due_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='現在の返却予定日'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='current_rental',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='books.rentalhistory', verbose_name='現在の貸出'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['current_borrower_name'], name='idx_current_borrower_name'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['current_due_date'], name='idx_current_due_date'),
+        ),
+        migrations.AddIndex(
+            model_name='rentalhistory',
+            index=models.Index(fields=['book', 'actual_return_date'], name='idx_rental_book_returned'),
+        ),
+        migrations.RunPython(backfill_current_rentals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:37
+
+import unicodedata
+from django.db import migrations, models
+
+SEARCH_KEY_FIELDS = ['title', 'author', 'publisher', 'isbn', 'application_number', 'applicant_name', 'approver_name']
+KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+
+def normalize(value):
+    text = unicodedata.normalize('NFKC', value or '').lower().translate(KATAKANA_TO_HIRAGANA)
+    return ' '.join(text.split())
+
+
+def backfill_search_keys(apps, schema_editor):
+    """既存の書籍の検索キーを作成する（books.utils.search_textと同じ正規化）"""
+    Book = apps.get_model('books', 'Book')
+    books = []
+    for book in Book.objects.only('pk', *SEARCH_KEY_FIELDS).iterator(chunk_size=2000):
+        values = [getattr(book, name) for name in SEARCH_KEY_FIELDS]
+        values[SEARCH_KEY_FIELDS.index('isbn')] = (book.isbn or '').replace('-', '')
+        book.search_key = ' '.join(filter(None, (normalize(value) for value in values)))
+        books.append(book)
+        if len(books) >= 1000:
+            Book.objects.bulk_update(books, ['search_key'])
+            books = []
+    Book.objects.bulk_update(books, ['search_key'])
+
+
+def create_fulltext_index(apps, schema_editor):
+    """MySQLのみ検索キーにngramパーサーのFULLTEXTインデックスを作成する（Djangoのモデル定義では表現できない）"""
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('CREATE FULLTEXT INDEX ft_book_search_key ON books (search_key) WITH PARSER ngram')
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX ft_book_search_key ON books')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_book_current_rental'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_key',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='検索キー'),
+        ),
+        migrations.RunPython(backfill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,139 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:50
+
+import logging
+import re
+import unicodedata
+from datetime import date, timedelta
+from django.db import migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+DATE_FIELDS = ['application_date', 'approval_date']
+DATE_PATTERN = re.compile(r'(\d{4})\s*[/\-.年]\s*(\d{1,2})\s*[/\-.月]\s*(\d{1,2})\s*日?(?=$|[\sT])')
+
+
+def parse_date(value):
+    """books.utils.sheet_dates.parse_sheet_dateと同じ規則で日付を解析する（解析できない場合None）"""
+    text = unicodedata.normalize('NFKC', value or '').strip()
+    if not text:
+        return None
+    try:
+        match = DATE_PATTERN.match(text)
+        if match:
+            return date(*map(int, match.groups()))
+        if re.fullmatch(r'\d{8}', text):
+            return date(int(text[:4]), int(text[4:6]), int(text[6:]))
+        if re.fullmatch(r'\d{5}(\.\d+)?', text):
+            return date(1899, 12, 30) + timedelta(days=int(float(text)))
+    except ValueError:
+        return None
+    return None
+
+
+def backfill_dates(apps, schema_editor):
+    """
+    文字列の申請日・承認日を解析して日付の列に設定する
+
+    主キー順にBATCH_SIZE件ずつ別のトランザクションで更新し、テーブル全体を長時間ロックしない。
+    解析できない値は日付をNULLとし、書籍IDと元の値をログに出力する。
+    """
+    Book = apps.get_model('books', 'Book')
+    last_pk = 0
+    unparsed = 0
+    while True:
+        with transaction.atomic():
+            books = list(
+                Book.objects.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'application_number', *DATE_FIELDS, *[f'{name}_parsed' for name in DATE_FIELDS])[:BATCH_SIZE]
+            )
+            if not books:
+                break
+            for book in books:
+                for name in DATE_FIELDS:
+                    raw = getattr(book, name)
+                    value = parse_date(raw)
+                    if value is None and raw and raw.strip():
+                        logger.warning(f"Book {book.pk} (Application #{book.application_number}): cannot parse {name} {raw!r}, set to NULL")
+                        unparsed += 1
+                    setattr(book, f'{name}_parsed', value)
+            Book.objects.bulk_update(books, [f'{name}_parsed' for name in DATE_FIELDS])
+        last_pk = books[-1].pk
+    if unparsed:
+        logger.warning(f"Book date backfill: {unparsed} values could not be parsed")
+
+
+def restore_date_strings(apps, schema_editor):
+    """日付の列から YYYY/MM/DD 形式の文字列を復元する（解析できなかった元の値は復元されない）"""
+    Book = apps.get_model('books', 'Book')
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            books = list(Book.objects.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+            if not books:
+                break
+            for book in books:
+                for name in DATE_FIELDS:
+                    value = getattr(book, f'{name}_parsed')
+                    setattr(book, name, value.strftime('%Y/%m/%d') if value else '')
+            Book.objects.bulk_update(books, DATE_FIELDS)
+        last_pk = books[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0014_book_search_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='application_date_parsed',
+            field=models.DateField(blank=True, null=True, verbose_name='申請日'),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='approval_date_parsed',
+            field=models.DateField(blank=True, null=True, verbose_name='承認日'),
+        ),
+        # MySQLでも全体を1つのトランザクションにせず、BATCH_SIZE件ごとにコミットする
+        migrations.RunPython(backfill_dates, restore_date_strings, atomic=False),
+        # 巻き戻す際に既存の行へ文字列の列を追加できるよう、削除前に既定値を設定する
+        migrations.AlterField(
+            model_name='book',
+            name='application_date',
+            field=models.CharField(default='', max_length=10, verbose_name='申請日'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='approval_date',
+            field=models.CharField(default='', max_length=10, verbose_name='承認日'),
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='application_date',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='approval_date',
+        ),
+        migrations.RenameField(
+            model_name='book',
+            old_name='application_date_parsed',
+            new_name='application_date',
+        ),
+        migrations.RenameField(
+            model_name='book',
+            old_name='approval_date_parsed',
+            new_name='approval_date',
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['status', 'approval_date'], name='idx_status_approval_date'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['status', 'application_date'], name='idx_status_application_date'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.9 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('books', '0015_book_dates'),
+    ]
+    
+    operations = [
+        migrations.AddIndex(
+            model_name='sheetrowfingerprint',
+            index=models.Index(fields=['sheet_name', 'row_index'], name='idx_fingerprint_sheet_row'),
+        ),
+    ]
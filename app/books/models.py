@@ -1,5 +1,65 @@
-from django.db import models
+import hashlib
+from django.db import NotSupportedError, connections, models, transaction
 from django.utils import timezone
+from books.utils.search_text import (
+    NGRAM_TOKEN_SIZE, build_search_key, normalize_isbn_term, normalize_search_text, to_boolean_query
+)
+
+
+class FullTextMatch(models.Lookup):
+    """MySQLの全文検索（MATCH ... AGAINST ... IN BOOLEAN MODE）、FULLTEXTインデックスのある列でのみ使用できる"""
+    
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError('Full-text search is only supported on MySQL')
+    
+    def as_mysql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'MATCH ({lhs}) AGAINST ({rhs} IN BOOLEAN MODE)', (*lhs_params, *rhs_params)
+
+
+class BookQuerySet(models.QuerySet):
+    """書籍のクエリセット"""
+    
+    def search(self, term):
+        """
+        書籍を検索（管理画面・APIの共通の検索処理）
+        
+        ISBN・申請番号に完全一致する書籍があればインデックスで引いた結果のみを返し、全文検索は行わない。
+        それ以外は正規化した検索キーに対して、MySQLではFULLTEXTインデックス（ngramパーサー）で
+        すべての語を含む書籍を検索する。ngramのトークン長より短い語を含む場合とMySQL以外のDBでは、
+        検索キーの部分一致で検索する。
+        
+        Args:
+            term: 検索語（空白区切りで複数指定した場合はすべてを含む書籍）
+        
+        Returns:
+            検索結果のクエリセット
+        """
+        term = term.strip()
+        if not term:
+            return self
+        
+        exact = models.Q(application_number=term)
+        isbn = normalize_isbn_term(term)
+        if isbn:
+            exact |= models.Q(isbn__in=[term, isbn])
+        matches = self.filter(exact)
+        if matches.exists():
+            return matches
+        
+        tokens = normalize_search_text(term.replace('"', ' ')).split()
+        if not tokens:
+            return self
+        if connections[self.db].vendor == 'mysql' and all(len(token) >= NGRAM_TOKEN_SIZE for token in tokens):
+            return self.filter(search_key__match=to_boolean_query(tokens))
+        
+        queryset = self
+        for token in tokens:
+            queryset = queryset.filter(search_key__contains=token)
+        return queryset
 
 
 class Book(models.Model):
@@ -16,8 +76,8 @@ class Book(models.Model):
     application_number = models.CharField('申請番号', max_length=50)
     applicant_name = models.CharField('申請者名', max_length=100)
     approver_name = models.CharField('承認者名', max_length=100)
-    application_date = models.CharField('申請日', max_length=10)  # YYYY/MM/DD形式
-    approval_date = models.CharField('承認日', max_length=10)  # YYYY/MM/DD形式
+    application_date = models.DateField('申請日', null=True, blank=True)  # 解析できない日付はNULL
+    approval_date = models.DateField('承認日', null=True, blank=True)
     price = models.DecimalField('価格', max_digits=10, decimal_places=2, null=True, blank=True)
     
     # 書籍情報
@@ -33,10 +93,26 @@ class Book(models.Model):
     status = models.CharField('ステータス', max_length=10, choices=STATUS_CHOICES, default='ordered')
     location = models.CharField('保管場所', max_length=255, blank=True, null=True)
     
+    # 検索キー（SEARCH_KEY_FIELDSを正規化して連結、MySQLではFULLTEXTインデックスを作成する）
+    search_key = models.TextField('検索キー', blank=True, default='', editable=False)
+    
+    # 現在の貸出（未返却の貸出履歴の写し、貸出履歴の保存・削除時に更新する）
+    current_rental = models.ForeignKey(
+        'RentalHistory', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name='現在の貸出'
+    )
+    current_borrower_name = models.CharField('現在の貸出人名', max_length=100, blank=True, null=True, editable=False)
+    current_due_date = models.DateField('現在の返却予定日', blank=True, null=True, editable=False)
+    
     # タイムスタンプ
     created_at = models.DateTimeField('作成日時', default=timezone.now)
     updated_at = models.DateTimeField('更新日時', auto_now=True)
     
+    objects = BookQuerySet.as_manager()
+    
+    # 検索キーに含めるフィールド
+    SEARCH_KEY_FIELDS = ['title', 'author', 'publisher', 'isbn', 'application_number', 'applicant_name', 'approver_name']
+    
     class Meta:
         db_table = 'books'
         verbose_name = '書籍'
@@ -44,19 +120,91 @@ class Book(models.Model):
         indexes = [
             models.Index(fields=['isbn'], name='idx_isbn'),
             models.Index(fields=['status'], name='idx_status'),
-            models.Index(fields=['application_number'], name='idx_application_number'),
+            models.Index(fields=['current_borrower_name'], name='idx_current_borrower_name'),
+            models.Index(fields=['current_due_date'], name='idx_current_due_date'),
+            models.Index(fields=['status', 'approval_date'], name='idx_status_approval_date'),
+            models.Index(fields=['status', 'application_date'], name='idx_status_application_date'),
+        ]
+        constraints = [
+            # 取り込みバッチが同時実行されても同じ申請を二重登録しない
+            models.UniqueConstraint(fields=['application_number'], name='uniq_application_number'),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.isbn})"
     
+    def save(self, *args, **kwargs):
+        """保存（検索キーを更新、update_fieldsに検索対象のフィールドを含む場合は検索キーも保存）"""
+        self.refresh_search_key()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_key' not in update_fields and set(update_fields) & set(self.SEARCH_KEY_FIELDS):
+            kwargs['update_fields'] = [*update_fields, 'search_key']
+        super().save(*args, **kwargs)
+    
+    def refresh_search_key(self):
+        """検索キーを現在の値から作り直す（bulk_createなどsaveを経由しない登録の前に呼ぶ）"""
+        values = [getattr(self, name) for name in self.SEARCH_KEY_FIELDS]
+        values[self.SEARCH_KEY_FIELDS.index('isbn')] = (self.isbn or '').replace('-', '')
+        self.search_key = build_search_key(values)
+    
     def get_current_borrower(self):
-        """現在の貸出人を取得"""
+        """現在の貸出人を取得（書籍の行に保持した値を返すため、貸出履歴は参照しない）"""
         if self.status == 'rented':
-            current_rental = self.rental_history.filter(actual_return_date__isnull=True).first()
-            if current_rental:
-                return current_rental.borrower_name
+            return self.current_borrower_name
         return None
+    
+    def is_overdue(self):
+        """現在の貸出が延滞しているかどうか"""
+        if self.current_due_date:
+            from datetime import date
+            return date.today() > self.current_due_date
+        return False
+    
+    @staticmethod
+    def current_rental_values(rental):
+        """
+        現在の貸出として書籍に保持する値
+        
+        Args:
+            rental: 未返却の貸出履歴（ない場合None）
+        
+        Returns:
+            フィールド名 → 値
+        """
+        return {
+            'current_rental': rental,
+            'current_borrower_name': rental.borrower_name if rental else None,
+            'current_due_date': rental.expected_return_date if rental else None,
+        }
+    
+    @classmethod
+    def sync_current_rental(cls, book_id):
+        """
+        未返却の貸出履歴から書籍の現在の貸出を再計算して保存
+        
+        書籍の行をロックしてから未返却の貸出履歴を読むため、同じ書籍の貸出・返却が同時に保存されても
+        後からコミットする方が先の結果を含めて再計算する。未返却の貸出履歴が複数ある場合は貸出日が最も新しいもの。
+        
+        Args:
+            book_id: 書籍ID
+        
+        Returns:
+            書籍に保存した値（フィールド名 → 値、書籍が存在しない場合None）
+        """
+        with transaction.atomic():
+            if not list(cls.objects.select_for_update().filter(pk=book_id).values_list('pk', flat=True)):
+                return None
+            rental = (
+                RentalHistory.objects.filter(book_id=book_id, actual_return_date__isnull=True)
+                .order_by('-rental_date', '-pk')
+                .first()
+            )
+            values = cls.current_rental_values(rental)
+            cls.objects.filter(pk=book_id).update(**values)
+        return values
+
+
+Book._meta.get_field('search_key').register_lookup(FullTextMatch)
 
 
 class RentalHistory(models.Model):
@@ -80,12 +228,30 @@ class RentalHistory(models.Model):
             models.Index(fields=['book'], name='idx_book_id'),
             models.Index(fields=['borrower_name'], name='idx_borrower_name'),
             models.Index(fields=['rental_date'], name='idx_rental_date'),
+            # 書籍ごとの未返却の貸出履歴（actual_return_date IS NULL）の検索用
+            models.Index(fields=['book', 'actual_return_date'], name='idx_rental_book_returned'),
         ]
         ordering = ['-rental_date']
     
     def __str__(self):
         return f"{self.book.title} - {self.borrower_name} ({self.rental_date})"
     
+    def save(self, *args, **kwargs):
+        """保存（書籍の現在の貸出を同じトランザクションで更新、書籍を付け替えた場合は元の書籍も更新）"""
+        with transaction.atomic():
+            previous_book_id = None
+            if self.pk is not None:
+                previous_book_id = RentalHistory.objects.filter(pk=self.pk).values_list('book_id', flat=True).first()
+            super().save(*args, **kwargs)
+            if previous_book_id is not None and previous_book_id != self.book_id:
+                Book.sync_current_rental(previous_book_id)
+            values = Book.sync_current_rental(self.book_id)
+        
+        # 呼び出し側が保持している書籍のインスタンスにも反映する（古い値で上書き保存しないため）
+        if values is not None and RentalHistory.book.is_cached(self):
+            for name, value in values.items():
+                setattr(self.book, name, value)
+    
     def is_overdue(self):
         """延滞しているかどうか"""
         if not self.actual_return_date:
@@ -95,13 +261,16 @@ class RentalHistory(models.Model):
 
 
 class ErrorLog(models.Model):
-    """エラーログ"""
+    """エラーログ（申請番号・ISBN・エラー種別ごとに1行、繰り返し発生した場合は発生回数を加算）"""
     
+    dedupe_key = models.CharField('重複判定キー', max_length=64, unique=True, editable=False)  # make_dedupe_keyのハッシュ
     application_number = models.CharField('申請番号', max_length=50, blank=True, null=True)
     isbn = models.CharField('ISBNコード', max_length=20, blank=True, null=True)
     error_type = models.CharField('エラー種別', max_length=50)
-    error_message = models.TextField('エラーメッセージ')
-    created_at = models.DateTimeField('発生日時', default=timezone.now)
+    error_message = models.TextField('エラーメッセージ')  # 最後に発生したときのメッセージ
+    occurrence_count = models.PositiveIntegerField('発生回数', default=1)
+    created_at = models.DateTimeField('初回発生日時', default=timezone.now)
+    last_seen_at = models.DateTimeField('最終発生日時', default=timezone.now)
     
     class Meta:
         db_table = 'error_logs'
@@ -109,9 +278,260 @@ class ErrorLog(models.Model):
         verbose_name_plural = 'エラーログ'
         indexes = [
             models.Index(fields=['created_at'], name='idx_created_at'),
+            models.Index(fields=['last_seen_at'], name='idx_error_last_seen_at'),
             models.Index(fields=['application_number'], name='idx_error_application_number'),
         ]
-        ordering = ['-created_at']
+        ordering = ['-last_seen_at']
+    
+    def __str__(self):
+        return f"{self.error_type} - {self.last_seen_at.strftime('%Y-%m-%d %H:%M:%S')}"
+    
+    def save(self, *args, **kwargs):
+        if not self.dedupe_key:
+            self.dedupe_key = self.make_dedupe_key(self.application_number, self.isbn, self.error_type)
+        super().save(*args, **kwargs)
+    
+    @staticmethod
+    def make_dedupe_key(application_number, isbn, error_type):
+        """
+        同じエラーとみなす組み合わせ（申請番号・ISBN・エラー種別）のハッシュ
+        
+        申請番号・ISBNはNULLを含むためユニーク制約に直接使えず、ハッシュにまとめる
+        """
+        value = '\x1f'.join([application_number or '', isbn or '', error_type])
+        return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class ImportRetryState(models.Model):
+    """取り込み失敗行の再試行状態"""
+    
+    application_number = models.CharField('申請番号', max_length=50, unique=True)
+    row_index = models.PositiveIntegerField('行番号')
+    isbn = models.CharField('ISBNコード', max_length=20, blank=True)  # 失敗時のISBN（正規化済み）
+    attempt_count = models.PositiveIntegerField('試行回数', default=0)
+    last_error_type = models.CharField('最終エラー種別', max_length=50)
+    next_attempt_at = models.DateTimeField('次回試行日時')
+    is_parked = models.BooleanField('保留中', default=False)  # 試行上限に達し自動再試行を停止
+    
+    # タイムスタンプ
+    created_at = models.DateTimeField('作成日時', default=timezone.now)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    
+    class Meta:
+        db_table = 'import_retry_states'
+        verbose_name = '取り込み再試行状態'
+        verbose_name_plural = '取り込み再試行状態'
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='idx_retry_next_attempt_at'),
+        ]
+        ordering = ['next_attempt_at']
+    
+    def __str__(self):
+        return f"{self.application_number} - {self.last_error_type} ({self.attempt_count}回)"
+    
+    def is_due(self, isbn, now=None):
+        """
+        再試行してよいかどうか
+        
+        ISBNが修正されている場合は保留中・待機中でも即時に再試行する。
+        """
+        if self.isbn != isbn:
+            return True
+        if self.is_parked:
+            return False
+        return self.next_attempt_at <= (now or timezone.now())
+
+
+class BookInfoCache(models.Model):
+    """ISBN書籍情報キャッシュ（Google Books APIの取得結果）"""
+    
+    isbn = models.CharField('ISBNコード', max_length=20, unique=True)  # 正規化済み（ハイフンなし）
+    is_found = models.BooleanField('書籍情報あり', default=True)  # Falseは「該当書籍なし」のネガティブキャッシュ
+    title = models.CharField('書籍名', max_length=255, blank=True, null=True)
+    author = models.CharField('著者', max_length=255, blank=True, null=True)
+    publisher = models.CharField('出版社', max_length=255, blank=True, null=True)
+    published_date = models.CharField('出版日', max_length=50, blank=True, null=True)
+    description = models.TextField('書籍概要', blank=True, null=True)
+    thumbnail_url = models.CharField('書影URL', max_length=512, blank=True, null=True)
+    fetched_at = models.DateTimeField('取得日時', default=timezone.now)
+    
+    BOOK_INFO_FIELDS = ['title', 'author', 'publisher', 'published_date', 'description', 'thumbnail_url']
+    
+    class Meta:
+        db_table = 'book_info_cache'
+        verbose_name = 'ISBN書籍情報キャッシュ'
+        verbose_name_plural = 'ISBN書籍情報キャッシュ'
+        indexes = [
+            models.Index(fields=['fetched_at'], name='idx_cache_fetched_at'),
+        ]
+    
+    def __str__(self):
+        return f"{self.isbn} ({self.title if self.is_found else '該当なし'})"
+    
+    def is_fresh(self, ttl, negative_ttl):
+        """有効期限内かどうか"""
+        age = timezone.now() - self.fetched_at
+        return age < (ttl if self.is_found else negative_ttl)
+    
+    def to_book_info(self):
+        """GoogleBooksClientと同じ形式の書籍情報辞書に変換（ネガティブキャッシュはNone）"""
+        if not self.is_found:
+            return None
+        return {field: getattr(self, field) or '' for field in self.BOOK_INFO_FIELDS}
+
+
+class SheetSyncState(models.Model):
+    """スプレッドシート同期状態（シートごとの処理済み最終行）"""
+    
+    sheet_name = models.CharField('シート名', max_length=100, unique=True)
+    high_water_row = models.PositiveIntegerField('処理済み最終行', default=0)  # 前回の同期で走査した最終行番号
+    last_synced_at = models.DateTimeField('最終同期日時', null=True, blank=True)
+    
+    # タイムスタンプ
+    created_at = models.DateTimeField('作成日時', default=timezone.now)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    
+    class Meta:
+        db_table = 'sheet_sync_states'
+        verbose_name = 'シート同期状態'
+        verbose_name_plural = 'シート同期状態'
+    
+    def __str__(self):
+        return f"{self.sheet_name} (〜{self.high_water_row}行目)"
+
+
+class SheetRowFingerprint(models.Model):
+    """取り込み済み行の内容ハッシュ（取り込み後の編集検知用）"""
+    
+    sheet_name = models.CharField('シート名', max_length=100)
+    application_number = models.CharField('申請番号', max_length=50)
+    row_index = models.PositiveIntegerField('行番号')
+    content_hash = models.CharField('内容ハッシュ', max_length=64)  # 申請者名・承認者名・申請日・承認日・ISBN・価格のSHA-256
+    synced_at = models.DateTimeField('同期日時', default=timezone.now)
+    
+    class Meta:
+        db_table = 'sheet_row_fingerprints'
+        verbose_name = 'シート行フィンガープリント'
+        verbose_name_plural = 'シート行フィンガープリント'
+        constraints = [
+            models.UniqueConstraint(fields=['sheet_name', 'application_number'], name='uniq_sheet_application_number'),
+        ]
+        indexes = [
+            # シャードの行範囲の内容ハッシュのみを読み込む
+            models.Index(fields=['sheet_name', 'row_index'], name='idx_fingerprint_sheet_row'),
+        ]
+    
+    def __str__(self):
+        return f"{self.sheet_name}!{self.row_index} ({self.application_number})"
+
+
+class ImportLock(models.Model):
+    """取り込み処理の排他ロック（スプレッドシートごとに1つのワーカーのみ処理する）"""
+    
+    name = models.CharField('ロック名', max_length=150, unique=True)
+    owner = models.CharField('所有者', max_length=150)  # ホスト名:プロセスID:識別子
+    acquired_at = models.DateTimeField('取得日時', default=timezone.now)
+    heartbeat_at = models.DateTimeField('最終更新日時', default=timezone.now)
+    expires_at = models.DateTimeField('有効期限')  # 期限切れのロックは他のワーカーが奪取できる
+    
+    class Meta:
+        db_table = 'import_locks'
+        verbose_name = '取り込みロック'
+        verbose_name_plural = '取り込みロック'
+    
+    def __str__(self):
+        return f"{self.name} ({self.owner})"
+    
+    def is_expired(self, now=None):
+        """有効期限切れかどうか"""
+        return self.expires_at <= (now or timezone.now())
+
+
+class ImportShard(models.Model):
+    """取り込みシャード（シートの行範囲ごとの作業単位。複数のワーカーがリースを取得して並行して取り込む）"""
+    
+    sheet_name = models.CharField('シート名', max_length=100)
+    start_row = models.PositiveIntegerField('開始行')
+    end_row = models.PositiveIntegerField('終了行')
+    
+    # リース（所有者が空、または有効期限切れのシャードは他のワーカーが取得できる）
+    owner = models.CharField('リース所有者', max_length=150, blank=True, default='')  # ホスト名:プロセスID:識別子
+    leased_at = models.DateTimeField('リース取得日時', null=True, blank=True)
+    lease_expires_at = models.DateTimeField('リース有効期限', null=True, blank=True)
+    available_at = models.DateTimeField('次回処理可能日時', default=timezone.now)
+    
+    # 同期状態（SheetSyncStateと同じ項目をシャードごとに持つ）
+    high_water_row = models.PositiveIntegerField('処理済み最終行', default=0)
+    last_synced_at = models.DateTimeField('最終同期日時', null=True, blank=True)
+    run_count = models.PositiveIntegerField('処理回数', default=0)
+    
+    # タイムスタンプ
+    created_at = models.DateTimeField('作成日時', default=timezone.now)
+    updated_at = models.DateTimeField('更新日時', auto_now=True)
+    
+    class Meta:
+        db_table = 'import_shards'
+        verbose_name = '取り込みシャード'
+        verbose_name_plural = '取り込みシャード'
+        constraints = [
+            models.UniqueConstraint(fields=['sheet_name', 'start_row'], name='uniq_shard_sheet_start_row'),
+        ]
+        indexes = [
+            models.Index(fields=['sheet_name', 'available_at'], name='idx_shard_available_at'),
+        ]
+        ordering = ['sheet_name', 'start_row']
+    
+    def __str__(self):
+        return f"{self.sheet_name}!{self.start_row}:{self.end_row}"
+    
+    def is_leased(self, now=None):
+        """有効なリースがあるかどうか"""
+        return bool(self.owner) and self.lease_expires_at is not None and self.lease_expires_at > (now or timezone.now())
+
+
+class ImportRun(models.Model):
+    """取り込みバッチの実行履歴（段階ごとの処理時間・API呼び出し数・件数）"""
+    
+    STATUS_CHOICES = [
+        ('success', '成功'),
+        ('error', 'エラーあり'),
+        ('failed', '失敗'),
+        ('skipped', 'スキップ（実行中の取り込みあり）'),
+    ]
+    
+    sheet_name = models.CharField('シート名', max_length=100)
+    status = models.CharField('結果', max_length=10, choices=STATUS_CHOICES)
+    started_at = models.DateTimeField('開始日時')
+    finished_at = models.DateTimeField('終了日時')
+    duration_seconds = models.FloatField('処理時間（秒）')
+    stage_timings = models.JSONField('段階別処理時間（秒）', default=dict)  # 段階名 → 秒
+    
+    # API呼び出し
+    sheets_api_calls = models.PositiveIntegerField('Sheets API呼び出し数', default=0)
+    books_api_calls = models.PositiveIntegerField('Books API呼び出し数', default=0)
+    lookup_p50_ms = models.FloatField('書籍情報取得p50（ms）', null=True, blank=True)
+    lookup_p95_ms = models.FloatField('書籍情報取得p95（ms）', null=True, blank=True)
+    
+    # 件数
+    scanned_rows = models.PositiveIntegerField('走査行数', default=0)
+    pending_rows = models.PositiveIntegerField('取り込み対象行数', default=0)
+    changed_rows = models.PositiveIntegerField('編集行数', default=0)
+    lookup_rows = models.PositiveIntegerField('書籍情報取得行数', default=0)
+    lookup_unique_isbns = models.PositiveIntegerField('ユニークISBN数', default=0)
+    success_count = models.PositiveIntegerField('成功件数', default=0)
+    error_count = models.PositiveIntegerField('エラー件数', default=0)
+    skip_count = models.PositiveIntegerField('スキップ件数', default=0)
+    deferred_count = models.PositiveIntegerField('再試行待ち件数', default=0)
+    updated_count = models.PositiveIntegerField('編集反映件数', default=0)
+    
+    class Meta:
+        db_table = 'import_runs'
+        verbose_name = '取り込み実行履歴'
+        verbose_name_plural = '取り込み実行履歴'
+        indexes = [
+            models.Index(fields=['started_at'], name='idx_import_run_started_at'),
+        ]
+        ordering = ['-started_at']
     
     def __str__(self):
-        return f"{self.error_type} - {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
+        return f"{self.sheet_name} {self.started_at.strftime('%Y-%m-%d %H:%M:%S')} ({self.get_status_display()})"
@@ -0,0 +1,17 @@
+"""
+書籍アプリのシグナル
+
+貸出履歴をクエリセットの一括削除（管理画面の「選択された貸出履歴の削除」など）や書籍の削除に伴って
+削除した場合はRentalHistory.deleteが呼ばれないため、post_deleteで書籍の現在の貸出を更新する。
+削除と同じトランザクション内で送信される。
+"""
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from books.models import Book, RentalHistory
+
+
+@receiver(post_delete, sender=RentalHistory)
+def sync_current_rental_on_delete(sender, instance, **kwargs):
+    """貸出履歴の削除後に書籍の現在の貸出を再計算"""
+    Book.sync_current_rental(instance.book_id)
@@ -2,11 +2,46 @@
 書籍管理システムのテストモジュール
 """
 
+import os
+import re
+import json
+import pstats
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import tracemalloc
+import requests
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from datetime import date, timedelta
-from .models import Book, RentalHistory, ErrorLog
-from .utils.google_books_client import GoogleBooksClient
+from .admin import ErrorLogAdmin
+from .models import (
+    Book, RentalHistory, ErrorLog, BookInfoCache, ImportRetryState, SheetSyncState, SheetRowFingerprint, ImportLock,
+    ImportRun, ImportShard
+)
+from .utils.google_books_client import GoogleBooksClient, RateLimitedError, get_shared_client
+from .utils.rate_limiter import AdaptiveRateLimiter
+from .utils.book_info_cache import CachedBookInfoClient
+from .utils.google_sheets_client import GoogleSheetsClient, SheetRow, _load_discovery_document
+from .utils.import_lock import DatabaseLock, Heartbeat
+from .utils.import_shards import ImportShardQueue
+from .utils.stage_timer import StageTimer, percentile
+from .utils.fake_google import FakeBooksAdapter, FakeSheetsService, synthetic_rows
+from .utils.error_log_writer import ErrorLogWriter
+from .utils.search_text import normalize_search_text, to_boolean_query
+from .utils.sheet_dates import parse_sheet_date
+from .management.commands.import_from_sheets import BookImportBatch
 
 
 class BookModelTests(TestCase):
@@ -18,8 +53,8 @@ class BookModelTests(TestCase):
             application_number="TEST-001",
             applicant_name="テスト太郎",
             approver_name="承認次郎",
-            application_date="2025/10/20",
-            approval_date="2025/10/21",
+            application_date=date(2025, 10, 20),
+            approval_date=date(2025, 10, 21),
             isbn="9784873115658",
             title="リーダブルコード",
             author="Dustin Boswell, Trevor Foucher",
@@ -61,11 +96,62 @@ class BookModelTests(TestCase):
         borrower = self.book.get_current_borrower()
         self.assertEqual(borrower, "借りた太郎")
     
+    def test_get_current_borrower_without_query(self):
+        """書籍に保持した貸出人を返し、貸出履歴を参照しないテスト"""
+        self.book.status = "rented"
+        self.book.save()
+        RentalHistory.objects.create(
+            book=self.book,
+            borrower_name="返却済み花子",
+            rental_date=date.today() - timedelta(days=30),
+            expected_return_date=date.today() - timedelta(days=16),
+            actual_return_date=date.today() - timedelta(days=20)
+        )
+        RentalHistory.objects.create(
+            book=self.book,
+            borrower_name="借りた太郎",
+            rental_date=date.today(),
+            expected_return_date=date.today() + timedelta(days=14)
+        )
+        
+        book = Book.objects.get(pk=self.book.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(book.get_current_borrower(), "借りた太郎")
+            self.assertEqual(book.current_due_date, date.today() + timedelta(days=14))
+            self.assertFalse(book.is_overdue())
+    
     def test_get_current_borrower_when_available(self):
         """保管中の場合の貸出人取得のテスト"""
         borrower = self.book.get_current_borrower()
         self.assertIsNone(borrower)
     
+    def test_search_key_normalized(self):
+        """検索キーが全角/半角・カタカナ/ひらがなを正規化して作成されるテスト"""
+        self.assertEqual(normalize_search_text(' ﾘｰﾀﾞﾌﾞﾙ　ＣＯＤＥ '), 'りーだぶる code')
+        self.assertIn('りーだぶるこーど', self.book.search_key)
+        self.assertIn('おらいりー・じゃぱん', self.book.search_key)
+        
+        self.book.title = "新しいタイトル"
+        self.book.save(update_fields=['title'])
+        self.book.refresh_from_db()
+        self.assertIn('新しいたいとる', self.book.search_key)
+    
+    def test_search_exact_match_skips_full_text(self):
+        """ISBN・申請番号に完全一致する書籍のみを返すテスト"""
+        Book.objects.create(application_number="TEST-002", isbn="9784873119038", title="9784873115658の解説 TEST-001")
+        
+        self.assertEqual(list(Book.objects.search('978-4-87311-565-8')), [self.book])
+        self.assertEqual(list(Book.objects.search('TEST-001')), [self.book])
+    
+    def test_search_normalized_terms(self):
+        """検索語も正規化して、すべての語を含む書籍を返すテスト"""
+        Book.objects.create(application_number="TEST-002", isbn="9784873119038", title="プログラマが知るべき97のこと")
+        
+        self.assertEqual(list(Book.objects.search('ﾘｰﾀﾞﾌﾞﾙ')), [self.book])
+        self.assertEqual(list(Book.objects.search('ＢＯＳＷＥＬＬ りーだぶる')), [self.book])
+        self.assertEqual(list(Book.objects.search('りーだぶる のこと')), [])
+        self.assertEqual(to_boolean_query(['りーだぶる', 'a"b']), '+"りーだぶる" +"ab"')
+    
     def test_duplicate_application_number(self):
         """申請番号の重複チェックのテスト"""
         # 同じ申請番号の書籍を作成しようとする
@@ -84,6 +170,122 @@ class BookModelTests(TestCase):
         self.assertEqual(Book.objects.count(), 2)
 
 
+class BookAdminTests(TestCase):
+    """書籍管理画面のテスト"""
+    
+    def setUp(self):
+        """テストデータのセットアップ"""
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+    
+    def _create_rented_books(self, count, start=0):
+        """貸出中の書籍を作成"""
+        for i in range(start, start + count):
+            book = Book.objects.create(application_number=f'RENT-{i:03d}', isbn='9784873115658', title=f'Book {i}', status='rented')
+            RentalHistory.objects.create(
+                book=book,
+                borrower_name=f'借りた人{i}',
+                rental_date=date.today(),
+                expected_return_date=date.today() + timedelta(days=14)
+            )
+    
+    def _changelist_query_count(self):
+        """書籍一覧画面の表示に要したクエリ数"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/admin/books/book/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+    
+    def test_changelist_queries_independent_of_rows(self):
+        """一覧の件数が増えても貸出人の取得でクエリ数が増えないテスト"""
+        self._create_rented_books(2)
+        few, _ = self._changelist_query_count()
+        self._create_rented_books(8, start=2)
+        many, response = self._changelist_query_count()
+        
+        self.assertEqual(few, many)
+        self.assertContains(response, '借りた人9')
+        self.assertContains(response, '借りた人0')
+    
+    def test_changelist_search(self):
+        """一覧画面の検索が検索キーを使用するテスト"""
+        Book.objects.create(application_number='SEARCH-001', isbn='9784873115658', title='リーダブルコード')
+        Book.objects.create(application_number='SEARCH-002', isbn='9784873119038', title='Effective Python')
+        
+        response = self.client.get('/admin/books/book/', {'q': 'りーだぶる'})
+        self.assertContains(response, 'リーダブルコード')
+        self.assertNotContains(response, 'Effective Python')
+
+
+class LargeTableChangeListTests(TestCase):
+    """件数の推定とキーセットページングの一覧のテスト"""
+    
+    def setUp(self):
+        """テストデータのセットアップ（同じ最終発生日時の行を含む7件）"""
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        base = timezone.now()
+        for i in range(7):
+            seen = base - timedelta(hours=i // 2)
+            ErrorLog.objects.create(
+                application_number=f'APP-{i}', error_type='API_ERROR', error_message='error', last_seen_at=seen
+            )
+        self.expected = list(ErrorLog.objects.order_by('-last_seen_at', '-pk').values_list('pk', flat=True))
+    
+    def _get(self, url='/admin/books/errorlog/'):
+        """一覧画面を表示し、クエリを記録する"""
+        with mock.patch.object(ErrorLogAdmin, 'list_per_page', 3), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl'], [query['sql'] for query in queries]
+    
+    def test_pages_follow_keyset(self):
+        """次へ・前へのリンクがOFFSETを使わずに続きの行を返すテスト"""
+        cl, _ = self._get()
+        pages = [[log.pk for log in cl.result_list]]
+        while cl.keyset_next_url:
+            cl, queries = self._get('/admin/books/errorlog/' + cl.keyset_next_url)
+            self.assertFalse([sql for sql in queries if 'OFFSET' in sql and 'error_logs' in sql])
+            pages.append([log.pk for log in cl.result_list])
+        
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual(cl.page_num, 3)
+        
+        cl, _ = self._get('/admin/books/errorlog/' + cl.keyset_previous_url)
+        self.assertEqual([log.pk for log in cl.result_list], pages[1])
+        self.assertEqual(cl.page_num, 2)
+    
+    def test_page_number_without_cursor_shows_first_page(self):
+        """位置のないページ番号・不正な位置の指定はOFFSETで読まずに先頭のページを表示するテスト"""
+        for url in ('/admin/books/errorlog/?p=3', '/admin/books/errorlog/?p=2&cursor=after_x_y'):
+            cl, queries = self._get(url)
+            self.assertFalse([sql for sql in queries if 'OFFSET' in sql and 'error_logs' in sql])
+            self.assertEqual([log.pk for log in cl.result_list], self.expected[:3])
+            self.assertEqual(cl.page_num, 1)
+            self.assertNotIn('cursor', cl.get_query_string({'p': 1}))
+    
+    def test_keyset_pagination_hides_page_numbers(self):
+        """キーセットページングの一覧はページ番号のリンクを表示せず、並び替えた一覧は表示するテスト"""
+        with mock.patch.object(ErrorLogAdmin, 'list_per_page', 3):
+            response = self.client.get('/admin/books/errorlog/')
+            self.assertNotContains(response, '?p=3"')
+            self.assertContains(response, '次へ ›')
+            
+            response = self.client.get('/admin/books/errorlog/?o=2')
+            self.assertContains(response, '?o=2&amp;p=3"')
+    
+    def test_count_capped_at_threshold(self):
+        """件数が閾値を超える場合は推定値として表示するテスト"""
+        with self.settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=4):
+            cl, queries = self._get()
+        self.assertTrue(cl.paginator.estimated)
+        self.assertEqual(cl.result_count, 5)
+        self.assertIsNone(cl.full_result_count)
+        
+        with self.settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=100):
+            cl, _ = self._get()
+        self.assertFalse(cl.paginator.estimated)
+        self.assertEqual(cl.result_count, 7)
+
+
 class RentalHistoryModelTests(TestCase):
     """貸出履歴モデルのテスト"""
     
@@ -132,6 +334,64 @@ class RentalHistoryModelTests(TestCase):
         """貸出履歴の文字列表現のテスト"""
         expected = f"{self.book.title} - {self.rental.borrower_name} ({self.rental.rental_date})"
         self.assertEqual(str(self.rental), expected)
+    
+    def test_current_rental_follows_loans_and_returns(self):
+        """貸出・返却・削除に合わせて書籍の現在の貸出が更新されるテスト"""
+        book = Book.objects.get(pk=self.book.pk)
+        self.assertEqual(book.current_rental_id, self.rental.pk)
+        self.assertEqual(book.current_borrower_name, "テスト太郎")
+        self.assertTrue(book.is_overdue())
+        
+        self.rental.actual_return_date = date.today()
+        self.rental.save()
+        book.refresh_from_db()
+        self.assertIsNone(book.current_rental_id)
+        self.assertIsNone(book.current_borrower_name)
+        self.assertIsNone(book.current_due_date)
+        self.assertIsNone(self.book.current_borrower_name)  # 保持しているインスタンスにも反映
+        
+        rental = RentalHistory.objects.create(
+            book=self.book,
+            borrower_name="次郎",
+            rental_date=date.today(),
+            expected_return_date=date.today() + timedelta(days=14)
+        )
+        book.refresh_from_db()
+        self.assertEqual((book.current_rental_id, book.current_borrower_name), (rental.pk, "次郎"))
+        
+        RentalHistory.objects.filter(pk=rental.pk).delete()
+        book.refresh_from_db()
+        self.assertIsNone(book.current_rental_id)
+        self.assertIsNone(book.current_borrower_name)
+    
+    def test_current_rental_moves_with_book(self):
+        """貸出履歴の書籍を付け替えた場合に元の書籍の現在の貸出が解除されるテスト"""
+        other = Book.objects.create(application_number="TEST-002", isbn="9784873119038", status="rented")
+        self.rental.book = other
+        self.rental.save()
+        
+        self.book.refresh_from_db()
+        other.refresh_from_db()
+        self.assertIsNone(self.book.current_rental_id)
+        self.assertEqual(other.current_borrower_name, "テスト太郎")
+    
+    def test_repair_current_rentals(self):
+        """一括更新でずれた現在の貸出が再計算されるテスト"""
+        RentalHistory.objects.filter(pk=self.rental.pk).update(borrower_name="変更後")
+        Book.objects.create(application_number="TEST-002", isbn="9784873119038", current_borrower_name="古い値")
+        
+        out = StringIO()
+        call_command('repair_current_rentals', '--dry-run', stdout=out)
+        self.assertIn('2 would be repaired', out.getvalue())
+        self.assertEqual(Book.objects.get(pk=self.book.pk).current_borrower_name, "テスト太郎")
+        
+        out = StringIO()
+        call_command('repair_current_rentals', '--chunk-size', '1', stdout=out)
+        self.assertIn('Checked 2 books, repaired 2', out.getvalue())
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('current_rental', 'current_borrower_name')),
+            [(self.rental.pk, "変更後"), (None, None)]
+        )
 
 
 class ErrorLogModelTests(TestCase):
@@ -158,6 +418,88 @@ class ErrorLogModelTests(TestCase):
         
         expected = f"PROCESSING_ERROR - {error.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
         self.assertEqual(str(error), expected)
+    
+    def test_writer_dedupes_repeated_errors(self):
+        """同じエラーは1行にまとめられ、発生回数・最終発生日時が更新されるテスト"""
+        writer = ErrorLogWriter()
+        writer.add('APP-001', '9784873115658', 'BOOK_NOT_FOUND', '1回目')
+        writer.add('APP-001', '9784873115658', 'BOOK_NOT_FOUND', '2回目')
+        writer.add('APP-001', None, 'PROCESSING_ERROR', '別のエラー')
+        self.assertEqual(len(writer), 2)
+        self.assertEqual(writer.flush(), 2)
+        first = ErrorLog.objects.get(error_type='BOOK_NOT_FOUND')
+        
+        writer.add('APP-001', '9784873115658', 'BOOK_NOT_FOUND', '3回目')
+        writer.flush()
+        
+        log = ErrorLog.objects.get(error_type='BOOK_NOT_FOUND')
+        self.assertEqual(ErrorLog.objects.count(), 2)
+        self.assertEqual((log.occurrence_count, log.error_message), (3, '3回目'))
+        self.assertEqual(log.created_at, first.created_at)
+        self.assertGreaterEqual(log.last_seen_at, first.last_seen_at)
+        self.assertEqual(len(writer), 0)
+    
+    def test_writer_increments_in_update(self):
+        """発生回数は既存の値を読まずにUPDATE文の中で加算され、同時に書き込んだ回数が失われないテスト"""
+        ErrorLog.objects.create(
+            dedupe_key=ErrorLog.make_dedupe_key(None, None, 'SHEET_UPDATE_ERROR'),
+            error_type='SHEET_UPDATE_ERROR', error_message='既存', occurrence_count=5
+        )
+        first, second = ErrorLogWriter(), ErrorLogWriter()
+        for writer in (first, second):
+            writer.add(None, None, 'SHEET_UPDATE_ERROR', 'シャード')
+            writer.add(None, None, 'SHEET_UPDATE_ERROR', 'シャード')
+        
+        with CaptureQueriesContext(connection) as queries:
+            first.flush()
+        # 他のワーカーの書き込みで発生回数が変わっていても加算は失われない
+        ErrorLog.objects.update(occurrence_count=F('occurrence_count') + 10)
+        second.flush()
+        
+        self.assertEqual(ErrorLog.objects.get().occurrence_count, 19)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"occurrence_count" = ("error_logs"."occurrence_count" + CASE', updates[0])
+    
+    def test_writer_retries_after_concurrent_insert(self):
+        """同じエラーの登録がユニーク制約に衝突した場合は再試行されるテスト"""
+        writer = ErrorLogWriter()
+        writer.add('APP-001', None, 'PROCESSING_ERROR', 'エラー')
+        original = ErrorLog.objects.bulk_create
+        calls = []
+        
+        def conflict_once(entries, *args, **kwargs):
+            calls.append(len(entries))
+            if len(calls) == 1:
+                raise IntegrityError('Duplicate entry for key dedupe_key')
+            return original(entries, *args, **kwargs)
+        
+        with mock.patch.object(ErrorLog.objects, 'bulk_create', side_effect=conflict_once):
+            self.assertEqual(writer.flush(), 1)
+        
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(ErrorLog.objects.get().occurrence_count, 1)
+    
+    def test_purge_error_logs_deletes_expired_rows(self):
+        """保存期間より古いエラーログのみ分割して削除されるテスト"""
+        old = timezone.now() - timedelta(days=100)
+        for i in range(5):
+            ErrorLog.objects.create(
+                application_number=f'OLD-{i}', error_type='API_ERROR', error_message='old',
+                created_at=old, last_seen_at=old
+            )
+        ErrorLog.objects.create(application_number='NEW-1', error_type='API_ERROR', error_message='new')
+        
+        out = StringIO()
+        call_command('purge_error_logs', '--dry-run', stdout=out)
+        self.assertIn('5 error logs', out.getvalue())
+        self.assertEqual(ErrorLog.objects.count(), 6)
+        
+        out = StringIO()
+        with self.settings(ERROR_LOG_RETENTION_DAYS=90):
+            call_command('purge_error_logs', '--chunk-size', '2', stdout=out)
+        self.assertIn('Deleted 5', out.getvalue())
+        self.assertEqual(list(ErrorLog.objects.values_list('application_number', flat=True)), ['NEW-1'])
 
 
 class GoogleBooksClientTests(TestCase):
@@ -188,6 +530,152 @@ class GoogleBooksClientTests(TestCase):
     def test_validate_isbn_with_x(self):
         """ISBN-10でXを含む場合の妥当性チェックのテスト"""
         self.assertTrue(self.client.validate_isbn("123456789X"))
+    
+    def test_shared_client(self):
+        """共有クライアントがプロセス内で使い回されるテスト"""
+        self.assertIs(get_shared_client(), get_shared_client())
+    
+    def test_session_pool_and_retry(self):
+        """セッションに接続プールとリトライが設定されるテスト"""
+        with self.settings(
+            GOOGLE_BOOKS_POOL_SIZE=16, GOOGLE_BOOKS_MAX_RETRIES=5,
+            GOOGLE_BOOKS_BACKOFF_FACTOR=2.0, GOOGLE_BOOKS_BACKOFF_JITTER=0.25
+        ):
+            client = GoogleBooksClient(api_key='dummy')
+        adapter = client.session.get_adapter(GoogleBooksClient.BASE_URL)
+        self.assertEqual(adapter._pool_maxsize, 16)
+        self.assertEqual(adapter.max_retries.total, 5)
+        self.assertEqual((adapter.max_retries.backoff_factor, adapter.max_retries.backoff_jitter), (2.0, 0.25))
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+    
+    def test_latency_recorded(self):
+        """API呼び出しごとのレイテンシが記録されるテスト"""
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {'items': [{'volumeInfo': {'title': 'リーダブルコード'}}]}
+        with mock.patch.object(self.client.session, 'get', return_value=response) as get:
+            book_info = self.client.get_book_info_by_isbn("9784873115658")
+        
+        self.assertEqual(book_info['title'], 'リーダブルコード')
+        self.assertEqual(get.call_args.kwargs['params']['q'], 'isbn:9784873115658')
+        latencies = self.client.pop_latencies()
+        self.assertEqual(len(latencies), 1)
+        self.assertEqual(self.client.pop_latencies(), [])
+    
+    def test_rate_limit_response_is_throttled(self):
+        """429・rateLimitExceeded応答が該当なしと区別されるテスト"""
+        limiter = AdaptiveRateLimiter(rate=10, min_rate=1, max_rate=20, increase_step=1, decrease_factor=0.5)
+        client = GoogleBooksClient(api_key='dummy', limiter=limiter)
+        too_many = mock.Mock(status_code=429)
+        forbidden = mock.Mock(status_code=403)
+        forbidden.json.return_value = {'error': {'errors': [{'reason': 'rateLimitExceeded'}]}}
+        
+        for response in (too_many, forbidden):
+            with mock.patch.object(client.session, 'get', return_value=response):
+                self.assertEqual(client.lookup("9784873115658"), (GoogleBooksClient.LOOKUP_THROTTLED, None))
+        self.assertEqual(limiter.rate, 2.5)
+        
+        with mock.patch.object(client.session, 'get', return_value=too_many):
+            with self.assertRaises(RateLimitedError):
+                client.fetch_book_info("9784873115658")
+
+
+class AdaptiveRateLimiterTests(TestCase):
+    """レートリミッターのテスト"""
+    
+    def setUp(self):
+        """テストデータのセットアップ"""
+        self.limiter = AdaptiveRateLimiter(rate=4, min_rate=1, max_rate=5, increase_step=0.5, decrease_factor=0.5)
+    
+    def test_additive_increase(self):
+        """成功時にレートが加算され上限で止まるテスト"""
+        for _ in range(5):
+            self.limiter.on_success()
+        self.assertEqual(self.limiter.rate, 5)
+    
+    def test_multiplicative_decrease(self):
+        """制限応答時にレートが乗算減少し下限で止まるテスト"""
+        self.limiter.on_throttle()
+        self.assertEqual(self.limiter.rate, 2)
+        for _ in range(5):
+            self.limiter.on_throttle()
+        self.assertEqual(self.limiter.rate, 1)
+    
+    def test_bucket_capacity(self):
+        """バケット容量を超える取得は待機となるテスト"""
+        for _ in range(4):
+            self.assertTrue(self.limiter.acquire(timeout=0))
+        self.assertFalse(self.limiter.acquire(timeout=0))
+    
+    def test_throttle_drains_bucket(self):
+        """制限応答後はトークンが空になるテスト"""
+        self.limiter.on_throttle()
+        self.assertFalse(self.limiter.acquire(timeout=0))
+
+
+class CachedBookInfoClientTests(TestCase):
+    """ISBN書籍情報キャッシュのテスト"""
+    
+    def setUp(self):
+        """テストデータのセットアップ"""
+        self.books_client = GoogleBooksClient(api_key='dummy')
+        self.cache = CachedBookInfoClient(self.books_client)
+    
+    def test_cache_hit(self):
+        """キャッシュヒット時はAPIを呼ばないテスト"""
+        BookInfoCache.objects.create(isbn='9784873115658', title='リーダブルコード')
+        with mock.patch.object(self.books_client, 'fetch_book_info') as fetch:
+            book_info = self.cache.get_book_info_by_isbn('978-4-87311-565-8')
+        fetch.assert_not_called()
+        self.assertEqual(book_info['title'], 'リーダブルコード')
+    
+    def test_negative_cache(self):
+        """該当なしの結果もキャッシュされるテスト"""
+        with mock.patch.object(self.books_client, 'fetch_book_info', return_value=None) as fetch:
+            self.assertIsNone(self.cache.get_book_info_by_isbn('9784873115658'))
+            self.assertIsNone(self.cache.get_book_info_by_isbn('9784873115658'))
+        self.assertEqual(fetch.call_count, 1)
+        self.assertFalse(BookInfoCache.objects.get(isbn='9784873115658').is_found)
+    
+    def test_expired_entry_refetched(self):
+        """有効期限切れのキャッシュは再取得されるテスト"""
+        BookInfoCache.objects.create(
+            isbn='9784873115658',
+            is_found=False,
+            fetched_at=timezone.now() - timedelta(days=2)
+        )
+        with mock.patch.object(self.books_client, 'fetch_book_info', return_value={'title': '新しい情報'}):
+            book_info = self.cache.get_book_info_by_isbn('9784873115658')
+        self.assertEqual(book_info['title'], '新しい情報')
+        self.assertTrue(BookInfoCache.objects.get(isbn='9784873115658').is_found)
+    
+    def test_request_error_not_cached(self):
+        """通信エラーはキャッシュされないテスト"""
+        with mock.patch.object(self.books_client, 'fetch_book_info', side_effect=requests.exceptions.Timeout()):
+            self.assertIsNone(self.cache.get_book_info_by_isbn('9784873115658'))
+        self.assertFalse(BookInfoCache.objects.exists())
+    
+    def test_warm_command(self):
+        """登録済み書籍からキャッシュを作成するコマンドのテスト"""
+        Book.objects.create(application_number='TEST-001', isbn='978-4-87311-565-8', title='リーダブルコード')
+        Book.objects.create(application_number='TEST-002', isbn='9784873119038')
+        call_command('warm_book_info_cache', stdout=StringIO())
+        
+        self.assertEqual(list(BookInfoCache.objects.values_list('isbn', 'title')), [('9784873115658', 'リーダブルコード')])
+    
+    def test_warm_cache_uses_latest_book_and_keeps_newer_entries(self):
+        """表記の異なる同じISBNは最後に更新された書籍を採用し、実行開始後に取得されたエントリは上書きしないテスト"""
+        Book.objects.create(application_number='TEST-001', isbn='978-4-87311-565-8', title='旧版')
+        Book.objects.create(application_number='TEST-002', isbn='9784873115658', title='新版')
+        Book.objects.filter(application_number='TEST-001').update(updated_at=timezone.now() - timedelta(days=1))
+        Book.objects.create(application_number='TEST-003', isbn='9784873119038', title='登録内容')
+        BookInfoCache.objects.create(isbn='9784873119038', title='APIの取得結果', fetched_at=timezone.now() + timedelta(minutes=1))
+        
+        call_command('warm_book_info_cache', '--force', stdout=StringIO())
+        
+        self.assertEqual(
+            dict(BookInfoCache.objects.values_list('isbn', 'title')),
+            {'9784873115658': '新版', '9784873119038': 'APIの取得結果'}
+        )
 
 
 class BookAPIViewTests(TestCase):
@@ -208,3 +696,1112 @@ class BookAPIViewTests(TestCase):
         data = response.json()
         self.assertFalse(data['success'])
         self.assertIn('形式', data['error'])
+    
+    def test_fetch_book_info_throttled(self):
+        """レート制限時は503を返すテスト"""
+        with mock.patch.object(GoogleBooksClient, 'fetch_book_info', side_effect=RateLimitedError('Rate limit exceeded')):
+            response = self.client.get('/books/api/fetch-book-info/?isbn=9784873115658')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['success'])
+    
+    def test_fetch_book_info_from_cache(self):
+        """キャッシュ済みISBNはAPIを呼ばずに返すテスト"""
+        BookInfoCache.objects.create(isbn='9784873115658', title='リーダブルコード')
+        with mock.patch.object(GoogleBooksClient, 'fetch_book_info') as fetch:
+            response = self.client.get('/books/api/fetch-book-info/?isbn=978-4-87311-565-8')
+        fetch.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['title'], 'リーダブルコード')
+
+
+class BookImportBatchTests(TestCase):
+    """書籍取り込みバッチのテスト"""
+    
+    def setUp(self):
+        """テストデータのセットアップ"""
+        self.pending_rows = [
+            self._make_row(2, 'APP-001', '9784873115658'),
+            self._make_row(3, 'APP-002', 'invalid'),
+            self._make_row(4, 'APP-003', ''),
+            self._make_row(5, 'APP-004', '9784873119038'),
+            self._make_row(6, 'APP-005', '9784798121963'),
+        ]
+        self.sheets_client = mock.MagicMock()
+        self.sheets_client.scan_rows.side_effect = self._scan_rows
+        self.sheets_client.get_row_records.side_effect = self._get_row_records
+        self.sheets_client.is_pending.side_effect = GoogleSheetsClient.is_pending
+        self.sheets_client.fingerprint.side_effect = GoogleSheetsClient.fingerprint
+        self.sheets_client.mark_many_as_imported.return_value = []
+        self.sheets_client.request_count = 0
+        self.books_client = GoogleBooksClient(api_key='dummy')
+    
+    def _make_row(self, row_index, application_number, isbn):
+        """スプレッドシート行データを作成"""
+        return {
+            'row_index': row_index,
+            'application_number': application_number,
+            'applicant_name': '申請太郎',
+            'approver_name': '承認次郎',
+            'application_date': '2025/10/20',
+            'approval_date': '2025/10/21',
+            'book_name': '',
+            'isbn': isbn,
+            'price': '1,980',
+            'db_imported': '',
+        }
+    
+    def _scan_rows(self, sheet_name='Sheet1', start_row=2, end_row=None):
+        """self.pending_rowsをシートとみなしてscan_rowsの結果を返す"""
+        for row in self.pending_rows:
+            if row['row_index'] < start_row or (end_row is not None and row['row_index'] > end_row):
+                continue
+            yield SheetRow(**{
+                'row_index': row['row_index'],
+                **{name: str(row.get(name, '')).strip() for _, name in GoogleSheetsClient.SCAN_COLUMNS}
+            })
+    
+    def _get_row_records(self, row_indices, sheet_name='Sheet1'):
+        """self.pending_rowsから指定行の行レコードを返す"""
+        return [SheetRow(**row) for row in self.pending_rows if row['row_index'] in row_indices]
+    
+    def _mark_imported(self, *row_indices):
+        """シート上で取り込み済みフラグを立てる"""
+        for row in self.pending_rows:
+            if row['row_index'] in row_indices:
+                row['db_imported'] = '✓'
+    
+    def _fake_book_info(self, isbn):
+        """9784798121963は見つからず、9784297127831はレート制限となる書籍情報取得"""
+        if isbn == '9784798121963':
+            return None
+        if isbn == '9784297127831':
+            raise RateLimitedError('Rate limit exceeded')
+        return {'title': f'Book {isbn}', 'author': 'Author'}
+    
+    def _run_batch(self, workers, flush_every=None, chunk_size=None):
+        """クライアントを差し替えてバッチを実行"""
+        batch = BookImportBatch(workers=workers, flush_every=flush_every, chunk_size=chunk_size)
+        batch.initialize_clients = mock.Mock(return_value=True)
+        batch.sheets_client = self.sheets_client
+        batch.books_client = self.books_client
+        batch.book_info_cache = CachedBookInfoClient(self.books_client)
+        with mock.patch.object(self.books_client, 'fetch_book_info', side_effect=self._fake_book_info) as fetch:
+            result = batch.process()
+        return result, fetch
+    
+    def _run_batch_instance(self, workers=2, **kwargs):
+        """バッチを実行し、カウンタ参照用にバッチオブジェクトも返す"""
+        batch = BookImportBatch(workers=workers, **kwargs)
+        batch.initialize_clients = mock.Mock(return_value=True)
+        batch.sheets_client = self.sheets_client
+        batch.books_client = self.books_client
+        batch.book_info_cache = CachedBookInfoClient(self.books_client)
+        with mock.patch.object(self.books_client, 'fetch_book_info', side_effect=self._fake_book_info) as fetch:
+            result = batch.process()
+        return batch, result, fetch
+    
+    def _clear_import_results(self):
+        """前回実行の登録結果を削除"""
+        Book.objects.all().delete()
+        ErrorLog.objects.all().delete()
+        ImportRetryState.objects.all().delete()
+        SheetSyncState.objects.all().delete()
+        SheetRowFingerprint.objects.all().delete()
+        ImportRun.objects.all().delete()
+    
+    def test_process_with_workers(self):
+        """並列取得時も件数と書き戻し順が保たれるテスト"""
+        (success, error, skip), fetch = self._run_batch(workers=4)
+        
+        self.assertEqual((success, error, skip), (2, 2, 1))
+        self.assertEqual(fetch.call_count, 3)
+        self.sheets_client.mark_many_as_imported.assert_called_once_with([2, 5], sheet_name='Sheet1')
+        self.assertEqual(Book.objects.get(application_number='APP-001').price, 1980)
+        self.assertIn('book 9784873115658', Book.objects.get(application_number='APP-001').search_key)
+        self.assertEqual(Book.objects.get(application_number='APP-001').approval_date, date(2025, 10, 21))
+        self.assertEqual(
+            sorted(ErrorLog.objects.values_list('error_type', flat=True)),
+            ['BOOK_NOT_FOUND', 'INVALID_ISBN']
+        )
+    
+    def test_process_sequential_matches_parallel(self):
+        """逐次処理と並列処理で結果が一致するテスト"""
+        sequential, _ = self._run_batch(workers=1)
+        self._clear_import_results()
+        parallel, _ = self._run_batch(workers=8)
+        self.assertEqual(sequential, parallel)
+    
+    def test_failed_rows_deferred_until_due(self):
+        """失敗した行は再試行日時まで処理されないテスト"""
+        self._run_batch(workers=2)
+        state = ImportRetryState.objects.get(application_number='APP-005')
+        self.assertEqual((state.attempt_count, state.last_error_type), (1, 'BOOK_NOT_FOUND'))
+        
+        Book.objects.all().delete()
+        ErrorLog.objects.all().delete()
+        BookInfoCache.objects.all().delete()
+        (success, error, skip), fetch = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (2, 0, 1))
+        self.assertEqual(fetch.call_count, 2)
+        self.assertFalse(ErrorLog.objects.exists())
+    
+    def test_deferred_rows_not_read_in_full(self):
+        """再試行待ちの行は走査した列で除外され、全列取得されないテスト"""
+        self._run_batch(workers=2)
+        deferred_row = self.pending_rows[4]['row_index']
+        Book.objects.all().delete()
+        self.sheets_client.get_row_records.reset_mock()
+        
+        self._run_batch(workers=2)
+        
+        requested = [row for c in self.sheets_client.get_row_records.call_args_list for row in c.args[0]]
+        self.assertTrue(requested)
+        self.assertNotIn(deferred_row, requested)
+    
+    def test_retry_backoff_and_park(self):
+        """再試行間隔が倍増し、上限回数で保留されるテスト"""
+        row = self.pending_rows[4]
+        with self.settings(IMPORT_RETRY_MAX_ATTEMPTS=3):
+            batch = BookImportBatch()
+            batch.books_client = self.books_client
+            delays = []
+            for _ in range(3):
+                before = timezone.now()
+                batch._schedule_retry(SheetRow(**row), 'BOOK_NOT_FOUND')
+                state = ImportRetryState.objects.get(application_number='APP-005')
+                delays.append(round((state.next_attempt_at - before).total_seconds() / 60))
+        
+        self.assertEqual(delays, [60, 120, 240])
+        self.assertTrue(state.is_parked)
+        self.assertFalse(state.is_due('9784798121963', timezone.now() + timedelta(days=365)))
+        self.assertTrue(state.is_due('9784873115658'))
+    
+    def test_retry_state_cleared_on_success(self):
+        """ISBN修正後に取り込みが成功すると再試行状態が削除されるテスト"""
+        ImportRetryState.objects.create(
+            application_number='APP-005',
+            row_index=6,
+            isbn='9784798121963',
+            attempt_count=8,
+            last_error_type='BOOK_NOT_FOUND',
+            next_attempt_at=timezone.now() + timedelta(days=7),
+            is_parked=True
+        )
+        self.pending_rows[4]['isbn'] = '9784873117584'
+        (success, error, skip), _ = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (3, 1, 1))
+        self.assertFalse(ImportRetryState.objects.filter(application_number='APP-005').exists())
+    
+    def test_rate_limited_row_not_reported_as_not_found(self):
+        """レート制限された行はRATE_LIMITEDとして記録され再試行待ちにならないテスト"""
+        self.pending_rows.append(self._make_row(7, 'APP-006', '9784297127831'))
+        (success, error, skip), _ = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (2, 3, 1))
+        self.assertTrue(ErrorLog.objects.filter(application_number='APP-006', error_type='RATE_LIMITED').exists())
+        self.assertFalse(ImportRetryState.objects.filter(application_number='APP-006').exists())
+        self.assertFalse(BookInfoCache.objects.filter(isbn='9784297127831').exists())
+    
+    def test_repeated_errors_counted_on_one_row(self):
+        """実行をまたいで同じ行で同じエラーが発生すると発生回数が加算されるテスト"""
+        self.pending_rows.append(self._make_row(7, 'APP-006', '9784297127831'))
+        self._run_batch(workers=2)
+        self._run_batch(workers=2)
+        
+        log = ErrorLog.objects.get(application_number='APP-006')
+        self.assertEqual((log.error_type, log.occurrence_count), ('RATE_LIMITED', 2))
+        self.assertEqual(ErrorLog.objects.filter(application_number='APP-005').get().occurrence_count, 1)
+    
+    def test_duplicate_isbns_fetched_once(self):
+        """同じISBNの行は1回のAPI呼び出しで全行に割り当てられるテスト"""
+        self.pending_rows += [
+            self._make_row(7, 'APP-006', '978-4-87311-565-8'),
+            self._make_row(8, 'APP-007', '9784873115658'),
+        ]
+        batch, (success, error, skip), fetch = self._run_batch_instance(workers=4)
+        
+        self.assertEqual((success, error, skip), (4, 2, 1))
+        self.assertEqual(fetch.call_count, 3)
+        self.assertEqual((batch.lookup_unique_count, batch.lookup_total_count, batch.api_call_count), (3, 5, 3))
+        self.assertEqual(Book.objects.filter(title='Book 9784873115658').count(), 3)
+    
+    def test_run_history_recorded(self):
+        """実行ごとに段階別処理時間・API呼び出し数・レイテンシが記録されるテスト"""
+        latencies = [i / 100 for i in range(1, 21)]  # 10ms〜200ms
+        with mock.patch.object(self.books_client, 'pop_latencies', return_value=latencies):
+            self._run_batch(workers=2)
+        
+        run = ImportRun.objects.get()
+        self.assertEqual(run.status, 'error')
+        self.assertEqual((run.success_count, run.error_count, run.skip_count), (2, 2, 1))
+        self.assertEqual((run.scanned_rows, run.pending_rows, run.changed_rows), (5, 5, 0))
+        self.assertEqual((run.lookup_rows, run.lookup_unique_isbns, run.books_api_calls), (3, 3, 3))
+        self.assertEqual((run.lookup_p50_ms, run.lookup_p95_ms), (100.0, 190.0))
+        self.assertTrue({'sheets_read', 'lookup_wait', 'process', 'db_write', 'sheets_write'} <= set(run.stage_timings))
+        self.assertLessEqual(sum(run.stage_timings.values()), run.duration_seconds + 0.01)
+    
+    def test_failed_run_recorded(self):
+        """初期化に失敗した実行も履歴に残るテスト"""
+        batch = BookImportBatch(workers=1)
+        batch.initialize_clients = mock.Mock(return_value=False)
+        
+        self.assertEqual(batch.process(), (0, 1, 0))
+        run = ImportRun.objects.get()
+        self.assertEqual(run.status, 'failed')
+        self.assertIn('initialize', run.stage_timings)
+        self.assertIsNone(run.lookup_p50_ms)
+    
+    def test_dry_run_skips_writes(self):
+        """dry-runでは読み込みと書籍情報の取得のみ行い、書き込みを省略した件数を返すテスト"""
+        batch, (success, error, skip), fetch = self._run_batch_instance(workers=2, dry_run=True)
+        
+        self.assertEqual((success, error, skip), (2, 2, 1))
+        self.assertEqual(fetch.call_count, 3)
+        self.assertEqual((batch.projected_flag_rows, batch.projected_sheets_writes, batch.projected_error_logs), (2, 1, 2))
+        self.sheets_client.mark_many_as_imported.assert_not_called()
+        for model in (Book, ErrorLog, ImportRetryState, ImportRun, SheetSyncState, SheetRowFingerprint, BookInfoCache):
+            self.assertFalse(model.objects.exists(), model.__name__)
+    
+    def test_cached_book_info_skips_api(self):
+        """キャッシュ済みのISBNはAPIを呼ばないテスト"""
+        self._run_batch(workers=2)
+        self._clear_import_results()
+        (success, error, skip), fetch = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (2, 2, 1))
+        fetch.assert_not_called()
+    
+    def test_flags_flushed_every_k_rows(self):
+        """フラグが指定行数ごとにまとめて書き戻されるテスト"""
+        self._run_batch(workers=2, flush_every=1)
+        self.assertEqual(
+            [c.args[0] for c in self.sheets_client.mark_many_as_imported.call_args_list],
+            [[2], [5]]
+        )
+    
+    def test_flag_write_failure_recorded(self):
+        """フラグ書き戻し失敗がエラーとして記録されるテスト"""
+        self.sheets_client.mark_many_as_imported.return_value = [5]
+        (success, error, skip), _ = self._run_batch(workers=2)
+        self.assertEqual((success, error, skip), (2, 3, 1))
+        self.assertTrue(ErrorLog.objects.filter(error_type='SHEET_UPDATE_ERROR').exists())
+
+
+    def test_existing_application_number_skipped(self):
+        """登録済みの申請番号はスキップされフラグのみ書き戻されるテスト"""
+        Book.objects.create(application_number='APP-004', isbn='9784873119038', title='既存書籍')
+        (success, error, skip), _ = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (1, 2, 2))
+        self.assertEqual(Book.objects.get(application_number='APP-004').title, '既存書籍')
+        self.assertEqual(sorted(self.sheets_client.mark_many_as_imported.call_args.args[0]), [2, 5])
+    
+    def test_concurrently_registered_book_counted_as_skip(self):
+        """実行開始後に別の実行が登録した申請は成功ではなくスキップとして数えるテスト"""
+        with mock.patch.object(BookImportBatch, '_load_existing_application_numbers', return_value=set()):
+            Book.objects.create(application_number='APP-004', isbn='9784873119038', title='既存書籍')
+            (success, error, skip), _ = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (1, 2, 2))
+        self.assertEqual(Book.objects.get(application_number='APP-004').title, '既存書籍')
+        self.assertEqual(sorted(self.sheets_client.mark_many_as_imported.call_args.args[0]), [2, 5])
+    
+    def test_insert_retried_after_unique_conflict(self):
+        """確認後に同じ申請が登録されてユニーク制約に衝突した場合は確認からやり直すテスト"""
+        original = Book.objects.bulk_create
+        calls = []
+        
+        def conflict_once(books, *args, **kwargs):
+            calls.append(len(books))
+            if len(calls) == 1:
+                raise IntegrityError('Duplicate entry for key uniq_application_number')
+            return original(books, *args, **kwargs)
+        
+        with mock.patch.object(Book.objects, 'bulk_create', side_effect=conflict_once):
+            (success, error, skip), _ = self._run_batch(workers=1)
+        
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual((success, error, skip), (2, 2, 1))
+        self.assertEqual(Book.objects.count(), 2)
+    
+    def test_duplicate_rows_in_same_run(self):
+        """同一実行内の重複申請が1件のみ登録されるテスト"""
+        self.pending_rows.append(self._make_row(7, 'APP-001', '9784873115658'))
+        (success, error, skip), _ = self._run_batch(workers=2)
+        
+        self.assertEqual((success, error, skip), (2, 2, 2))
+        self.assertEqual(Book.objects.filter(application_number='APP-001').count(), 1)
+    
+    def test_steady_state_run_skips_imported_rows(self):
+        """取り込み済みで編集のない行は再処理されないテスト"""
+        self._run_batch(workers=2)
+        self._mark_imported(2, 5)
+        self.pending_rows = self.pending_rows[:1] + self.pending_rows[3:4]
+        self.sheets_client.get_row_records.reset_mock()
+        
+        batch, (success, error, skip), fetch = self._run_batch_instance()
+        
+        self.assertEqual((success, error, skip, batch.updated_count), (0, 0, 0, 0))
+        self.sheets_client.get_row_records.assert_not_called()
+        self.assertEqual(SheetSyncState.objects.get(sheet_name='Sheet1').high_water_row, 5)
+        self.assertEqual(
+            sorted(SheetRowFingerprint.objects.values_list('application_number', flat=True)),
+            ['APP-001', 'APP-004']
+        )
+    
+    def test_edited_imported_row_updates_book(self):
+        """取り込み後に価格・ISBNが修正された行が書籍に反映されるテスト"""
+        self._run_batch(workers=2)
+        self._mark_imported(2, 5)
+        self.pending_rows[0]['price'] = '2,500'
+        self.pending_rows[0]['approval_date'] = '2025年11月1日'
+        self.pending_rows[3]['isbn'] = '978-4-87311-758-4'
+        
+        batch, (success, error, skip), fetch = self._run_batch_instance()
+        
+        self.assertEqual(batch.updated_count, 2)
+        self.assertEqual(Book.objects.get(application_number='APP-001').price, 2500)
+        self.assertEqual(Book.objects.get(application_number='APP-001').approval_date, date(2025, 11, 1))
+        book = Book.objects.get(application_number='APP-004')
+        self.assertEqual((book.isbn, book.title), ('978-4-87311-758-4', 'Book 9784873117584'))
+        self.assertIn('book 9784873117584', book.search_key)
+        self.assertEqual([c.args[0] for c in fetch.call_args_list], ['9784873117584'])
+        
+        # 反映済みの編集は次回以降再処理されない
+        batch, _, _ = self._run_batch_instance()
+        self.assertEqual(batch.updated_count, 0)
+    
+    def test_edit_detected_after_fingerprint_save_failure(self):
+        """内容ハッシュを保存できなかった行は次回基準が作り直され、その後の編集が検知されるテスト"""
+        with mock.patch.object(SheetRowFingerprint.objects, 'bulk_create', side_effect=DatabaseError('deadlock')):
+            self._run_batch(workers=2)
+        self.assertFalse(SheetRowFingerprint.objects.exists())
+        self.assertEqual(SheetSyncState.objects.get(sheet_name='Sheet1').high_water_row, 1)
+        
+        self._mark_imported(2, 5)
+        self._run_batch_instance()
+        self.assertEqual(
+            sorted(SheetRowFingerprint.objects.values_list('application_number', flat=True)),
+            ['APP-001', 'APP-004']
+        )
+        
+        self.pending_rows[0]['price'] = '2,500'
+        batch, _, _ = self._run_batch_instance()
+        
+        self.assertEqual(batch.updated_count, 1)
+        self.assertEqual(Book.objects.get(application_number='APP-001').price, 2500)
+    
+    def test_edited_applicant_updates_book(self):
+        """取り込み後に申請者名・申請日が修正された行が書籍に反映されるテスト"""
+        self._run_batch(workers=2)
+        self._mark_imported(2, 5)
+        self.pending_rows[0]['applicant_name'] = '佐藤花子'
+        self.pending_rows[3]['application_date'] = '2025/09/15'
+        
+        batch, _, fetch = self._run_batch_instance()
+        
+        self.assertEqual(batch.updated_count, 2)
+        self.assertEqual(Book.objects.get(application_number='APP-001').applicant_name, '佐藤花子')
+        self.assertEqual(Book.objects.get(application_number='APP-004').application_date, date(2025, 9, 15))
+        fetch.assert_not_called()
+    
+    def test_first_sync_baselines_existing_rows(self):
+        """初回同期時は既存の取り込み済み行を編集として扱わず基準として保存するテスト"""
+        Book.objects.create(application_number='APP-001', isbn='9784873115658', title='既存書籍', price=1000)
+        self._mark_imported(2)
+        self.pending_rows.append(dict(self._make_row(7, 'APP-099', '9784873115658'), db_imported='✓'))
+        
+        batch, _, _ = self._run_batch_instance()
+        
+        self.assertEqual(batch.updated_count, 0)
+        self.assertEqual(Book.objects.get(application_number='APP-001').price, 1000)
+        self.assertEqual(
+            list(SheetRowFingerprint.objects.filter(application_number='APP-001').values_list('row_index', flat=True)),
+            [2]
+        )
+        self.assertFalse(SheetRowFingerprint.objects.filter(application_number='APP-099').exists())
+    
+    def test_lookups_start_before_scan_finishes(self):
+        """先頭の行の書籍情報取得がシートの読み込み完了前に投入されるテスト"""
+        events = []
+        scan_rows = self._scan_rows
+        
+        def tracking_scan_rows(sheet_name='Sheet1', **kwargs):
+            for row in scan_rows(sheet_name, **kwargs):
+                events.append(('scan', row.row_index))
+                yield row
+        
+        self.sheets_client.scan_rows.side_effect = tracking_scan_rows
+        batch = BookImportBatch(workers=2, chunk_size=1)
+        batch.initialize_clients = mock.Mock(return_value=True)
+        batch.sheets_client = self.sheets_client
+        batch.books_client = self.books_client
+        batch.book_info_cache = CachedBookInfoClient(self.books_client)
+        submit_lookups = batch._submit_lookups
+        batch._submit_lookups = lambda rows: (events.append(('submit', [r.row_index for r in rows])), submit_lookups(rows))
+        with mock.patch.object(self.books_client, 'fetch_book_info', side_effect=self._fake_book_info):
+            self.assertEqual(batch.process(), (2, 2, 1))
+        
+        self.assertEqual(events[:3], [('scan', 2), ('submit', [2]), ('scan', 3)])
+    
+    def test_books_inserted_in_chunks(self):
+        """書籍がチャンク単位で一括登録されるテスト"""
+        with mock.patch.object(Book.objects, 'bulk_create', wraps=Book.objects.bulk_create) as bulk_create:
+            self._run_batch(workers=2, chunk_size=1)
+        self.assertEqual(bulk_create.call_count, 2)
+        self.assertEqual(Book.objects.count(), 2)
+    
+    def test_shard_processes_only_its_rows(self):
+        """シャード指定時はその行範囲のみ処理し、同期状態をシャードに保存するテスト"""
+        shard = ImportShard.objects.create(sheet_name='Sheet1', start_row=2, end_row=4)
+        batch, (success, error, skip), fetch = self._run_batch_instance(shard=shard)
+        
+        self.assertEqual((success, error, skip), (1, 1, 1))
+        self.assertEqual(list(Book.objects.values_list('application_number', flat=True)), ['APP-001'])
+        self.sheets_client.scan_rows.assert_called_once_with('Sheet1', start_row=2, end_row=4)
+        shard.refresh_from_db()
+        self.assertEqual(shard.high_water_row, 4)
+        self.assertIsNotNone(shard.last_synced_at)
+        self.assertFalse(SheetSyncState.objects.exists())
+    
+    def test_shard_loads_only_its_fingerprints(self):
+        """シャード指定時はその行範囲の内容ハッシュのみ読み込むテスト"""
+        SheetRowFingerprint.objects.bulk_create([
+            SheetRowFingerprint(sheet_name='Sheet1', application_number=f'OLD-{row}', row_index=row, content_hash='x')
+            for row in (2, 4, 5, 100)
+        ])
+        shard = ImportShard.objects.create(sheet_name='Sheet1', start_row=2, end_row=4)
+        batch, _, _ = self._run_batch_instance(shard=shard)
+        
+        self.assertEqual(sorted(batch.fingerprints), ['OLD-2', 'OLD-4'])
+    
+    def test_failed_chunk_rolled_back_without_flags(self):
+        """コミットできなかったまとまりの書籍は登録されず、フラグも書き戻されないテスト"""
+        batch = BookImportBatch(workers=2, chunk_size=1)
+        batch.initialize_clients = mock.Mock(return_value=True)
+        batch.sheets_client = self.sheets_client
+        batch.books_client = self.books_client
+        batch.book_info_cache = CachedBookInfoClient(self.books_client)
+        flush_books = batch._flush_books
+        
+        def failing_flush_books():
+            # 4行目（APP-004）のまとまりで書籍登録後に失敗させる
+            flush_books()
+            if Book.objects.filter(application_number='APP-004').exists():
+                raise RuntimeError('Lost connection')
+        
+        batch._flush_books = failing_flush_books
+        with mock.patch.object(self.books_client, 'fetch_book_info', side_effect=self._fake_book_info):
+            batch.process()
+        
+        self.assertTrue(batch.failed)
+        self.assertEqual(list(Book.objects.values_list('application_number', flat=True)), ['APP-001'])
+        self.assertEqual(
+            [c.args[0] for c in self.sheets_client.mark_many_as_imported.call_args_list],
+            [[2]]
+        )
+        self.assertTrue(ErrorLog.objects.filter(error_type='BATCH_ERROR').exists())
+
+
+class StageTimerTests(TestCase):
+    """段階別タイマーのテスト"""
+    
+    def test_nested_stage_excluded_from_parent(self):
+        """内側の段階の時間が外側の段階に加算されないテスト"""
+        # 開始, outer開始, inner開始, inner終了, outer終了
+        with mock.patch('books.utils.stage_timer.time.perf_counter', side_effect=[0.0, 1.0, 3.0, 7.0, 8.0]):
+            timer = StageTimer()
+            with timer.stage('outer'):
+                with timer.stage('inner'):
+                    pass
+        
+        self.assertEqual(timer.as_dict(), {'outer': 3.0, 'inner': 4.0})
+    
+    def test_peak_memory_recorded_while_tracing(self):
+        """tracemallocの追跡中は段階ごとの確保メモリのピークが記録されるテスト"""
+        timer = StageTimer()
+        with timer.stage('untraced'):
+            pass
+        
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        with timer.stage('alloc'):
+            buffer = bytearray(4 * 1024 * 1024)
+            del buffer
+        
+        self.assertNotIn('untraced', timer.peak_memory)
+        self.assertGreaterEqual(timer.peak_memory['alloc'], 4 * 1024 * 1024)
+    
+    def test_percentile(self):
+        """最近傍順位法のパーセンタイルのテスト"""
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 95), 5)
+        self.assertIsNone(percentile([], 50))
+
+
+class ImportFromSheetsCommandTests(TestCase):
+    """取り込みコマンドのテスト"""
+    
+    def test_profile_writes_stats_and_report(self):
+        """--profileでpstats形式の統計と段階別レポートが出力されるテスト"""
+        prefix = os.path.join(tempfile.mkdtemp(), 'profile')
+        self.addCleanup(shutil.rmtree, os.path.dirname(prefix))
+        
+        out = StringIO()
+        with mock.patch.object(BookImportBatch, 'initialize_clients', return_value=False):
+            call_command('import_from_sheets', '--profile', '--profile-output', prefix, stdout=out)
+        
+        self.assertIn(f'Profile written to {prefix}.prof', out.getvalue())
+        self.assertGreater(pstats.Stats(f'{prefix}.prof').total_calls, 0)
+        with open(f'{prefix}.txt', encoding='utf-8') as report:
+            self.assertIn('initialize', report.read())
+    
+    def _call_import(self, *args):
+        """バッチ本体を差し替えて取り込みコマンドを実行"""
+        out = StringIO()
+        with mock.patch.object(BookImportBatch, 'process', return_value=(0, 0, 0)) as process:
+            call_command('import_from_sheets', *args, stdout=out)
+        return process, out.getvalue()
+    
+    def test_lock_held_during_run_and_released(self):
+        """実行中は取り込みロックを保持し、終了後に解放するテスト"""
+        held = []
+        with mock.patch.object(BookImportBatch, 'process', side_effect=lambda: held.append(ImportLock.objects.count()) or (0, 0, 0)):
+            call_command('import_from_sheets', stdout=StringIO())
+        
+        self.assertEqual(held, [1])
+        self.assertFalse(ImportLock.objects.exists())
+    
+    def test_overlapping_run_skipped_and_recorded(self):
+        """他の実行がロックを保持している場合は取り込まずにスキップとして記録するテスト"""
+        DatabaseLock.for_spreadsheet(GoogleSheetsClient().spreadsheet_id, owner='running-import').acquire()
+        process, output = self._call_import()
+        
+        process.assert_not_called()
+        self.assertIn('skipping this run', output)
+        self.assertEqual(ImportRun.objects.get().status, 'skipped')
+        self.assertEqual(ImportLock.objects.get().owner, 'running-import')
+    
+    def test_wait_queues_behind_running_import(self):
+        """--wait指定時は実行中の取り込みの終了を待ってから実行するテスト"""
+        running = DatabaseLock.for_spreadsheet(GoogleSheetsClient().spreadsheet_id, owner='running-import')
+        running.acquire()
+        
+        with mock.patch('books.management.commands.import_from_sheets.time.sleep', side_effect=lambda seconds: running.release()) as sleep:
+            process, _ = self._call_import('--wait', '60')
+        
+        sleep.assert_called_once()
+        process.assert_called_once()
+        self.assertFalse(ImportRun.objects.filter(status='skipped').exists())
+    
+    def test_skipped_while_shard_leased(self):
+        """シャードを処理中のワーカーがある場合はスキップとして記録するテスト"""
+        ImportShardQueue(shard_rows=10).plan(5)
+        ImportShardQueue(owner='worker-1').claim()
+        process, output = self._call_import()
+        
+        process.assert_not_called()
+        self.assertIn('skipping this run', output)
+        self.assertEqual(ImportLock.objects.get().owner, ImportShardQueue.SHEET_LOCK_OWNER)
+    
+    def test_dry_run_does_not_take_lock(self):
+        """dry-runは実行中の取り込みがあっても実行されるテスト"""
+        DatabaseLock.for_spreadsheet(GoogleSheetsClient().spreadsheet_id, owner='running-import').acquire()
+        process, _ = self._call_import('--dry-run')
+        process.assert_called_once()
+
+
+class FakeGoogleTests(TestCase):
+    """Google APIのオフライン代替のテスト"""
+    
+    def _books_client(self, **options):
+        """代替アダプターをマウントしたGoogle Booksクライアントを作成"""
+        session = requests.Session()
+        session.mount('https://', FakeBooksAdapter(**options))
+        limiter = AdaptiveRateLimiter(rate=100, min_rate=1, max_rate=100, increase_step=1, decrease_factor=0.5)
+        return GoogleBooksClient(api_key='dummy', session=session, limiter=limiter)
+    
+    def test_fake_sheets_service_round_trip(self):
+        """代替のSheetsサービスでページ読み込みとフラグ書き戻しができるテスト"""
+        service = FakeSheetsService(synthetic_rows(5, seed=1))
+        client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+        client.service = service
+        client.window_rows = 2
+        
+        rows = list(client.scan_rows())
+        self.assertEqual([row.row_index for row in rows], [2, 3, 4, 5, 6])
+        self.assertTrue(all(client.is_pending(row) for row in rows))
+        
+        self.assertEqual(client.mark_many_as_imported([2, 3]), [])
+        self.assertEqual([row.db_imported for row in client.scan_rows()], ['✓', '✓', '', '', ''])
+        self.assertEqual(service.request_counts['batchUpdate'], 1)
+    
+    def test_fake_sheets_service_injects_throttling(self):
+        """429の注入でHttpErrorが送出されるテスト"""
+        client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+        client.service = FakeSheetsService(synthetic_rows(3), throttle_rate=1.0)
+        
+        with self.assertRaises(HttpError) as raised:
+            client.get_rows([2])
+        self.assertEqual(raised.exception.resp.status, 429)
+    
+    def test_import_flags_non_default_sheet(self):
+        """既定以外のシートの取り込みで、そのシートにフラグが書き戻されるテスト"""
+        service = FakeSheetsService(synthetic_rows(3, seed=1))
+        service.add_sheet('申請2025', synthetic_rows(4, seed=2))
+        sheets_client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+        sheets_client.service = service
+        
+        batch = BookImportBatch(workers=1, sheet_name='申請2025', sheets_client=sheets_client, books_client=self._books_client())
+        self.assertEqual(batch.process(), (4, 0, 0))
+        
+        self.assertEqual([row[8] for row in service.sheets['申請2025']], ['✓'] * 4)
+        self.assertEqual([row[8] for row in service.sheets['Sheet1']], [''] * 3)
+        
+        # フラグが立った行は次回取り込まれない
+        batch = BookImportBatch(workers=1, sheet_name='申請2025', sheets_client=sheets_client, books_client=self._books_client())
+        self.assertEqual(batch.process(), (0, 0, 0))
+    
+    def test_fake_sheets_service_rejects_unknown_sheet(self):
+        """存在しないシートの範囲にはHTTP 400を返すテスト"""
+        client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+        client.service = FakeSheetsService(synthetic_rows(3))
+        
+        with self.assertRaises(HttpError) as raised:
+            client.get_rows([2], sheet_name='Other')
+        self.assertEqual(raised.exception.resp.status, 400)
+    
+    def test_fake_books_adapter_responses(self):
+        """代替のBooks APIが書籍情報・該当なし・429・503を返すテスト"""
+        status, book_info = self._books_client().lookup('9784873115658')
+        self.assertEqual(status, GoogleBooksClient.LOOKUP_FOUND)
+        self.assertEqual(book_info['title'], 'Book 9784873115658')
+        self.assertTrue(book_info['thumbnail_url'].startswith('https://'))
+        
+        self.assertEqual(self._books_client(not_found_rate=1.0).lookup('9784873115658')[0], GoogleBooksClient.LOOKUP_NOT_FOUND)
+        self.assertEqual(self._books_client(throttle_rate=1.0).lookup('9784873115658')[0], GoogleBooksClient.LOOKUP_THROTTLED)
+        self.assertEqual(self._books_client(error_rate=1.0).lookup('9784873115658')[0], GoogleBooksClient.LOOKUP_ERROR)
+    
+    def test_scan_rows_within_row_range(self):
+        """行範囲を指定した走査は終了行までのページのみ読み込むテスト"""
+        service = FakeSheetsService(synthetic_rows(10, seed=1))
+        client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+        client.service = service
+        client.window_rows = 3
+        
+        self.assertEqual(client.get_row_count(), 11)
+        rows = list(client.scan_rows(start_row=4, end_row=8))
+        self.assertEqual([row.row_index for row in rows], [4, 5, 6, 7, 8])
+        self.assertEqual(service.request_counts['batchGet'], 2)
+
+
+class BenchmarkImportCommandTests(TestCase):
+    """取り込みベンチマークコマンドのテスト"""
+    
+    def test_benchmark_reports_and_cleans_up(self):
+        """計測結果が出力され、各サイズの実行後に取り込んだデータのみ削除されるテスト"""
+        Book.objects.create(application_number='APP-001', isbn='9784873115658', title='既存書籍')
+        BookInfoCache.objects.create(isbn='9784873115658', title='既存書籍')
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir)
+        path = os.path.join(output_dir, 'benchmark.json')
+        
+        out = StringIO()
+        call_command(
+            'benchmark_import', '--rows', '20', '40', '--sheets-latency-ms', '0', '--books-latency-ms', '0',
+            '--json', path, stdout=out
+        )
+        
+        with open(path, encoding='utf-8') as output:
+            results = json.load(output)
+        self.assertEqual([result['rows'] for result in results], [20, 40])
+        for result in results:
+            self.assertEqual(result['success'] + result['error'] + result['skip'], result['rows'])
+            self.assertGreater(result['books_requests'], 0)
+            self.assertGreater(result['db_queries'], 0)
+            self.assertIn('lookup_wait', result['stage_timings'])
+        self.assertIn('rows/s', out.getvalue())
+        # 1回目の書籍情報キャッシュは2回目に持ち越さない
+        self.assertGreaterEqual(results[1]['books_requests'], len({row[6] for row in synthetic_rows(40, seed=1)}))
+        self.assertEqual(list(Book.objects.values_list('application_number', flat=True)), ['APP-001'])
+        self.assertEqual(list(BookInfoCache.objects.values_list('isbn', flat=True)), ['9784873115658'])
+        self.assertFalse(ImportRun.objects.exists())
+        self.assertFalse(SheetRowFingerprint.objects.exists())
+
+
+class DatabaseLockTests(TestCase):
+    """取り込みロックのテスト"""
+    
+    def test_only_one_owner_holds_lock(self):
+        """有効なロックは他の所有者が取得できないテスト"""
+        first = DatabaseLock('import:sheet', ttl_seconds=60, owner='worker-1')
+        second = DatabaseLock('import:sheet', ttl_seconds=60, owner='worker-2')
+        
+        self.assertTrue(first.acquire())
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        
+        first.release()
+        self.assertTrue(second.acquire())
+        self.assertEqual(ImportLock.objects.get(name='import:sheet').owner, 'worker-2')
+    
+    def test_expired_lock_taken_over(self):
+        """期限切れのロックは他の所有者が奪取でき、元の所有者は延長に失敗するテスト"""
+        first = DatabaseLock('import:sheet', ttl_seconds=60, owner='worker-1')
+        second = DatabaseLock('import:sheet', ttl_seconds=60, owner='worker-2')
+        first.acquire()
+        ImportLock.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.refresh())
+        self.assertFalse(first.is_held)
+        
+        # 元の所有者の解放で他の所有者のロックは削除されない
+        first.release()
+        self.assertTrue(ImportLock.objects.filter(owner='worker-2').exists())
+    
+    def test_heartbeat_refreshes_held_lease(self):
+        """延長スレッドが保持中のロック・リースのみ有効期限の1/3ごとに延長し、停止後は延長しないテスト"""
+        refreshed = threading.Event()
+        lease = mock.Mock(ttl=timedelta(seconds=0.03), is_held=True)
+        lease.refresh.side_effect = refreshed.set
+        heartbeat = Heartbeat(lease)
+        
+        heartbeat.start()
+        self.assertTrue(refreshed.wait(5))
+        heartbeat.stop()
+        calls = lease.refresh.call_count
+        time.sleep(0.05)
+        self.assertEqual(lease.refresh.call_count, calls)
+
+
+class ImportShardQueueTests(TestCase):
+    """取り込みシャードのリースのテスト"""
+    
+    def test_plan_creates_missing_shards(self):
+        """シートの行数まで既存のシャードの続きから作成されるテスト"""
+        queue = ImportShardQueue(shard_rows=1000, owner='worker-1')
+        self.assertEqual(queue.plan(2500), 3)
+        self.assertEqual(queue.plan(2500), 0)
+        
+        # シャード行数を変えても行範囲は重ならない
+        self.assertEqual(ImportShardQueue(shard_rows=500, owner='worker-2').plan(3600), 2)
+        self.assertEqual(
+            list(ImportShard.objects.values_list('start_row', 'end_row')),
+            [(2, 1001), (1002, 2001), (2002, 3001), (3002, 3501), (3502, 4001)]
+        )
+    
+    def test_workers_claim_distinct_shards(self):
+        """リース中のシャードは他のワーカーに渡されず、解放後は次回処理可能日時まで待つテスト"""
+        ImportShardQueue(shard_rows=10).plan(21)
+        first = ImportShardQueue(ttl_seconds=60, owner='worker-1')
+        second = ImportShardQueue(ttl_seconds=60, owner='worker-2')
+        
+        shards = [first.claim(), second.claim()]
+        self.assertEqual(sorted(shard.start_row for shard in shards), [2, 12])
+        self.assertIsNone(ImportShardQueue(owner='worker-3').claim())
+        
+        first.release(available_at=timezone.now() + timedelta(minutes=5))
+        self.assertFalse(first.is_held)
+        self.assertIsNone(ImportShardQueue(owner='worker-3').claim())
+        self.assertEqual(ImportShard.objects.get(start_row=2).run_count, 1)
+    
+    def test_expired_lease_reclaimed(self):
+        """期限切れのリースは他のワーカーが取得し、元の所有者は延長・解放できないテスト"""
+        ImportShardQueue(shard_rows=10).plan(5)
+        first = ImportShardQueue(ttl_seconds=60, owner='worker-1')
+        second = ImportShardQueue(ttl_seconds=60, owner='worker-2')
+        first.claim()
+        self.assertTrue(first.refresh())
+        ImportShard.objects.update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        
+        self.assertEqual(second.claim().start_row, 2)
+        self.assertFalse(first.refresh())
+        first.release()
+        self.assertEqual(ImportShard.objects.get().owner, 'worker-2')
+    
+    def test_leases_and_sheet_import_share_lock(self):
+        """リース中は取り込みロックを共有して保持し、シャードを使わない取り込みと排他されるテスト"""
+        ImportShardQueue(shard_rows=10).plan(21)
+        first = ImportShardQueue(ttl_seconds=60, owner='worker-1')
+        second = ImportShardQueue(ttl_seconds=60, owner='worker-2')
+        sheet_import = DatabaseLock.for_spreadsheet(GoogleSheetsClient().spreadsheet_id, owner='cron')
+        
+        first.claim()
+        self.assertIsNotNone(second.claim())
+        self.assertFalse(sheet_import.acquire())
+        
+        # 最後のリースが解放されるまでロックは残る
+        first.release()
+        self.assertFalse(sheet_import.acquire())
+        second.release()
+        self.assertFalse(ImportLock.objects.exists())
+        
+        # シャードを使わない取り込みの実行中はリースしない
+        self.assertTrue(sheet_import.acquire())
+        self.assertIsNone(first.claim())
+        self.assertFalse(ImportShard.objects.exclude(owner='').exists())
+
+
+class ImportWorkerCommandTests(TestCase):
+    """常駐ワーカーコマンドのテスト"""
+    
+    def _call_worker(self, **options):
+        """バッチを差し替えてワーカーを実行"""
+        out = StringIO()
+        with mock.patch('books.management.commands.import_worker.BookImportBatch') as batch_class:
+            batch_class.return_value.process.return_value = (1, 0, 0)
+            batch_class.return_value.updated_count = 0
+            batch_class.return_value.deferred_count = 0
+            call_command('import_worker', interval=0, jitter=0, stdout=out, **options)
+        return batch_class, out.getvalue()
+    
+    def test_runs_and_reuses_sheets_client(self):
+        """指定回数実行し、Sheetsクライアントを使い回してロックを解放するテスト"""
+        batch_class, output = self._call_worker(max_runs=2)
+        
+        self.assertEqual(batch_class.return_value.process.call_count, 2)
+        sheets_clients = {c.kwargs['sheets_client'] for c in batch_class.call_args_list}
+        self.assertEqual(len(sheets_clients), 1)
+        self.assertIn('Run #2', output)
+        self.assertFalse(ImportLock.objects.exists())
+    
+    def test_stands_by_while_lock_held(self):
+        """他のワーカーがロックを保持している間は取り込みを行わないテスト"""
+        DatabaseLock.for_spreadsheet(GoogleSheetsClient().spreadsheet_id, owner='other-worker').acquire()
+        
+        acquire = DatabaseLock.acquire
+        
+        def acquire_once(lock):
+            # 1回目の取得を試みた後に停止を要求
+            os.kill(os.getpid(), signal.SIGTERM)
+            return acquire(lock)
+        
+        with mock.patch.object(DatabaseLock, 'acquire', autospec=True, side_effect=acquire_once):
+            batch_class, _ = self._call_worker()
+        
+        batch_class.return_value.process.assert_not_called()
+        self.assertEqual(ImportLock.objects.get().owner, 'other-worker')
+    
+    def test_sharded_runs_claim_each_shard(self):
+        """シャード指定時はシャードごとに取り込み、処理後にリースを解放するテスト"""
+        with mock.patch.object(GoogleSheetsClient, 'get_row_count', return_value=5):
+            batch_class, output = self._call_worker(shard_rows=2, max_runs=2)
+        
+        self.assertEqual(
+            [(c.kwargs['shard'].start_row, c.kwargs['shard'].end_row) for c in batch_class.call_args_list],
+            [(2, 3), (4, 5)]
+        )
+        self.assertIn('Run #2 (rows 4-5)', output)
+        self.assertFalse(ImportShard.objects.exclude(owner='').exists())
+        self.assertFalse(ImportLock.objects.exists())
+    
+    def test_sigterm_stops_after_current_run(self):
+        """SIGTERM受信後は実行中の取り込みを終えてから終了するテスト"""
+        def process():
+            os.kill(os.getpid(), signal.SIGTERM)
+            return (1, 0, 0)
+        
+        with mock.patch('books.management.commands.import_worker.BookImportBatch') as batch_class:
+            batch_class.return_value.process.side_effect = process
+            batch_class.return_value.updated_count = 0
+            batch_class.return_value.deferred_count = 0
+            call_command('import_worker', interval=0, jitter=0, stdout=StringIO())
+        
+        self.assertEqual(batch_class.return_value.process.call_count, 1)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+
+
+class SheetDateTests(TestCase):
+    """スプレッドシートの日付の解析のテスト"""
+    
+    def test_parse_sheet_date_formats(self):
+        """よく使われる日付の形式を解析できるテスト"""
+        for value in ['2025/10/20', '2025-10-20', '2025.10.20', '2025年10月20日', '２０２５／１０／２０', '2025/10/20 10:30:00', '20251020', '45950']:
+            self.assertEqual(parse_sheet_date(value), date(2025, 10, 20), value)
+        self.assertEqual(parse_sheet_date('2025/1/5'), date(2025, 1, 5))
+    
+    def test_parse_sheet_date_invalid(self):
+        """解析できない値はNoneになるテスト"""
+        for value in ['', '  ', None, '未定', '2025/13/01', '2025/02/30', '2025/10/20頃']:
+            self.assertIsNone(parse_sheet_date(value), value)
+
+
+class GoogleSheetsClientTests(TestCase):
+    """Google Sheets APIクライアントのテスト"""
+    
+    def setUp(self):
+        """テストデータのセットアップ"""
+        self.client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+        self.client.service = mock.MagicMock()
+        self.batch_update = self.client.service.spreadsheets.return_value.values.return_value.batchUpdate
+    
+    def _use_fake_sheet(self, rows):
+        """batchGetが指定範囲の値を返すようにする（rowsは2行目からのA〜I列の値リスト）"""
+        batch_get = self.client.service.spreadsheets.return_value.values.return_value.batchGet
+        
+        def trim(values):
+            while values and not values[-1]:
+                values = values[:-1]
+            return values
+        
+        def value_range(a1, major_dimension):
+            start_col, start, end_col, end = re.match(r'.*!([A-I])(\d+):([A-I])(\d+)$', a1).groups()
+            cols = range(ord(start_col) - ord('A'), ord(end_col) - ord('A') + 1)
+            cells = [
+                [(rows[r - 2][c] if c < len(rows[r - 2]) else '') for c in cols] if r - 2 < len(rows) else []
+                for r in range(int(start), int(end) + 1)
+            ]
+            if major_dimension == 'COLUMNS':
+                values = [trim([row[0] if row else '' for row in cells])]
+            else:
+                values = [trim(row) for row in cells]
+            values = trim(values)
+            return {'range': a1, 'values': values} if values else {'range': a1}
+        
+        def fake_batch_get(spreadsheetId, ranges, majorDimension):
+            request = mock.Mock()
+            request.execute.return_value = {'valueRanges': [value_range(a1, majorDimension) for a1 in ranges]}
+            return request
+        
+        batch_get.side_effect = fake_batch_get
+        return batch_get
+    
+    def test_get_pending_rows_fetches_only_pending_rows(self):
+        """判定に必要な列のみで対象行を特定し、対象行のみ全列取得されるテスト"""
+        # 2・3・4行目が未取り込み、5行目は取り込み済み、6行目は未承認、7行目は承認日なし
+        batch_get = self._use_fake_sheet([
+            ['APP-001', '田中', '山田', '2025/09/30', '2025/10/01', 'Book1', '9784873115658', '3000'],
+            ['APP-002', '鈴木', '山田', '2025/09/30', '2025/10/02', 'Book2', '9784798121963'],
+            ['APP-003', '高橋', '佐藤', '2025/09/30', '2025/10/03', 'Book3', '9784297127831', '2500'],
+            ['APP-004', '伊藤', '山田', '2025/09/30', '2025/10/04', 'Book4', '9784873119038', '', '✓'],
+            ['APP-005', '渡辺', '', '2025/09/30', '2025/10/05'],
+            ['APP-006', '小林', '山田', '2025/09/30'],
+        ])
+        
+        self.client.window_rows = 1000
+        rows = self.client.get_pending_rows()
+        
+        self.assertEqual([r.row_index for r in rows], [2, 3, 4])
+        self.assertEqual(rows[1].price, '')
+        self.assertEqual(rows[2].application_number, 'APP-003')
+        projection, _, full_rows = batch_get.call_args_list
+        self.assertEqual(
+            projection.kwargs['ranges'],
+            [f'Sheet1!{column}2:{column}1001' for column in 'ABCDEGHI']
+        )
+        self.assertEqual(projection.kwargs['majorDimension'], 'COLUMNS')
+        self.assertEqual(full_rows.kwargs['ranges'], ['Sheet1!A2:I4'])
+    
+    def test_iter_rows_pages_through_sheet(self):
+        """固定行数のページ単位で読み込まれ、行レコードが順に返されるテスト"""
+        batch_get = self._use_fake_sheet([[f'APP-{i:03d}', '申請者', '承認者'] for i in range(1, 8)])
+        self.client.window_rows = 3
+        
+        rows = self.client.iter_rows()
+        first = next(rows)
+        
+        # 最初の行は1ページ目の取得のみで返される
+        self.assertEqual((first.row_index, first.application_number, first.isbn), (2, 'APP-001', ''))
+        self.assertEqual(batch_get.call_count, 1)
+        self.assertEqual([row.row_index for row in rows], [3, 4, 5, 6, 7, 8])
+        self.assertEqual(
+            [c.kwargs['ranges'] for c in batch_get.call_args_list],
+            [['Sheet1!A2:I4'], ['Sheet1!A5:I7'], ['Sheet1!A8:I10'], ['Sheet1!A11:I13']]
+        )
+        self.assertFalse(hasattr(first, '__dict__'))
+    
+    def test_fingerprint_ignores_flag_and_whitespace(self):
+        """内容ハッシュが取り込み済みフラグ・前後の空白の影響を受けないテスト"""
+        row = {'approver_name': '山田', 'approval_date': '2025/10/01', 'isbn': '9784873115658', 'price': '3000'}
+        self.assertEqual(
+            GoogleSheetsClient.fingerprint(SheetRow(2, **row)),
+            GoogleSheetsClient.fingerprint(SheetRow(2, **dict(row, isbn=' 9784873115658 ', db_imported='✓')))
+        )
+        self.assertNotEqual(
+            GoogleSheetsClient.fingerprint(SheetRow(2, **row)),
+            GoogleSheetsClient.fingerprint(SheetRow(2, **dict(row, price='3500')))
+        )
+    
+    def test_get_rows_splits_batch_get(self):
+        """範囲数が上限を超える場合はbatchGetが分割されるテスト"""
+        batch_get = self.client.service.spreadsheets.return_value.values.return_value.batchGet
+        batch_get.return_value.execute.side_effect = lambda: {
+            'valueRanges': [{'values': [['APP']]} for _ in batch_get.call_args.kwargs['ranges']]
+        }
+        
+        with mock.patch.object(GoogleSheetsClient, 'BATCH_GET_MAX_RANGES', 2):
+            rows = self.client.get_rows([2, 4, 6, 8, 10])
+        
+        self.assertEqual(batch_get.call_count, 3)
+        self.assertEqual(sorted(rows), [2, 4, 6, 8, 10])
+    
+    def test_authenticate_reuses_discovery_document(self):
+        """ディスカバリードキュメントがプロセス内で1回だけ読み込まれるテスト"""
+        _load_discovery_document.cache_clear()
+        self.addCleanup(_load_discovery_document.cache_clear)
+        
+        with mock.patch(
+            'googleapiclient.discovery_cache.get_static_doc',
+            wraps=get_static_doc
+        ) as static_doc:
+            for _ in range(2):
+                client = GoogleSheetsClient(api_key='dummy', spreadsheet_id='sheet-id')
+                client.authenticate()
+                self.assertTrue(hasattr(client.service, 'spreadsheets'))
+        
+        static_doc.assert_called_once_with('sheets', 'v4')
+    
+    def test_batch_get_http_error_is_raised(self):
+        """遅延インポートしたHttpErrorがそのまま送出されるテスト"""
+        batch_get = self.client.service.spreadsheets.return_value.values.return_value.batchGet
+        batch_get.return_value.execute.side_effect = HttpError(mock.Mock(status=500), b'error')
+        
+        with self.assertRaises(HttpError):
+            self.client.get_rows([2])
+    
+    def test_merge_row_ranges(self):
+        """連続行が範囲にまとめられるテスト"""
+        self.assertEqual(
+            GoogleSheetsClient._merge_row_ranges([9, 2, 3, 4, 7, 10, 3]),
+            [(2, 4), (7, 7), (9, 10)]
+        )
+    
+    def test_mark_many_as_imported_single_request(self):
+        """複数行のフラグが1回のbatchUpdateで送信されるテスト"""
+        self.batch_update.return_value.execute.return_value = {
+            'responses': [{'updatedRange': 'Sheet1!I2:I4'}, {'updatedRange': 'Sheet1!I7'}]
+        }
+        failed = self.client.mark_many_as_imported([2, 3, 4, 7])
+        
+        self.assertEqual(failed, [])
+        self.batch_update.assert_called_once()
+        data = self.batch_update.call_args.kwargs['body']['data']
+        self.assertEqual([d['range'] for d in data], ['Sheet1!I2:I4', 'Sheet1!I7'])
+        self.assertEqual(data[0]['values'], [['✓'], ['✓'], ['✓']])
+    
+    @mock.patch('books.utils.google_sheets_client.time.sleep')
+    def test_mark_many_as_imported_retries_missing_ranges(self, sleep):
+        """未更新の範囲のみリトライされるテスト"""
+        self.batch_update.return_value.execute.side_effect = [
+            {'responses': [{'updatedRange': 'Sheet1!I2:I3'}]},
+            {'responses': [{'updatedRange': 'Sheet1!I7'}]},
+        ]
+        failed = self.client.mark_many_as_imported([2, 3, 7])
+        
+        self.assertEqual(failed, [])
+        self.assertEqual(self.batch_update.call_count, 2)
+        retried = self.batch_update.call_args.kwargs['body']['data']
+        self.assertEqual([d['range'] for d in retried], ['Sheet1!I7'])
+    
+    @mock.patch('books.utils.google_sheets_client.time.sleep')
+    def test_mark_many_as_imported_gives_up(self, sleep):
+        """リトライ上限を超えた行が返されるテスト"""
+        self.batch_update.return_value.execute.return_value = {'responses': []}
+        failed = self.client.mark_many_as_imported([5, 6])
+        
+        self.assertEqual(failed, [5, 6])
+        self.assertEqual(self.batch_update.call_count, GoogleSheetsClient.WRITE_MAX_RETRIES)
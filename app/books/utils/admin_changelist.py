@@ -0,0 +1,236 @@
+"""
+件数の多いテーブル向けの管理画面一覧
+
+EstimatedCountPaginatorは一覧の件数を閾値（settings.ADMIN_COUNT_ESTIMATE_THRESHOLD）までしか数えず、
+絞り込みのない一覧ではMySQLのテーブル統計の推定行数を使う。
+KeysetChangeListは「次へ」「前へ」のリンクに前のページの最後（最初）の行の並び順の値を持たせ、
+OFFSETではなくその値より後（前）の行を読む（キーセットページング）。キーセットページングが使える一覧では
+ページ番号のリンクを表示せず、位置のないページ番号の指定（?p=N）もOFFSETで読まずに先頭のページを表示する。
+"""
+
+from django.conf import settings
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# キーセットページングの位置を渡すクエリパラメータ（"after_<主キー>_<値>" または "before_<主キー>_<値>"）
+CURSOR_VAR = 'cursor'
+
+
+def estimate_table_rows(model, using='default'):
+    """
+    テーブルの推定行数を取得（MySQLのinformation_schema.TABLES.TABLE_ROWS）
+    
+    InnoDBの統計情報による概算値で、information_schema_stats_expiryの間キャッシュされるため実際の行数とずれることがある。
+    
+    Args:
+        model: モデルクラス
+        using: DBエイリアス
+    
+    Returns:
+        推定行数（MySQL以外のDB、または取得できない場合None）
+    """
+    connection = connections[using]
+    if connection.vendor != 'mysql':
+        return None
+    
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """件数を閾値までしか数えないページネーター（閾値を超える場合は推定値、estimatedがTrueになる）"""
+    
+    estimated = False
+    
+    @cached_property
+    def count(self):
+        """
+        件数（閾値を超える場合は推定値）
+        
+        絞り込みのない一覧はMySQLのテーブルの推定行数が閾値以上であればCOUNTを実行しない。
+        それ以外は閾値+1件までを数え、閾値を超えた場合は閾値+1件とする。
+        """
+        threshold = getattr(settings, 'ADMIN_COUNT_ESTIMATE_THRESHOLD', 10000)
+        queryset = self.object_list
+        if threshold <= 0:
+            return super().count
+        
+        if not queryset.query.has_filters():
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= threshold:
+                self.estimated = True
+                return estimate
+        
+        count = queryset.order_by()[:threshold + 1].count()
+        if count > threshold:
+            self.estimated = True
+        return count
+    
+    def page(self, number):
+        """
+        ページを取得（件数が推定値の場合は最終ページを超えるページ番号でもエラーにせず、空のページを返す）
+        
+        Args:
+            number: ページ番号（1始まり）
+        
+        Returns:
+            ページ
+        """
+        if not self.count or not self.estimated:
+            return super().page(number)
+        
+        number = max(1, int(number))
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class KeysetChangeList(ChangeList):
+    """
+    キーセットページングの一覧
+    
+    並び順が(フィールド, 主キー)または主キーのみで、フィールドがNULLを許可しない場合に使用する
+    （例: -last_seen_at, -pk）。この場合は「最初へ」「前へ」「次へ」のみで移動する（keyset_pagingがTrue）。
+    それ以外の並び順や「すべて表示」ではページ番号のリンクを表示し、OFFSETで読む。
+    """
+    
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR, '')
+        self.keyset_paging = False
+        self.keyset_first_url = None
+        self.keyset_previous_url = None
+        self.keyset_next_url = None
+        super().__init__(request, *args, **kwargs)
+    
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+    
+    def get_query_string(self, new_params=None, remove=None):
+        # 並び替え・絞り込み・ページ番号のリンクには現在の位置を引き継がない
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+    
+    def get_results(self, request):
+        super().get_results(request)
+        keyset = self._get_keyset()
+        if keyset is None or (self.show_all and self.can_show_all) or not self.multi_page:
+            return
+        
+        self.keyset_paging = True
+        position = self._decode_cursor(keyset)
+        if position is not None:
+            self.result_list = self._seek(keyset, *position)
+        elif self.page_num > 1:
+            # 位置のないページ番号の指定は後ろのページほど遅いOFFSETで読まず、先頭のページを表示する
+            self.page_num = 1
+            self.result_list = self.queryset[:self.list_per_page]
+        
+        rows = list(self.result_list)
+        if not rows:
+            return
+        if self.page_num > 1:
+            self.keyset_first_url = self.get_query_string(remove=[PAGE_VAR])
+            self.keyset_previous_url = self.get_query_string({
+                PAGE_VAR: self.page_num - 1,
+                CURSOR_VAR: self._encode_cursor('before', keyset, rows[0]),
+            })
+        if len(rows) >= self.list_per_page and (self.paginator.estimated or self.page_num < self.paginator.num_pages):
+            self.keyset_next_url = self.get_query_string({
+                PAGE_VAR: self.page_num + 1,
+                CURSOR_VAR: self._encode_cursor('after', keyset, rows[-1]),
+            })
+    
+    def _get_keyset(self):
+        """
+        現在の並び順がキーセットページングに使えるか判定
+        
+        Returns:
+            (主キー以外の並び順のフィールドのリスト（0または1個）, 降順かどうか)（使えない場合None）
+        """
+        ordering = self.queryset.query.order_by
+        if not ordering or not all(isinstance(part, str) for part in ordering):
+            return None
+        *leading, last = ordering
+        if last.lstrip('-') != 'pk' or len(leading) > 1:
+            return None
+        
+        descending = last.startswith('-')
+        fields = []
+        for part in leading:
+            if part.startswith('-') != descending:
+                return None
+            try:
+                field = self.lookup_opts.get_field(part.lstrip('-'))
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete or field.is_relation or field.null:
+                return None
+            fields.append(field)
+        return fields, descending
+    
+    def _encode_cursor(self, direction, keyset, obj):
+        """行の並び順の値から位置を作成"""
+        fields, _ = keyset
+        value = fields[0].value_to_string(obj) if fields else ''
+        return f'{direction}_{obj.pk}_{value}'
+    
+    def _decode_cursor(self, keyset):
+        """
+        クエリパラメータの位置を解析
+        
+        Returns:
+            (方向, 並び順の値, 主キー)（指定がない、または不正な場合None）
+        """
+        parts = self.cursor.split('_', 2)
+        if len(parts) != 3 or parts[0] not in ('after', 'before'):
+            return None
+        
+        direction, raw_pk, raw_value = parts
+        fields, _ = keyset
+        try:
+            pk = self.lookup_opts.pk.to_python(raw_pk)
+            value = fields[0].to_python(raw_value) if fields else None
+        except ValidationError:
+            return None
+        if pk is None or (fields and value is None):
+            return None
+        return direction, value, pk
+    
+    def _seek(self, keyset, direction, value, pk):
+        """
+        位置の後（前）の1ページ分の行を読む
+        
+        Args:
+            keyset: _get_keysetの結果
+            direction: 'after'（次のページ）または'before'（前のページ）
+            value: 位置の行の並び順の値
+            pk: 位置の行の主キー
+        
+        Returns:
+            1ページ分のクエリセット
+        """
+        fields, descending = keyset
+        forward = direction == 'after'
+        # 降順の次のページ・昇順の前のページは位置より小さい値の側
+        op = 'lt' if descending == forward else 'gt'
+        condition = Q(**{f'pk__{op}': pk})
+        if fields:
+            name = fields[0].name
+            condition = Q(**{f'{name}__{op}': value}) | (Q(**{name: value}) & condition)
+        
+        queryset = self.queryset.filter(condition)
+        if forward:
+            return queryset[:self.list_per_page]
+        
+        # 前のページは逆順に読んでから、表示の並び順で読み直す
+        pks = list(queryset.reverse().values_list('pk', flat=True)[:self.list_per_page])
+        return self.queryset.filter(pk__in=pks)
@@ -0,0 +1,153 @@
+"""
+ISBN書籍情報キャッシュ
+
+Google Books APIの前段にDBキャッシュ（book_info_cacheテーブル）を置き、
+同じISBNの再検索でAPIを呼ばないようにする読み通し（read-through）キャッシュ
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, Tuple
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from books.models import BookInfoCache
+from .google_books_client import GoogleBooksClient, get_shared_client
+
+logger = logging.getLogger(__name__)
+
+
+class CachedBookInfoClient:
+    """DBキャッシュ付きGoogle Books APIクライアント"""
+    
+    def __init__(self, books_client: Optional[GoogleBooksClient] = None):
+        """
+        初期化
+        
+        Args:
+            books_client: Google Books APIクライアント（省略時はプロセス内の共有クライアント）
+        """
+        self.books_client = books_client or get_shared_client()
+        self.ttl = timedelta(days=getattr(settings, 'GOOGLE_BOOKS_CACHE_TTL_DAYS', 30))
+        self.negative_ttl = timedelta(hours=getattr(settings, 'GOOGLE_BOOKS_NEGATIVE_CACHE_TTL_HOURS', 24))
+    
+    def get_book_info_by_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """
+        ISBNコードから書籍情報を取得（キャッシュ優先）
+        
+        Args:
+            isbn: ISBNコード（ハイフン付きも可）
+        
+        Returns:
+            書籍情報の辞書、該当書籍なし・取得失敗時はNone
+        """
+        return self.lookup(isbn)[1]
+    
+    def lookup(self, isbn: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        ISBNコードから書籍情報を取得し、結果の種別と合わせて返す（キャッシュ優先）
+        
+        Args:
+            isbn: ISBNコード（ハイフン付きも可）
+        
+        Returns:
+            (結果の種別 GoogleBooksClient.LOOKUP_*, 書籍情報)
+        """
+        isbn = self.books_client.normalize_isbn(isbn)
+        cached = self.get_cached([isbn])
+        if isbn in cached:
+            book_info = cached[isbn]
+            return (GoogleBooksClient.LOOKUP_FOUND if book_info else GoogleBooksClient.LOOKUP_NOT_FOUND), book_info
+        
+        fetched_at = timezone.now()
+        status, book_info = self.fetch(isbn)
+        if self.is_cacheable(status):
+            self.store({isbn: book_info}, fetched_at=fetched_at)
+        return status, book_info
+    
+    def get_cached(self, isbns: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        有効期限内のキャッシュをまとめて取得（1クエリ）
+        
+        Args:
+            isbns: 正規化済みISBNコードのリスト
+        
+        Returns:
+            ISBNをキー、書籍情報を値とする辞書（ネガティブキャッシュの値はNone、未キャッシュのISBNは含まない）
+        """
+        isbns = set(isbns)
+        if not isbns:
+            return {}
+        
+        return {
+            entry.isbn: entry.to_book_info()
+            for entry in BookInfoCache.objects.filter(isbn__in=isbns)
+            if entry.is_fresh(self.ttl, self.negative_ttl)
+        }
+    
+    def fetch(self, isbn: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Google Books APIから書籍情報を取得（DBには触れないためスレッドから呼び出し可能）
+        
+        Args:
+            isbn: 正規化済みISBNコード
+        
+        Returns:
+            (結果の種別 GoogleBooksClient.LOOKUP_*, 書籍情報)
+        """
+        return self.books_client.lookup(isbn)
+    
+    @staticmethod
+    def is_cacheable(status: str) -> bool:
+        """
+        キャッシュしてよい結果かどうか（レート制限・通信エラーは一時的な失敗のためキャッシュしない）
+        
+        Args:
+            status: 結果の種別
+        
+        Returns:
+            キャッシュしてよい場合True
+        """
+        return status in (GoogleBooksClient.LOOKUP_FOUND, GoogleBooksClient.LOOKUP_NOT_FOUND)
+    
+    def store(self, results: Dict[str, Optional[Dict[str, Any]]], fetched_at: Optional[datetime] = None) -> None:
+        """
+        取得結果をキャッシュに保存（既存エントリは上書き。ただしfetched_atより後に取得されたエントリは残す）
+        
+        Args:
+            results: 正規化済みISBNをキー、書籍情報（該当なしはNone）を値とする辞書
+            fetched_at: 取得日時（省略時は現在日時）
+        """
+        if not results:
+            return
+        
+        fetched_at = fetched_at or timezone.now()
+        options = {
+            'update_conflicts': True,
+            'update_fields': ['is_found', 'fetched_at'] + BookInfoCache.BOOK_INFO_FIELDS,
+        }
+        # MySQLのON DUPLICATE KEY UPDATEは対象列を指定できない
+        if connection.features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['isbn']
+        
+        try:
+            with transaction.atomic():
+                # 保存が取得と逆の順序になった場合に、後から取得された結果を古い結果で上書きしない
+                newer = {
+                    isbn for isbn, entry_fetched_at in
+                    BookInfoCache.objects.select_for_update().filter(isbn__in=list(results)).values_list('isbn', 'fetched_at')
+                    if entry_fetched_at > fetched_at
+                }
+                entries = []
+                for isbn, book_info in results.items():
+                    if isbn in newer:
+                        continue
+                    entry = BookInfoCache(isbn=isbn, is_found=book_info is not None, fetched_at=fetched_at)
+                    for field in BookInfoCache.BOOK_INFO_FIELDS:
+                        setattr(entry, field, (book_info or {}).get(field, ''))
+                    entries.append(entry)
+                if entries:
+                    BookInfoCache.objects.bulk_create(entries, **options)
+        except Exception as e:
+            # キャッシュ保存の失敗で本処理を止めない
+            logger.error(f"Failed to store {len(results)} book info cache entries: {str(e)}")
@@ -0,0 +1,130 @@
+"""
+エラーログの一括書き込み
+
+取り込みバッチの実行中に発生したエラーをメモリ上でまとめ、実行の最後に一括で書き込む。
+同じ(申請番号, ISBN, エラー種別)のエラーは1行にまとめ、発生回数・最終発生日時を更新する。
+"""
+
+import logging
+from typing import Dict, List, Optional
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from books.models import ErrorLog
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorLogWriter:
+    """エラーログのバッファ（メインスレッド専用）"""
+    
+    # 1回のクエリで照会・書き込みする件数
+    BATCH_SIZE = 500
+    
+    def __init__(self):
+        """初期化"""
+        self.pending: Dict[str, ErrorLog] = {}  # 重複判定キー → 未保存のエラーログ
+    
+    def __len__(self) -> int:
+        return len(self.pending)
+    
+    def add(
+        self,
+        application_number: Optional[str],
+        isbn: Optional[str],
+        error_type: str,
+        error_message: str
+    ) -> None:
+        """
+        エラーをバッファに積む（同じエラーは発生回数を加算し、メッセージは最新のものにする）
+        
+        Args:
+            application_number: 申請番号
+            isbn: ISBNコード
+            error_type: エラー種別
+            error_message: エラーメッセージ
+        """
+        key = ErrorLog.make_dedupe_key(application_number, isbn, error_type)
+        now = timezone.now()
+        entry = self.pending.get(key)
+        if entry is None:
+            self.pending[key] = ErrorLog(
+                dedupe_key=key,
+                application_number=application_number,
+                isbn=isbn,
+                error_type=error_type,
+                error_message=error_message,
+                occurrence_count=1,
+                created_at=now,
+                last_seen_at=now,
+            )
+        else:
+            entry.occurrence_count += 1
+            entry.error_message = error_message
+            entry.last_seen_at = now
+    
+    def flush(self) -> int:
+        """
+        バッファ内のエラーログを書き込む
+        
+        新しいエラーは一括で登録し、既存の行は発生回数をUPDATE文の中で加算して最終発生日時・メッセージを
+        更新する（初回発生日時は保持）。シャードを並行して処理するワーカーが同じエラーを同時に書き込んでも
+        加算は失われない。
+        
+        Returns:
+            書き込んだ行数
+        """
+        if not self.pending:
+            return 0
+        
+        entries, self.pending = self.pending, {}
+        keys = list(entries)
+        for i in range(0, len(keys), self.BATCH_SIZE):
+            batch = [entries[key] for key in keys[i:i + self.BATCH_SIZE]]
+            for attempt in range(1, 3):
+                try:
+                    with transaction.atomic():
+                        self._write_batch(batch)
+                    break
+                except IntegrityError:
+                    # 他のワーカーが同じエラーを先に登録した場合は、既存の行として加算し直す
+                    if attempt == 2:
+                        raise
+                    logger.info("Error log registered concurrently, retrying as an increment")
+        
+        logger.info(f"Error logs flushed: {len(entries)} distinct errors")
+        return len(entries)
+    
+    @staticmethod
+    def _write_batch(batch: List[ErrorLog]) -> None:
+        """
+        未登録のエラーを一括登録し、登録済みのエラーの発生回数を1クエリで加算
+        
+        Args:
+            batch: 書き込むエラーログ（トランザクション内で呼び出す）
+        """
+        # 登録済みの行をロックし、加算が終わるまで他のワーカーの更新を待たせる
+        existing = set(
+            ErrorLog.objects.select_for_update()
+            .filter(dedupe_key__in=[entry.dedupe_key for entry in batch])
+            .values_list('dedupe_key', flat=True)
+        )
+        created = [entry for entry in batch if entry.dedupe_key not in existing]
+        if created:
+            ErrorLog.objects.bulk_create(created)
+        
+        updated = [entry for entry in batch if entry.dedupe_key in existing]
+        if not updated:
+            return
+        
+        def per_key(attribute: str, output_field: models.Field) -> Case:
+            return Case(
+                *[When(dedupe_key=entry.dedupe_key, then=Value(getattr(entry, attribute))) for entry in updated],
+                output_field=output_field,
+            )
+        
+        ErrorLog.objects.filter(dedupe_key__in=[entry.dedupe_key for entry in updated]).update(
+            occurrence_count=F('occurrence_count') + per_key('occurrence_count', models.PositiveIntegerField()),
+            error_message=per_key('error_message', models.TextField()),
+            last_seen_at=per_key('last_seen_at', models.DateTimeField()),
+        )
@@ -0,0 +1,358 @@
+"""
+Google Sheets / Google Books APIのオフライン代替
+
+実サービスを使わずに取り込みバッチの負荷試験・ベンチマークを行うための代替実装。
+応答の遅延・エラー率・429（レート制限）の発生率を設定できる。
+
+- FakeSheetsService: GoogleSheetsClient.service に設定するSheets v4サービスの代替
+- FakeBooksAdapter: GoogleBooksClientのセッションにマウントするvolumes APIのトランスポートアダプター
+"""
+
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import requests
+from requests.adapters import BaseAdapter
+
+_A1_PATTERN = re.compile(r'^(?:(.*)!)?([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?$')
+
+
+# 合成した申請行の申請番号の接頭辞（ベンチマーク後の削除対象の判定に使う）
+SYNTHETIC_PREFIX = 'BENCH-'
+
+
+def synthetic_rows(count: int, unique_ratio: float = 0.8, seed: Optional[int] = None) -> List[List[str]]:
+    """
+    承認済み・未取り込みの申請行（A〜I列）を生成
+    
+    Args:
+        count: 行数
+        unique_ratio: ユニークなISBNの割合（同じ本の複数申請を再現）
+        seed: 乱数シード
+    
+    Returns:
+        2行目からの各行の値リスト
+    """
+    rng = random.Random(seed)
+    unique_isbns = max(1, int(count * unique_ratio))
+    rows = []
+    for i in range(count):
+        isbn = f"978{rng.randrange(unique_isbns):010d}"
+        rows.append([
+            f"{SYNTHETIC_PREFIX}{i + 1:07d}",
+            f"申請者{i % 50}",
+            f"承認者{i % 5}",
+            '2025/01/01',
+            '2025/01/02',
+            f"Book {isbn}",
+            isbn,
+            str(1000 + i % 3000),
+            '',
+        ])
+    return rows
+
+
+def _column_index(letters: str) -> int:
+    """列名（A, B, ..., AA）を0始まりの列番号に変換"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + (ord(letter) - ord('A') + 1)
+    return index - 1
+
+
+def _parse_a1(a1: str) -> Tuple[Optional[str], int, int, int, int]:
+    """
+    A1記法の範囲を(シート名, 開始列, 開始行, 終了列, 終了行)に変換（列は0始まり、行は1始まり）
+    
+    Args:
+        a1: A1記法の範囲（シート名付き可）
+    
+    Returns:
+        (シート名（省略時None）, 開始列, 開始行, 終了列, 終了行)
+    """
+    match = _A1_PATTERN.match(a1)
+    if not match:
+        raise ValueError(f"Unsupported A1 range: {a1}")
+    sheet_name, start_col, start_row, end_col, end_row = match.groups()
+    return (
+        sheet_name.strip("'") if sheet_name else None,
+        _column_index(start_col),
+        int(start_row),
+        _column_index(end_col or start_col),
+        int(end_row or start_row),
+    )
+
+
+class _FakeRequest:
+    """googleapiclientのHttpRequestの代替（execute()で応答を返す）"""
+    
+    def __init__(self, service: 'FakeSheetsService', method: str, handler: Callable[[], Dict[str, Any]]):
+        self.service = service
+        self.method = method
+        self.handler = handler
+    
+    def execute(self) -> Dict[str, Any]:
+        return self.service._execute(self.method, self.handler)
+
+
+class FakeSheetsService:
+    """
+    Sheets v4サービスの代替（spreadsheets().get と spreadsheets().values() の batchGet・batchUpdate・update のみ）
+    
+    シートはシート名ごとにメモリ上の行リストで保持し、取り込み済みフラグの書き込みも反映する。
+    存在しないシートへの読み書きはAPIと同じくHTTP 400を返す（スプレッドシートIDは区別しない）。
+    """
+    
+    def __init__(
+        self,
+        rows: List[List[str]],
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+        sheet_name: str = 'Sheet1'
+    ):
+        """
+        初期化
+        
+        Args:
+            rows: 2行目からの各行の値リスト（A列から）
+            latency: 1リクエストあたりの応答遅延（秒）
+            error_rate: HTTP 503を返す割合（0〜1）
+            throttle_rate: HTTP 429を返す割合（0〜1）
+            seed: 乱数シード
+            sheet_name: rowsを保持するシート名（add_sheetで他のシートを追加できる）
+        """
+        self.sheets: Dict[str, List[List[str]]] = {sheet_name: [list(row) for row in rows]}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.request_counts: Counter = Counter()  # メソッド名 → リクエスト数
+        self.error_counts: Counter = Counter()    # HTTPステータス → 発生数
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def add_sheet(self, sheet_name: str, rows: List[List[str]]) -> None:
+        """
+        シートを追加
+        
+        Args:
+            sheet_name: シート名
+            rows: 2行目からの各行の値リスト（A列から）
+        """
+        self.sheets[sheet_name] = [list(row) for row in rows]
+    
+    def spreadsheets(self) -> 'FakeSheetsService':
+        return self
+    
+    def values(self) -> 'FakeSheetsService':
+        return self
+    
+    def get(self, spreadsheetId: str, ranges: Optional[List[str]] = None, fields: Optional[str] = None, **kwargs) -> _FakeRequest:
+        # シートのメタデータはグリッドの行数のみ（ヘッダー行＋データ行）
+        return _FakeRequest(self, 'get', lambda: {
+            'sheets': [
+                {'properties': {'gridProperties': {'rowCount': len(self._sheet(name)) + 1}}}
+                for name in (ranges or [None])
+            ],
+        })
+    
+    def batchGet(self, spreadsheetId: str, ranges: List[str], majorDimension: str = 'ROWS', **kwargs) -> _FakeRequest:
+        return _FakeRequest(self, 'batchGet', lambda: {
+            'spreadsheetId': spreadsheetId,
+            'valueRanges': [self._value_range(a1, majorDimension) for a1 in ranges],
+        })
+    
+    def batchUpdate(self, spreadsheetId: str, body: Dict[str, Any], **kwargs) -> _FakeRequest:
+        return _FakeRequest(self, 'batchUpdate', lambda: {
+            'spreadsheetId': spreadsheetId,
+            'responses': [self._write(data['range'], data['values']) for data in body.get('data', [])],
+        })
+    
+    def update(self, spreadsheetId: str, range: str, body: Dict[str, Any], **kwargs) -> _FakeRequest:
+        return _FakeRequest(self, 'update', lambda: self._write(range, body['values']))
+    
+    def _execute(self, method: str, handler: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """遅延・エラーを注入してリクエストを処理"""
+        with self._lock:
+            self.request_counts[method] += 1
+            draw = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        
+        status = None
+        if draw < self.throttle_rate:
+            status = 429
+        elif draw < self.throttle_rate + self.error_rate:
+            status = 503
+        if status:
+            with self._lock:
+                self.error_counts[status] += 1
+            raise self._http_error(status)
+        
+        with self._lock:
+            return handler()
+    
+    @staticmethod
+    def _http_error(status: int) -> Exception:
+        """googleapiclientのHttpErrorを作成"""
+        import httplib2
+        from googleapiclient.errors import HttpError
+        
+        content = json.dumps({'error': {'code': status, 'message': 'Injected by FakeSheetsService'}}).encode()
+        return HttpError(httplib2.Response({'status': status}), content)
+    
+    def _sheet(self, sheet_name: Optional[str]) -> List[List[str]]:
+        """シートの行リスト（シート名省略時は最初のシート、存在しない場合はHTTP 400）"""
+        if sheet_name is None:
+            return next(iter(self.sheets.values()))
+        if sheet_name not in self.sheets:
+            raise self._http_error(400)
+        return self.sheets[sheet_name]
+    
+    @staticmethod
+    def _cell(rows: List[List[str]], row: int, col: int) -> str:
+        """セルの値（1始まりの行番号、範囲外は空文字）"""
+        values = rows[row - 2] if 2 <= row < len(rows) + 2 else []
+        return str(values[col]) if col < len(values) else ''
+    
+    def _value_range(self, a1: str, major_dimension: str) -> Dict[str, Any]:
+        """範囲の値をAPIと同じ形式（末尾の空セル・空行を省略）で返す"""
+        sheet_name, start_col, start_row, end_col, end_row = _parse_a1(a1)
+        rows = self._sheet(sheet_name)
+        end_row = min(end_row, len(rows) + 1)
+        if major_dimension == 'COLUMNS':
+            lines = [
+                [self._cell(rows, row, col) for row in range(start_row, end_row + 1)]
+                for col in range(start_col, end_col + 1)
+            ]
+        else:
+            lines = [
+                [self._cell(rows, row, col) for col in range(start_col, end_col + 1)]
+                for row in range(start_row, end_row + 1)
+            ]
+        
+        values = []
+        for line in lines:
+            while line and not line[-1]:
+                line.pop()
+            values.append(line)
+        while values and not values[-1]:
+            values.pop()
+        
+        value_range = {'range': a1, 'majorDimension': major_dimension}
+        if values:
+            value_range['values'] = values
+        return value_range
+    
+    def _write(self, a1: str, values: List[List[Any]]) -> Dict[str, Any]:
+        """範囲に値を書き込み、更新範囲を返す"""
+        sheet_name, start_col, start_row, _, _ = _parse_a1(a1)
+        rows = self._sheet(sheet_name)
+        for offset, line in enumerate(values):
+            index = start_row + offset - 2
+            while len(rows) <= index:
+                rows.append([])
+            row = rows[index]
+            for col_offset, value in enumerate(line):
+                col = start_col + col_offset
+                row.extend([''] * (col + 1 - len(row)))
+                row[col] = value
+        return {'updatedRange': a1, 'updatedRows': len(values)}
+
+
+class FakeBooksAdapter(BaseAdapter):
+    """
+    Google Books volumes APIのトランスポートアダプター（requests.Sessionにマウントして使う）
+    
+    該当なしとするISBNはISBNのハッシュで決めるため、同じ設定なら何度実行しても同じ結果になる。
+    HTTPAdapterを置き換えるため、5xx応答に対するセッションのリトライは行われない。
+    """
+    
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        not_found_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        """
+        初期化
+        
+        Args:
+            latency: 1リクエストあたりの応答遅延（秒）
+            error_rate: HTTP 503を返す割合（0〜1）
+            throttle_rate: HTTP 429（rateLimitExceeded）を返す割合（0〜1）
+            not_found_rate: 該当書籍なしとするISBNの割合（0〜1）
+            seed: 乱数シード
+        """
+        super().__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.not_found_rate = not_found_rate
+        self.request_count = 0
+        self.status_counts: Counter = Counter()  # HTTPステータス → 応答数
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def send(self, request, **kwargs) -> requests.Response:
+        with self._lock:
+            self.request_count += 1
+            draw = self._random.random()
+        if self.latency:
+            time.sleep(self.latency)
+        
+        isbn = parse_qs(urlparse(request.url).query).get('q', [''])[0].replace('isbn:', '')
+        if draw < self.throttle_rate:
+            status, payload = 429, {'error': {'code': 429, 'errors': [{'reason': 'rateLimitExceeded'}]}}
+        elif draw < self.throttle_rate + self.error_rate:
+            status, payload = 503, {'error': {'code': 503, 'message': 'Injected by FakeBooksAdapter'}}
+        elif self._is_not_found(isbn):
+            status, payload = 200, {'kind': 'books#volumes', 'totalItems': 0}
+        else:
+            status, payload = 200, {'kind': 'books#volumes', 'totalItems': 1, 'items': [self._volume(isbn)]}
+        
+        with self._lock:
+            self.status_counts[status] += 1
+        
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(payload).encode('utf-8')
+        response.headers['Content-Type'] = 'application/json; charset=UTF-8'
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+    
+    def close(self):
+        pass
+    
+    def _is_not_found(self, isbn: str) -> bool:
+        """ISBNのハッシュでnot_found_rateの割合を該当なしにする"""
+        if not self.not_found_rate:
+            return False
+        bucket = int(hashlib.sha1(isbn.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+        return bucket < self.not_found_rate
+    
+    @staticmethod
+    def _volume(isbn: str) -> Dict[str, Any]:
+        """volumes APIの1件分の応答"""
+        return {
+            'volumeInfo': {
+                'title': f"Book {isbn}",
+                'authors': [f"Author {isbn[-3:]}"],
+                'publisher': 'Fake Publisher',
+                'publishedDate': '2020-01-01',
+                'description': f"Synthetic volume for ISBN {isbn}",
+                'imageLinks': {'thumbnail': f"http://books.example.com/{isbn}.jpg"},
+                'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': isbn}],
+            }
+        }
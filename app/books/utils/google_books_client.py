@@ -4,27 +4,124 @@ Google Books API クライアント
 ISBNコードをキーに書籍情報を取得するクライアントクラス
 """
 
-import requests
+import time
 import logging
-from typing import Optional, Dict, Any
+import threading
+from collections import deque
+from typing import Optional, Dict, Any, List, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
+from .rate_limiter import AdaptiveRateLimiter, get_shared_limiter
 
 logger = logging.getLogger(__name__)
 
 
+class RateLimitedError(requests.exceptions.RequestException):
+    """APIのレート制限・クォータ超過により取得できなかった"""
+
+
+# プロセス内で共有するクライアント（get_shared_clientで生成）
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> 'GoogleBooksClient':
+    """
+    プロセス内で共有するGoogle Books APIクライアントを取得
+    
+    接続プール付きのセッションを使い回すため、呼び出しごとのTCP/TLSハンドシェイクが発生しない。
+    
+    Returns:
+        共有クライアント
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = GoogleBooksClient()
+    return _shared_client
+
+
 class GoogleBooksClient:
     """Google Books API クライアント"""
     
     BASE_URL = "https://www.googleapis.com/books/v1/volumes"
     
-    def __init__(self, api_key: Optional[str] = None):
+    # セッションでリトライするHTTPステータス（429はレートリミッターで制御するため含めない）
+    RETRY_STATUS_CODES = (500, 502, 503, 504)
+    
+    # レート制限・クォータ超過を示すエラー理由（403応答のerror.errors[].reason）
+    RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded', 'dailyLimitExceeded', 'quotaExceeded')
+    
+    # 書籍情報取得結果の種別
+    LOOKUP_FOUND = 'found'          # 書籍情報あり
+    LOOKUP_NOT_FOUND = 'not_found'  # 該当書籍なし
+    LOOKUP_THROTTLED = 'throttled'  # レート制限により取得できず
+    LOOKUP_ERROR = 'error'          # 通信エラー等により取得できず
+    
+    # 保持するレイテンシ計測値の上限（長時間稼働するプロセスでのメモリ増加防止）
+    MAX_LATENCY_SAMPLES = 10000
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        limiter: Optional[AdaptiveRateLimiter] = None
+    ):
         """
         初期化
         
         Args:
             api_key: Google Books API キー（省略時は設定から取得）
+            session: HTTPセッション（省略時は設定に従って接続プール・リトライ付きで作成）
+            limiter: レートリミッター（省略時はプロセス内の共有リミッター）
         """
         self.api_key = api_key or settings.GOOGLE_BOOKS_API_KEY
+        self.timeout = getattr(settings, 'GOOGLE_BOOKS_TIMEOUT', 10)
+        self.rate_limit_wait = getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_WAIT', 30)
+        self.session = session or self._build_session()
+        self.limiter = limiter or get_shared_limiter()
+        self._latencies = deque(maxlen=self.MAX_LATENCY_SAMPLES)
+        self._latencies_lock = threading.Lock()
+    
+    def _build_session(self) -> requests.Session:
+        """
+        接続プールとリトライ（ジッター付き指数バックオフ）を設定したセッションを作成
+        
+        Returns:
+            HTTPセッション
+        """
+        retry = Retry(
+            total=getattr(settings, 'GOOGLE_BOOKS_MAX_RETRIES', 3),
+            backoff_factor=getattr(settings, 'GOOGLE_BOOKS_BACKOFF_FACTOR', 0.5),
+            backoff_jitter=getattr(settings, 'GOOGLE_BOOKS_BACKOFF_JITTER', 0.5),
+            status_forcelist=self.RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=getattr(settings, 'GOOGLE_BOOKS_POOL_SIZE', 10),
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        return session
+    
+    def pop_latencies(self) -> List[float]:
+        """
+        計測済みのAPI呼び出しレイテンシ（秒）を取得してクリア
+        
+        Returns:
+            呼び出しごとのレイテンシのリスト（リトライ待ちを含む）
+        """
+        with self._latencies_lock:
+            latencies = list(self._latencies)
+            self._latencies.clear()
+        return latencies
     
     def get_book_info_by_isbn(self, isbn: str) -> Optional[Dict[str, Any]]:
         """
@@ -45,44 +142,7 @@ class GoogleBooksClient:
             }
         """
         try:
-            # クエリパラメータ設定
-            params = {
-                'q': f'isbn:{isbn}',
-            }
-            
-            if self.api_key:
-                params['key'] = self.api_key
-            
-            # APIリクエスト
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # レスポンスチェック
-            if 'items' not in data or len(data['items']) == 0:
-                logger.warning(f"Book not found for ISBN: {isbn}")
-                return None
-            
-            # 最初のアイテムから書籍情報を抽出
-            volume_info = data['items'][0].get('volumeInfo', {})
-            
-            # 書影URLを取得してHTTPSに変換
-            thumbnail_url = volume_info.get('imageLinks', {}).get('thumbnail', '')
-            if thumbnail_url and thumbnail_url.startswith('http://'):
-                thumbnail_url = thumbnail_url.replace('http://', 'https://')
-            
-            book_info = {
-                'title': volume_info.get('title', ''),
-                'author': ', '.join(volume_info.get('authors', [])),
-                'publisher': volume_info.get('publisher', ''),
-                'published_date': volume_info.get('publishedDate', ''),
-                'description': volume_info.get('description', ''),
-                'thumbnail_url': thumbnail_url,
-            }
-            
-            logger.info(f"Successfully fetched book info for ISBN: {isbn}")
-            return book_info
+            return self.fetch_book_info(isbn)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"API request failed for ISBN {isbn}: {str(e)}")
@@ -91,6 +151,130 @@ class GoogleBooksClient:
             logger.error(f"Unexpected error fetching book info for ISBN {isbn}: {str(e)}")
             return None
     
+    def fetch_book_info(self, isbn: str) -> Optional[Dict[str, Any]]:
+        """
+        ISBNコードから書籍情報を取得（通信エラー時は例外を送出）
+        
+        「書籍が存在しない」と「取得に失敗した」を区別したい呼び出し元（キャッシュ等）向け。
+        
+        Args:
+            isbn: ISBNコード（10桁または13桁）
+        
+        Returns:
+            書籍情報の辞書（形式はget_book_info_by_isbnと同じ）、該当書籍なしの場合はNone
+        
+        Raises:
+            RateLimitedError: レート制限・クォータ超過の場合
+            requests.exceptions.RequestException: API通信に失敗した場合
+        """
+        # 送信レートの制御（待機上限を超えた場合は制限扱い）
+        if not self.limiter.acquire(timeout=self.rate_limit_wait):
+            raise RateLimitedError(f"Timed out waiting for rate limiter for ISBN {isbn}")
+        
+        # クエリパラメータ設定
+        params = {
+            'q': f'isbn:{isbn}',
+        }
+        
+        if self.api_key:
+            params['key'] = self.api_key
+        
+        # APIリクエスト（レイテンシを計測）
+        started = time.perf_counter()
+        try:
+            response = self.session.get(self.BASE_URL, params=params, timeout=self.timeout)
+        finally:
+            latency = time.perf_counter() - started
+            with self._latencies_lock:
+                self._latencies.append(latency)
+        logger.debug(f"Google Books API call for ISBN {isbn} took {latency * 1000:.0f}ms")
+        
+        if self._is_rate_limited(response):
+            self.limiter.on_throttle()
+            raise RateLimitedError(f"Rate limit exceeded for ISBN {isbn} (HTTP {response.status_code})", response=response)
+        response.raise_for_status()
+        self.limiter.on_success()
+        
+        data = response.json()
+        
+        # レスポンスチェック
+        if 'items' not in data or len(data['items']) == 0:
+            logger.warning(f"Book not found for ISBN: {isbn}")
+            return None
+        
+        # 最初のアイテムから書籍情報を抽出
+        volume_info = data['items'][0].get('volumeInfo', {})
+        
+        # 書影URLを取得してHTTPSに変換
+        thumbnail_url = volume_info.get('imageLinks', {}).get('thumbnail', '')
+        if thumbnail_url and thumbnail_url.startswith('http://'):
+            thumbnail_url = thumbnail_url.replace('http://', 'https://')
+        
+        book_info = {
+            'title': volume_info.get('title', ''),
+            'author': ', '.join(volume_info.get('authors', [])),
+            'publisher': volume_info.get('publisher', ''),
+            'published_date': volume_info.get('publishedDate', ''),
+            'description': volume_info.get('description', ''),
+            'thumbnail_url': thumbnail_url,
+        }
+        
+        logger.info(f"Successfully fetched book info for ISBN: {isbn}")
+        return book_info
+    
+    def lookup(self, isbn: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        ISBNコードから書籍情報を取得し、結果の種別と合わせて返す
+        
+        Args:
+            isbn: ISBNコード（10桁または13桁）
+        
+        Returns:
+            (結果の種別 LOOKUP_*, 書籍情報)
+        """
+        try:
+            book_info = self.fetch_book_info(isbn)
+            return (self.LOOKUP_FOUND if book_info else self.LOOKUP_NOT_FOUND), book_info
+        except RateLimitedError as e:
+            logger.warning(f"API request throttled for ISBN {isbn}: {str(e)}")
+            return self.LOOKUP_THROTTLED, None
+        except Exception as e:
+            logger.error(f"API request failed for ISBN {isbn}: {str(e)}")
+            return self.LOOKUP_ERROR, None
+    
+    def _is_rate_limited(self, response: requests.Response) -> bool:
+        """
+        レート制限・クォータ超過の応答かどうか
+        
+        Args:
+            response: APIレスポンス
+        
+        Returns:
+            429、またはエラー理由がrateLimitExceeded等の403の場合True
+        """
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        try:
+            errors = response.json().get('error', {}).get('errors', [])
+        except ValueError:
+            return False
+        return any(error.get('reason') in self.RATE_LIMIT_REASONS for error in errors)
+    
+    @staticmethod
+    def normalize_isbn(isbn: str) -> str:
+        """
+        ISBNコードを正規化（ハイフン・空白を除去し、末尾のxを大文字に統一）
+        
+        Args:
+            isbn: ISBNコード
+        
+        Returns:
+            正規化したISBNコード
+        """
+        return isbn.replace('-', '').replace(' ', '').strip().upper()
+    
     def validate_isbn(self, isbn: str) -> bool:
         """
         ISBNコードの妥当性チェック
@@ -102,7 +286,7 @@ class GoogleBooksClient:
             妥当な場合True
         """
         # ハイフンを除去
-        isbn_clean = isbn.replace('-', '').replace(' ', '')
+        isbn_clean = self.normalize_isbn(isbn)
         
         # 長さチェック（10桁または13桁）
         if len(isbn_clean) not in [10, 13]:
@@ -110,7 +294,7 @@ class GoogleBooksClient:
         
         # 数字のみかチェック（ISBN-10の場合は最後がXの可能性あり）
         if len(isbn_clean) == 10:
-            return isbn_clean[:-1].isdigit() and (isbn_clean[-1].isdigit() or isbn_clean[-1].upper() == 'X')
+            return isbn_clean[:-1].isdigit() and (isbn_clean[-1].isdigit() or isbn_clean[-1] == 'X')
         else:
             return isbn_clean.isdigit()
 
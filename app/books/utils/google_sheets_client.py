@@ -5,16 +5,120 @@ Google Sheets API クライアント
 """
 
 import os
+import json
+import time
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import functools
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 
+# google-api-python-client / google-auth は読み込みに数百msかかるため、
+# Sheets APIを実際に使う処理（authenticate以降）でのみインポートする
+
+@functools.lru_cache(maxsize=None)
+def _load_discovery_document(service_name: str = 'sheets', version: str = 'v4') -> Optional[Dict[str, Any]]:
+    """
+    ライブラリ同梱のディスカバリードキュメントを読み込む（プロセス内で1回だけ解析）
+    
+    Args:
+        service_name: APIサービス名
+        version: APIバージョン
+        
+    Returns:
+        ディスカバリードキュメント（同梱されていない場合はNone）
+    """
+    from googleapiclient.discovery_cache import get_static_doc
+    
+    content = get_static_doc(service_name, version)
+    if content is None:
+        logger.warning(f"Static discovery document not found: {service_name} {version}")
+        return None
+    return json.loads(content)
+
+
+def _http_error():
+    """HttpErrorクラスを遅延インポートして返す（except節で例外発生時にのみ評価される）"""
+    from googleapiclient.errors import HttpError
+    return HttpError
+
+
+def _build_service(**kwargs):
+    """
+    キャッシュ済みのディスカバリードキュメントからSheets APIサービスを構築
+    
+    Args:
+        **kwargs: build_from_document / build に渡す認証情報（developerKey, credentials）
+        
+    Returns:
+        Sheets APIサービス
+    """
+    from googleapiclient.discovery import build, build_from_document
+    
+    document = _load_discovery_document('sheets', 'v4')
+    if document is None:
+        return build('sheets', 'v4', **kwargs)
+    return build_from_document(document, **kwargs)
+
+
+class SheetRow:
+    """スプレッドシートの1行（__slots__で属性辞書を持たない軽量なレコード）"""
+    
+    # A〜I列の順
+    FIELDS = (
+        'application_number',
+        'applicant_name',
+        'approver_name',
+        'application_date',
+        'approval_date',
+        'book_name',
+        'isbn',
+        'price',
+        'db_imported',
+    )
+    
+    __slots__ = ('row_index',) + FIELDS
+    
+    def __init__(self, row_index: int, **values: str):
+        """
+        初期化
+        
+        Args:
+            row_index: 行番号（1始まり）
+            values: FIELDSの項目名と値（省略した項目は空文字）
+        """
+        self.row_index = row_index
+        for field in self.FIELDS:
+            setattr(self, field, values.get(field, ''))
+    
+    @classmethod
+    def from_values(cls, row_index: int, values: List[Any]) -> 'SheetRow':
+        """
+        APIが返したA〜I列の値リストから作成（末尾の空セルが省略されていてもよい）
+        
+        Args:
+            row_index: 行番号（1始まり）
+            values: A列からの値のリスト
+        
+        Returns:
+            行レコード
+        """
+        row = cls(row_index)
+        for field, value in zip(cls.FIELDS, values):
+            setattr(row, field, str(value))
+        # 取り込み条件の判定に使う項目は前後の空白を除去
+        row.approver_name = row.approver_name.strip()
+        row.approval_date = row.approval_date.strip()
+        row.db_imported = row.db_imported.strip()
+        return row
+    
+    def __repr__(self):
+        return f"SheetRow({self.row_index}, {self.application_number!r}, isbn={self.isbn!r})"
+
+
 class GoogleSheetsClient:
     """Google Sheets API クライアント"""
     
@@ -32,6 +136,29 @@ class GoogleSheetsClient:
     COL_PRICE = 7               # H列: 価格
     COL_DB_IMPORTED = 8         # I列: DB取り込み済み
     
+    # フラグ一括書き込みのリトライ設定
+    WRITE_MAX_RETRIES = 3
+    WRITE_RETRY_BACKOFF = 1.0  # 秒（リトライごとに倍増）
+    RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+    
+    # 取り込み対象の判定・編集検知に使う列（書籍名以外のA〜I列、書籍名は登録時にAPIから取得した値を使う）
+    SCAN_COLUMNS = (
+        ('A', 'application_number'),
+        ('B', 'applicant_name'),
+        ('C', 'approver_name'),
+        ('D', 'application_date'),
+        ('E', 'approval_date'),
+        ('G', 'isbn'),
+        ('H', 'price'),
+        ('I', 'db_imported'),
+    )
+    
+    # 内容ハッシュの対象項目（取り込み済みフラグは含めない）
+    FINGERPRINT_FIELDS = ('applicant_name', 'approver_name', 'application_date', 'approval_date', 'isbn', 'price')
+    
+    # values().batchGetの1リクエストあたりの最大範囲数（範囲はURLに含まれるため長さを抑える）
+    BATCH_GET_MAX_RANGES = 100
+    
     def __init__(self, api_key: Optional[str] = None, credentials_path: Optional[str] = None, spreadsheet_id: Optional[str] = None):
         """
         初期化
@@ -46,13 +173,15 @@ class GoogleSheetsClient:
         self.spreadsheet_id = spreadsheet_id or settings.GOOGLE_SHEETS_SPREADSHEET_ID
         self.service = None
         self.use_api_key = bool(self.api_key)
+        self.window_rows = max(1, getattr(settings, 'GOOGLE_SHEETS_WINDOW_ROWS', 1000))
+        self.request_count = 0  # 送信したAPIリクエスト数（リトライを含む、実行履歴の記録用）
     
     def authenticate(self):
         """Google Sheets APIに認証"""
         try:
             if self.use_api_key and self.api_key:
                 # APIキーを使用した認証（読み取り専用）
-                self.service = build('sheets', 'v4', developerKey=self.api_key)
+                self.service = _build_service(developerKey=self.api_key)
                 logger.info("Successfully authenticated with Google Sheets API using API key")
             else:
                 # サービスアカウントを使用した認証（読み書き可能）
@@ -60,96 +189,187 @@ class GoogleSheetsClient:
                     logger.error(f"Credentials file not found: {self.credentials_path}")
                     raise FileNotFoundError(f"Credentials file not found: {self.credentials_path}")
                 
+                from google.oauth2 import service_account
+                
                 credentials = service_account.Credentials.from_service_account_file(
                     self.credentials_path,
                     scopes=self.SCOPES
                 )
                 
-                self.service = build('sheets', 'v4', credentials=credentials)
+                self.service = _build_service(credentials=credentials)
                 logger.info("Successfully authenticated with Google Sheets API using service account")
             
         except Exception as e:
             logger.error(f"Failed to authenticate with Google Sheets API: {str(e)}")
             raise
     
-    def get_all_rows(self, sheet_name: str = 'Sheet1', start_row: int = 2) -> List[List[Any]]:
+    def iter_rows(
+        self,
+        sheet_name: str = 'Sheet1',
+        start_row: int = 2,
+        columns: Optional[Tuple[Tuple[str, str], ...]] = None,
+        end_row: Optional[int] = None
+    ) -> Iterator[SheetRow]:
+        """
+        スプレッドシートを固定行数のページ単位で読み込み、行レコードを順に返す
+        
+        ページごとにAPIを呼び出すため、メモリに載るのは1ページ分（window_rows行）のみ。
+        すべての列が空のページに達した時点で終了する（window_rows行以上の空行が続く場合はそれ以降を読まない）。
+        
+        Args:
+            sheet_name: シート名
+            start_row: 開始行番号（1始まり、デフォルトは2行目＝ヘッダー除外）
+            columns: 取得する(列, 項目名)のタプル（省略時はA〜I列すべて）
+            end_row: 終了行番号（省略時はシートの末尾まで）
+        
+        Yields:
+            行レコード（空行は含まない。columns指定時は指定外の項目は空文字）
+        """
+        page_start = start_row
+        while end_row is None or page_start <= end_row:
+            page_end = page_start + self.window_rows - 1
+            if end_row is not None:
+                page_end = min(page_end, end_row)
+            if columns:
+                rows = self._get_column_page(sheet_name, page_start, page_end, columns)
+            else:
+                value_range, = self._batch_get([f"{sheet_name}!A{page_start}:I{page_end}"])
+                rows = [
+                    SheetRow.from_values(page_start + offset, values)
+                    for offset, values in enumerate(value_range.get('values', []))
+                    if any(str(value).strip() for value in values)
+                ]
+            
+            if not rows:
+                return
+            
+            logger.debug(f"Read rows {page_start}-{page_end} ({len(rows)} non-empty)")
+            yield from rows
+            page_start = page_end + 1
+    
+    def _get_column_page(
+        self,
+        sheet_name: str,
+        page_start: int,
+        page_end: int,
+        columns: Tuple[Tuple[str, str], ...]
+    ) -> List[SheetRow]:
         """
-        スプレッドシートから全行を取得
+        1ページ分の指定列を取得して行レコードに変換
+        
+        Args:
+            sheet_name: シート名
+            page_start: ページの開始行番号
+            page_end: ページの終了行番号
+            columns: 取得する(列, 項目名)のタプル
+        
+        Returns:
+            空行を除いた行レコードのリスト
+        """
+        value_ranges = self._batch_get(
+            [f"{sheet_name}!{col}{page_start}:{col}{page_end}" for col, _ in columns],
+            major_dimension='COLUMNS'
+        )
+        # 列ごとに1つの値リストが返る（末尾の空セルは省略される）
+        values_by_column = [(value_range.get('values') or [[]])[0] for value_range in value_ranges]
+        
+        rows = []
+        for offset in range(max(map(len, values_by_column), default=0)):
+            row = SheetRow(page_start + offset)
+            is_empty = True
+            for (_, field), values in zip(columns, values_by_column):
+                value = str(values[offset]).strip() if offset < len(values) else ''
+                if value:
+                    setattr(row, field, value)
+                    is_empty = False
+            if not is_empty:
+                rows.append(row)
+        return rows
+    
+    def scan_rows(self, sheet_name: str = 'Sheet1', start_row: int = 2, end_row: Optional[int] = None) -> Iterator[SheetRow]:
+        """
+        SCAN_COLUMNSの列のみをページ単位で読み込む（書籍名は取得しない）
         
         Args:
             sheet_name: シート名
             start_row: 開始行番号（1始まり、デフォルトは2行目＝ヘッダー除外）
+            end_row: 終了行番号（省略時はシートの末尾まで）
+        
+        Yields:
+            SCAN_COLUMNSの項目のみを持つ行レコード（値は前後の空白除去済み）
+        """
+        return self.iter_rows(sheet_name, start_row, columns=self.SCAN_COLUMNS, end_row=end_row)
+    
+    def get_row_count(self, sheet_name: str = 'Sheet1') -> int:
+        """
+        シートの行数（グリッドの行数、末尾の空行を含む）を取得
+        
+        Args:
+            sheet_name: シート名
         
         Returns:
-            行データのリスト
+            行数（ヘッダー行を含む）
         """
         try:
             if not self.service:
                 self.authenticate()
             
-            # データ範囲を指定（例: Sheet1!A2:I）
-            range_name = f"{sheet_name}!A{start_row}:I"
-            
-            result = self.service.spreadsheets().values().get(
+            self.request_count += 1
+            result = self.service.spreadsheets().get(
                 spreadsheetId=self.spreadsheet_id,
-                range=range_name
+                ranges=[sheet_name],
+                fields='sheets.properties.gridProperties.rowCount'
             ).execute()
+            sheets = result.get('sheets') or [{}]
+            return sheets[0].get('properties', {}).get('gridProperties', {}).get('rowCount', 0)
             
-            rows = result.get('values', [])
-            logger.info(f"Fetched {len(rows)} rows from spreadsheet")
-            
-            return rows
-            
-        except HttpError as e:
+        except _http_error() as e:
             logger.error(f"HTTP error occurred: {str(e)}")
             raise
-        except Exception as e:
-            logger.error(f"Failed to fetch rows from spreadsheet: {str(e)}")
-            raise
     
-    def get_pending_rows(self, sheet_name: str = 'Sheet1') -> List[Dict[str, Any]]:
+    def iter_pending_rows(self, sheet_name: str = 'Sheet1') -> Iterator[SheetRow]:
         """
-        取り込み対象の行を取得（承認済み＆未取り込み）
+        取り込み対象の行を順に返す（承認済み＆未取り込み）
         
         取り込み条件:
         - 承認者名（C列）が入力されている
         - 承認日（E列）が入力されている
         - DB取り込み済みフラグ（I列）が空
         
+        シート全体（A〜I列）は取得せず、scan_rowsで判定に必要な列のみを読み込んで対象行を特定し、
+        BATCH_GET_MAX_RANGES行ごとに対象行だけを全列取得する。
+        
+        Args:
+            sheet_name: シート名
+        
+        Yields:
+            取り込み対象行の行レコード
+        """
+        row_indices = []
+        for row in self.scan_rows(sheet_name):
+            if self.is_pending(row):
+                row_indices.append(row.row_index)
+            if len(row_indices) >= self.BATCH_GET_MAX_RANGES:
+                yield from self._fetch_pending(row_indices, sheet_name)
+                row_indices = []
+        yield from self._fetch_pending(row_indices, sheet_name)
+    
+    def _fetch_pending(self, row_indices: List[int], sheet_name: str) -> List[SheetRow]:
+        """指定行を全列取得し、取得までの間に編集されて対象外になった行を除外"""
+        return [row for row in self.get_row_records(row_indices, sheet_name) if self.is_pending(row)]
+    
+    def get_pending_rows(self, sheet_name: str = 'Sheet1') -> List[SheetRow]:
+        """
+        取り込み対象の行をまとめて取得（iter_pending_rowsの結果をリストにしたもの）
+        
         Args:
             sheet_name: シート名
         
         Returns:
-            取り込み対象行の辞書のリスト
-            各辞書には行データ + row_index（実際の行番号）が含まれる
+            取り込み対象行の行レコードのリスト
         """
         try:
-            all_rows = self.get_all_rows(sheet_name)
-            pending_rows = []
-            
-            for idx, row in enumerate(all_rows, start=2):  # 2行目から開始（ヘッダー除く）
-                # 行の長さチェック（少なくとも9列必要）
-                if len(row) < 9:
-                    row.extend([''] * (9 - len(row)))  # 足りない列を空文字で埋める
-                
-                # 取り込み条件チェック
-                approver_name = row[self.COL_APPROVER_NAME].strip() if len(row) > self.COL_APPROVER_NAME else ''
-                approval_date = row[self.COL_APPROVAL_DATE].strip() if len(row) > self.COL_APPROVAL_DATE else ''
-                db_imported = row[self.COL_DB_IMPORTED].strip() if len(row) > self.COL_DB_IMPORTED else ''
-                
-                if approver_name and approval_date and not db_imported:
-                    pending_rows.append({
-                        'row_index': idx,
-                        'application_number': row[self.COL_APPLICATION_NUMBER],
-                        'applicant_name': row[self.COL_APPLICANT_NAME],
-                        'approver_name': approver_name,
-                        'application_date': row[self.COL_APPLICATION_DATE],
-                        'approval_date': approval_date,
-                        'book_name': row[self.COL_BOOK_NAME],
-                        'isbn': row[self.COL_ISBN],
-                        'price': row[self.COL_PRICE],
-                    })
-            
+            pending_rows = list(self.iter_pending_rows(sheet_name))
             logger.info(f"Found {len(pending_rows)} pending rows")
             return pending_rows
             
@@ -157,6 +377,102 @@ class GoogleSheetsClient:
             logger.error(f"Failed to get pending rows: {str(e)}")
             raise
     
+    @staticmethod
+    def is_pending(row: SheetRow) -> bool:
+        """
+        取り込み対象（承認済み＆未取り込み）の行かどうか
+        
+        Args:
+            row: 行レコード
+        
+        Returns:
+            取り込み対象の場合True
+        """
+        return bool(row.approver_name and row.approval_date and not row.db_imported)
+    
+    @classmethod
+    def fingerprint(cls, row: SheetRow) -> str:
+        """
+        行の内容ハッシュを計算（取り込み後の編集検知用）
+        
+        Args:
+            row: 行レコード
+        
+        Returns:
+            FINGERPRINT_FIELDSの値から計算したSHA-256（16進数）
+        """
+        content = '\x1f'.join(str(getattr(row, field) or '').strip() for field in cls.FINGERPRINT_FIELDS)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    
+    def get_row_records(self, row_indices: List[int], sheet_name: str = 'Sheet1') -> List[SheetRow]:
+        """
+        指定した行のA〜I列を取得し、行レコードに変換
+        
+        Args:
+            row_indices: 行番号（1始まり）のリスト
+            sheet_name: シート名
+        
+        Returns:
+            行レコードのリスト（行番号順、取得できなかった行は含まない）
+        """
+        rows = self.get_rows(row_indices, sheet_name)
+        return [SheetRow.from_values(idx, rows[idx]) for idx in sorted(set(row_indices)) if idx in rows]
+    
+    def get_rows(self, row_indices: List[int], sheet_name: str = 'Sheet1') -> Dict[int, List[Any]]:
+        """
+        指定した行のA〜I列を取得（連続する行は1つの範囲にまとめてbatchGetで取得）
+        
+        Args:
+            row_indices: 行番号（1始まり）のリスト
+            sheet_name: シート名
+        
+        Returns:
+            行番号をキー、行データを値とする辞書
+        """
+        ranges = self._merge_row_ranges(row_indices)
+        if not ranges:
+            return {}
+        
+        value_ranges = self._batch_get([f"{sheet_name}!A{start}:I{end}" for start, end in ranges])
+        rows = {}
+        for (start, end), value_range in zip(ranges, value_ranges):
+            for offset, row in enumerate(value_range.get('values', [])):
+                rows[start + offset] = row
+        
+        logger.info(f"Fetched {len(rows)} rows in {len(ranges)} ranges from spreadsheet")
+        return rows
+    
+    def _batch_get(self, ranges: List[str], major_dimension: str = 'ROWS') -> List[Dict[str, Any]]:
+        """
+        values().batchGetで複数範囲を取得（BATCH_GET_MAX_RANGES件ずつ分割してリクエスト）
+        
+        Args:
+            ranges: A1記法の範囲のリスト
+            major_dimension: ROWSまたはCOLUMNS
+        
+        Returns:
+            rangesと同じ順序のValueRangeのリスト
+        """
+        try:
+            if not self.service:
+                self.authenticate()
+            
+            value_ranges = []
+            for i in range(0, len(ranges), self.BATCH_GET_MAX_RANGES):
+                self.request_count += 1
+                result = self.service.spreadsheets().values().batchGet(
+                    spreadsheetId=self.spreadsheet_id,
+                    ranges=ranges[i:i + self.BATCH_GET_MAX_RANGES],
+                    majorDimension=major_dimension
+                ).execute()
+                value_ranges.extend(result.get('valueRanges', []))
+            
+            return value_ranges
+            
+        except _http_error() as e:
+            logger.error(f"HTTP error occurred: {str(e)}")
+            raise
+    
     def mark_as_imported(self, row_index: int, sheet_name: str = 'Sheet1', value: str = '✓'):
         """
         指定行にDB取り込み済みフラグを立てる
@@ -177,6 +493,7 @@ class GoogleSheetsClient:
                 'values': [[value]]
             }
             
+            self.request_count += 1
             self.service.spreadsheets().values().update(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_name,
@@ -186,10 +503,101 @@ class GoogleSheetsClient:
             
             logger.info(f"Marked row {row_index} as imported")
             
-        except HttpError as e:
+        except _http_error() as e:
             logger.error(f"HTTP error occurred while marking row {row_index}: {str(e)}")
             raise
         except Exception as e:
             logger.error(f"Failed to mark row {row_index} as imported: {str(e)}")
             raise
-
+    
+    def mark_many_as_imported(self, row_indices: List[int], sheet_name: str = 'Sheet1', value: str = '✓') -> List[int]:
+        """
+        複数行にDB取り込み済みフラグをまとめて立てる
+        
+        連続する行は1つの範囲にまとめ、values().batchUpdateの1リクエストで書き込む。
+        一部の範囲が更新されなかった場合やリトライ可能なHTTPエラーの場合は、
+        未更新の範囲のみを指数バックオフでリトライする。
+        
+        Args:
+            row_indices: 行番号（1始まり）のリスト
+            sheet_name: シート名
+            value: 書き込む値（デフォルト: ✓）
+        
+        Returns:
+            リトライ後も書き込めなかった行番号のリスト
+        """
+        remaining = self._merge_row_ranges(row_indices)
+        if not remaining:
+            return []
+        
+        if not self.service:
+            self.authenticate()
+        
+        for attempt in range(1, self.WRITE_MAX_RETRIES + 1):
+            data = [
+                {
+                    'range': f"{sheet_name}!{self._flag_range(start, end)}",
+                    'values': [[value]] * (end - start + 1),
+                }
+                for start, end in remaining
+            ]
+            
+            try:
+                self.request_count += 1
+                response = self.service.spreadsheets().values().batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={
+                        'valueInputOption': 'RAW',
+                        'data': data,
+                    }
+                ).execute()
+                
+                # 応答に含まれない範囲は未更新とみなしてリトライ対象に残す
+                updated = {
+                    r.get('updatedRange', '').split('!')[-1]
+                    for r in response.get('responses', [])
+                }
+                remaining = [(start, end) for start, end in remaining if self._flag_range(start, end) not in updated]
+                
+            except _http_error() as e:
+                status = getattr(e.resp, 'status', None)
+                logger.warning(f"HTTP error occurred while marking {len(remaining)} ranges (attempt {attempt}): {str(e)}")
+                if status not in self.RETRYABLE_STATUS_CODES:
+                    break
+            
+            if not remaining:
+                logger.info(f"Marked {len(row_indices)} rows as imported")
+                return []
+            
+            if attempt < self.WRITE_MAX_RETRIES:
+                time.sleep(self.WRITE_RETRY_BACKOFF * (2 ** (attempt - 1)))
+        
+        failed = [row for start, end in remaining for row in range(start, end + 1)]
+        logger.error(f"Failed to mark {len(failed)} rows as imported: {failed}")
+        return failed
+    
+    @staticmethod
+    def _merge_row_ranges(row_indices: List[int]) -> List[Tuple[int, int]]:
+        """
+        行番号のリストを連続範囲にまとめる
+        
+        例: [2, 3, 4, 7, 9, 10] → [(2, 4), (7, 7), (9, 10)]
+        
+        Args:
+            row_indices: 行番号のリスト（順不同・重複可）
+        
+        Returns:
+            (開始行, 終了行)のリスト
+        """
+        ranges = []
+        for row in sorted(set(row_indices)):
+            if ranges and row == ranges[-1][1] + 1:
+                ranges[-1] = (ranges[-1][0], row)
+            else:
+                ranges.append((row, row))
+        return ranges
+    
+    @staticmethod
+    def _flag_range(start: int, end: int) -> str:
+        """I列の範囲をA1記法で返す（単一セルの場合はAPIの応答形式に合わせてI2のように返す）"""
+        return f"I{start}" if start == end else f"I{start}:I{end}"
@@ -0,0 +1,179 @@
+"""
+取り込み処理の排他ロック
+
+import_locksテーブルの行をロックとして使い、同じスプレッドシートを複数のワーカーが
+同時に処理しないようにする。所有者は有効期限を定期的に延長し、延長されずに期限切れとなった
+ロック（異常終了したワーカーのもの）は他のワーカーが奪取できる。
+"""
+
+import os
+import uuid
+import socket
+import logging
+import threading
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from books.models import ImportLock
+
+logger = logging.getLogger(__name__)
+
+
+def default_owner() -> str:
+    """
+    ロック・リースの所有者の識別子を作成
+    
+    Returns:
+        ホスト名:プロセスID:ランダム値
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Heartbeat:
+    """ロック・リースの有効期限を別スレッドで延長し続ける（有効期限の1/3ごと）"""
+    
+    def __init__(self, lease):
+        """
+        初期化
+        
+        Args:
+            lease: ttl・is_held・refresh()を持つロックまたはリース
+        """
+        self.lease = lease
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    def start(self) -> None:
+        """延長スレッドを開始（開始済みの場合は何もしない）"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """延長スレッドを停止"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+    
+    def _run(self) -> None:
+        interval = self.lease.ttl.total_seconds() / 3
+        try:
+            while not self._stop.wait(interval):
+                if self.lease.is_held:
+                    self.lease.refresh()
+        finally:
+            # スレッドごとのDB接続を閉じる
+            connection.close()
+
+
+class DatabaseLock:
+    """DBの行を使った有効期限付きロック"""
+    
+    def __init__(self, name: str, ttl_seconds: Optional[int] = None, owner: Optional[str] = None):
+        """
+        初期化
+        
+        Args:
+            name: ロック名（例: import:スプレッドシートID）
+            ttl_seconds: 有効期限（秒、省略時は設定から取得）
+            owner: 所有者の識別子（省略時はホスト名:プロセスID:ランダム値）
+        """
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds or getattr(settings, 'IMPORT_LOCK_TTL_SECONDS', 300))
+        self.owner = owner or default_owner()
+        self.is_held = False
+        self._heartbeat = Heartbeat(self)
+    
+    @classmethod
+    def for_spreadsheet(cls, spreadsheet_id: str, **kwargs) -> 'DatabaseLock':
+        """
+        スプレッドシートの取り込み用ロックを作成
+        
+        Args:
+            spreadsheet_id: スプレッドシートID
+        
+        Returns:
+            ロック
+        """
+        return cls(f"import:{spreadsheet_id}", **kwargs)
+    
+    def acquire(self) -> bool:
+        """
+        ロックを取得（取得済みの場合は有効期限を延長）
+        
+        Returns:
+            取得できた場合True、他の所有者が有効なロックを保持している場合False
+        """
+        now = timezone.now()
+        # 自分のロックまたは期限切れのロックを条件付きUPDATEで奪取（同時に奪取しても1つだけが成功する）
+        # MySQLはSET句を左から順に評価するため、acquired_atはownerより先に更新する
+        updated = ImportLock.objects.filter(
+            Q(owner=self.owner) | Q(expires_at__lte=now),
+            name=self.name,
+        ).update(
+            acquired_at=Case(When(owner=self.owner, then=F('acquired_at')), default=Value(now)),
+            owner=self.owner,
+            heartbeat_at=now,
+            expires_at=now + self.ttl,
+        )
+        
+        if not updated:
+            try:
+                with transaction.atomic():
+                    ImportLock.objects.create(
+                        name=self.name,
+                        owner=self.owner,
+                        acquired_at=now,
+                        heartbeat_at=now,
+                        expires_at=now + self.ttl,
+                    )
+            except IntegrityError:
+                if self.is_held:
+                    logger.warning(f"Lost import lock {self.name}")
+                self.is_held = False
+                return False
+        
+        if not self.is_held:
+            logger.info(f"Acquired import lock {self.name} as {self.owner}")
+        self.is_held = True
+        return True
+    
+    def refresh(self) -> bool:
+        """
+        保持しているロックの有効期限を延長
+        
+        Returns:
+            延長できた場合True（期限切れで他の所有者に奪取されていた場合False）
+        """
+        now = timezone.now()
+        updated = ImportLock.objects.filter(name=self.name, owner=self.owner).update(
+            heartbeat_at=now,
+            expires_at=now + self.ttl,
+        )
+        if not updated and self.is_held:
+            logger.warning(f"Lost import lock {self.name}")
+        self.is_held = bool(updated)
+        return self.is_held
+    
+    def release(self) -> None:
+        """ロックを解放（保持していない場合は何もしない。延長スレッドも停止する）"""
+        self.stop_heartbeat()
+        deleted, _ = ImportLock.objects.filter(name=self.name, owner=self.owner).delete()
+        if deleted:
+            logger.info(f"Released import lock {self.name}")
+        self.is_held = False
+    
+    def start_heartbeat(self) -> None:
+        """別スレッドでロックの有効期限を延長し続ける（有効期限の1/3ごと、stop_heartbeatまたはreleaseで停止）"""
+        self._heartbeat.start()
+    
+    def stop_heartbeat(self) -> None:
+        """有効期限を延長するスレッドを停止"""
+        self._heartbeat.stop()
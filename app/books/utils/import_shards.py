@@ -0,0 +1,196 @@
+"""
+取り込みシャードのリース
+
+シートを一定行数ごとの行範囲（import_shardsテーブル）に分割し、各ワーカーは
+SELECT ... FOR UPDATE SKIP LOCKED で他のワーカーが選択中の行を飛ばしてシャードを1つずつリースする。
+同じ行範囲を複数のワーカーが同時に処理することはなく、所有者が異常終了して
+有効期限が切れたリースは他のワーカーが取得し直す。
+
+リース中はスプレッドシートの取り込みロック（import_locks）をワーカー共通の所有者で保持し、
+シャードを使わない取り込み（cronのimport_from_sheetsなど）と同じ行を同時に処理しないようにする。
+"""
+
+import logging
+from datetime import timedelta
+from typing import Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from books.models import ImportLock, ImportShard
+from books.utils.import_lock import DatabaseLock, Heartbeat, default_owner
+
+logger = logging.getLogger(__name__)
+
+
+class ImportShardQueue:
+    """シートの行範囲シャードのキュー（1つのワーカーが同時に保持するリースは1つ）"""
+    
+    # シャードを処理するワーカーが共通で使う取り込みロックの所有者（ワーカー同士は排他しない）
+    SHEET_LOCK_OWNER = 'import-shards'
+    
+    def __init__(
+        self,
+        sheet_name: str = 'Sheet1',
+        shard_rows: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        owner: Optional[str] = None,
+        spreadsheet_id: Optional[str] = None
+    ):
+        """
+        初期化
+        
+        Args:
+            sheet_name: シート名
+            shard_rows: 1シャードの行数（省略時は設定から取得）
+            ttl_seconds: リースの有効期限（秒、省略時は取り込みロックと同じ設定から取得）
+            owner: 所有者の識別子（省略時はホスト名:プロセスID:ランダム値）
+            spreadsheet_id: 取り込みロックを取得するスプレッドシートID（省略時は設定から取得）
+        """
+        self.sheet_name = sheet_name
+        self.shard_rows = max(1, shard_rows or getattr(settings, 'IMPORT_SHARD_ROWS', 1000))
+        self.ttl = timedelta(seconds=ttl_seconds or getattr(settings, 'IMPORT_LOCK_TTL_SECONDS', 300))
+        self.owner = owner or default_owner()
+        self.shard: Optional[ImportShard] = None  # リース中のシャード
+        self.sheet_lock = DatabaseLock.for_spreadsheet(
+            spreadsheet_id or settings.GOOGLE_SHEETS_SPREADSHEET_ID,
+            ttl_seconds=int(self.ttl.total_seconds()),
+            owner=self.SHEET_LOCK_OWNER,
+        )
+        self._heartbeat = Heartbeat(self)
+    
+    @property
+    def is_held(self) -> bool:
+        """シャードをリース中かどうか"""
+        return self.shard is not None
+    
+    def plan(self, row_count: int) -> int:
+        """
+        シートの行数まで不足しているシャードを作成
+        
+        既存のシャードの終了行の続きから作成するため、shard_rowsを変更しても行範囲は重ならない。
+        複数のワーカーが同時に作成しても、同じ開始行のシャードは1つだけ作成される。
+        
+        Args:
+            row_count: シートの行数（ヘッダー行を含む）
+        
+        Returns:
+            作成したシャード数
+        """
+        last_end_row = ImportShard.objects.filter(sheet_name=self.sheet_name).aggregate(Max('end_row'))['end_row__max']
+        start_row = (last_end_row or 1) + 1
+        shards = []
+        while start_row <= row_count:
+            shards.append(ImportShard(
+                sheet_name=self.sheet_name,
+                start_row=start_row,
+                end_row=start_row + self.shard_rows - 1,
+            ))
+            start_row += self.shard_rows
+        
+        if shards:
+            ImportShard.objects.bulk_create(shards, ignore_conflicts=True)
+            logger.info(f"Planned {len(shards)} import shards for {self.sheet_name} up to row {shards[-1].end_row}")
+        return len(shards)
+    
+    def claim(self) -> Optional[ImportShard]:
+        """
+        処理可能なシャードを1つリース（所有者がいない、またはリースが期限切れのもの）
+        
+        次回処理可能日時が最も古いシャードから取得する。他のワーカーが選択中の行はロック待ちせずに飛ばす。
+        シャードを使わない取り込みがスプレッドシートの取り込みロックを保持している間はリースしない。
+        
+        Returns:
+            リースしたシャード（処理可能なシャードがない、または取り込みロックを取得できない場合None）
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            shard = (
+                ImportShard.objects.select_for_update(skip_locked=True)
+                .filter(sheet_name=self.sheet_name, available_at__lte=now)
+                .filter(Q(owner='') | Q(lease_expires_at__lte=now) | Q(lease_expires_at__isnull=True))
+                .order_by('available_at', 'start_row')
+                .first()
+            )
+            if shard is None:
+                return None
+            
+            # 処理するシャードがある場合のみ取り込みロックを取得（待機中のワーカーがcronの実行を妨げない）
+            if not self.sheet_lock.acquire():
+                logger.info(f"Import lock {self.sheet_lock.name} is held by another import, not leasing shards")
+                return None
+            
+            if shard.owner and shard.owner != self.owner:
+                logger.warning(f"Reclaiming expired import shard {shard} from {shard.owner}")
+            shard.owner = self.owner
+            shard.leased_at = now
+            shard.lease_expires_at = now + self.ttl
+            shard.run_count += 1
+            shard.save(update_fields=['owner', 'leased_at', 'lease_expires_at', 'run_count', 'updated_at'])
+        
+        logger.info(f"Leased import shard {shard} as {self.owner}")
+        self.shard = shard
+        return shard
+    
+    def refresh(self) -> bool:
+        """
+        リース中のシャードと取り込みロックの有効期限を延長
+        
+        Returns:
+            延長できた場合True（期限切れで他のワーカー・取り込みに取得されていた場合False）
+        """
+        shard = self.shard
+        if shard is None:
+            return False
+        
+        updated = ImportShard.objects.filter(pk=shard.pk, owner=self.owner).update(
+            lease_expires_at=timezone.now() + self.ttl,
+        )
+        if not updated:
+            logger.warning(f"Lost import shard lease {shard}")
+        # 他のワーカーの解放で削除されていた場合は取得し直す
+        return bool(updated) and self.sheet_lock.acquire()
+    
+    def release(self, available_at=None) -> None:
+        """
+        リース中のシャードを解放（保持していない場合は何もしない）
+        
+        Args:
+            available_at: 次回処理可能日時（省略時は即時に他のワーカーが取得できる）
+        """
+        shard, self.shard = self.shard, None
+        if shard is None:
+            return
+        
+        ImportShard.objects.filter(pk=shard.pk, owner=self.owner).update(
+            owner='',
+            lease_expires_at=None,
+            available_at=available_at or timezone.now(),
+        )
+        logger.info(f"Released import shard {shard}")
+        self._release_sheet_lock()
+    
+    def _release_sheet_lock(self) -> None:
+        """他のワーカーが有効なリースを保持していない場合のみ取り込みロックを解放"""
+        self.sheet_lock.is_held = False
+        with transaction.atomic():
+            # ロック行を選択してから確認し、同時にリースしたワーカーのロックを削除しないようにする
+            lock = (
+                ImportLock.objects.select_for_update()
+                .filter(name=self.sheet_lock.name, owner=self.SHEET_LOCK_OWNER)
+                .first()
+            )
+            if lock is None:
+                return
+            if ImportShard.objects.exclude(owner='').filter(lease_expires_at__gt=timezone.now()).exists():
+                return
+            lock.delete()
+        logger.info(f"Released import lock {self.sheet_lock.name}")
+    
+    def start_heartbeat(self) -> None:
+        """別スレッドでリース中のシャードの有効期限を延長し続ける（有効期限の1/3ごと、stop_heartbeatで停止）"""
+        self._heartbeat.start()
+    
+    def stop_heartbeat(self) -> None:
+        """有効期限を延長するスレッドを停止"""
+        self._heartbeat.stop()
@@ -0,0 +1,127 @@
+"""
+適応型レートリミッター
+
+トークンバケットでAPI呼び出しの間隔を制御し、AIMD（加算増加・乗算減少）で
+送信レートをクォータに合わせて自動調整する
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# プロセス内で共有するリミッター（get_shared_limiterで生成）
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_limiter() -> 'AdaptiveRateLimiter':
+    """
+    プロセス内で共有するGoogle Books API用レートリミッターを取得
+    
+    Returns:
+        共有リミッター
+    """
+    global _shared_limiter
+    if _shared_limiter is None:
+        with _shared_limiter_lock:
+            if _shared_limiter is None:
+                _shared_limiter = AdaptiveRateLimiter(
+                    rate=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_INITIAL', 5.0),
+                    min_rate=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_MIN', 0.5),
+                    max_rate=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_MAX', 20.0),
+                    increase_step=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_INCREASE', 0.5),
+                    decrease_factor=getattr(settings, 'GOOGLE_BOOKS_RATE_LIMIT_DECREASE', 0.5),
+                )
+    return _shared_limiter
+
+
+class AdaptiveRateLimiter:
+    """トークンバケット + AIMD レートリミッター（スレッドセーフ）"""
+    
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase_step: float,
+        decrease_factor: float,
+        burst: Optional[float] = None
+    ):
+        """
+        初期化
+        
+        Args:
+            rate: 初期レート（リクエスト/秒）
+            min_rate: 最小レート（リクエスト/秒）
+            max_rate: 最大レート（リクエスト/秒）
+            increase_step: 成功時に加算するレート
+            decrease_factor: 制限応答時に乗算する係数（0〜1）
+            burst: バケット容量（省略時は1秒分のレート、最低1）
+        """
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.burst = burst
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._tokens = self._capacity()
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def rate(self) -> float:
+        """現在のレート（リクエスト/秒）"""
+        return self._rate
+    
+    def _capacity(self) -> float:
+        """バケット容量"""
+        return self.burst or max(1.0, self._rate)
+    
+    def _refill(self) -> None:
+        """経過時間に応じてトークンを補充（ロック取得済みで呼び出す）"""
+        now = time.monotonic()
+        self._tokens = min(self._capacity(), self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+    
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        トークンを1つ取得（取得できるまで待機）
+        
+        Args:
+            timeout: 最大待機秒数（Noneの場合は無制限）
+        
+        Returns:
+            取得できた場合True、タイムアウトした場合False
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self._rate
+            
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+    
+    def on_success(self) -> None:
+        """成功応答時にレートを加算増加"""
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase_step)
+    
+    def on_throttle(self) -> None:
+        """制限応答（429/rateLimitExceeded）時にレートを乗算減少し、バケットを空にする"""
+        with self._lock:
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            self._tokens = 0
+            self._updated_at = time.monotonic()
+        logger.warning(f"Rate limited by API, reducing request rate to {self._rate:.2f}/s")
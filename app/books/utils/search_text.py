@@ -0,0 +1,73 @@
+"""
+書籍検索用の文字列正規化
+
+検索キー（Book.search_key）と検索語を同じ規則で正規化し、全角/半角・大文字/小文字・
+カタカナ/ひらがなの違いを無視して照合できるようにする。
+"""
+
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+# カタカナ（ァ〜ヶ）→ ひらがな（ぁ〜ゖ）
+KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord('ァ'), ord('ヶ') + 1)}
+
+# ISBNらしい検索語（ハイフン・空白を除いて10桁または13桁）
+ISBN_PATTERN = re.compile(r'\d{9}[\dX]|\d{13}')
+
+# MySQLのngramパーサーのトークン長（ngram_token_sizeの既定値）、これより短い語は全文検索で一致しない
+NGRAM_TOKEN_SIZE = 2
+
+
+def normalize_search_text(value: Optional[str]) -> str:
+    """
+    文字列を検索用に正規化（NFKC正規化、小文字化、カタカナをひらがなに変換、連続する空白を1つにまとめる）
+    
+    Args:
+        value: 文字列
+    
+    Returns:
+        正規化した文字列
+    """
+    text = unicodedata.normalize('NFKC', value or '').lower().translate(KATAKANA_TO_HIRAGANA)
+    return ' '.join(text.split())
+
+
+def build_search_key(values: Iterable[Optional[str]]) -> str:
+    """
+    複数の値を正規化して1つの検索キーにまとめる（空の値は除く）
+    
+    Args:
+        values: 検索対象の値
+    
+    Returns:
+        検索キー
+    """
+    return ' '.join(filter(None, (normalize_search_text(value) for value in values)))
+
+
+def normalize_isbn_term(term: str) -> Optional[str]:
+    """
+    検索語がISBNの形式であれば正規化したISBNを返す
+    
+    Args:
+        term: 検索語
+    
+    Returns:
+        ハイフン・空白を除いたISBN（ISBNの形式でない場合None）
+    """
+    isbn = unicodedata.normalize('NFKC', term).replace('-', '').replace(' ', '').upper()
+    return isbn if ISBN_PATTERN.fullmatch(isbn) else None
+
+
+def to_boolean_query(tokens: List[str]) -> str:
+    """
+    正規化した検索語からMySQLの全文検索（BOOLEAN MODE）のクエリを作成（すべての語を含む行に一致）
+    
+    Args:
+        tokens: 正規化した検索語のリスト
+    
+    Returns:
+        BOOLEAN MODEのクエリ文字列
+    """
+    return ' '.join(f'+"{token}"' for token in (token.replace('"', '') for token in tokens) if token)
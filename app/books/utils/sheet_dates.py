@@ -0,0 +1,47 @@
+"""
+スプレッドシートの日付の解析
+
+申請日・承認日は通常 YYYY/MM/DD 形式だが、手入力や書式の違いで別の形式になることがあるため、
+取り込み時に1度だけ解析してDateFieldに保存する。
+"""
+
+import re
+import unicodedata
+from datetime import date, timedelta
+from typing import Optional
+
+# 年・月・日の区切りが / - . または 年月日のもの（後ろに時刻が続いてもよい）
+DATE_PATTERN = re.compile(r'(\d{4})\s*[/\-.年]\s*(\d{1,2})\s*[/\-.月]\s*(\d{1,2})\s*日?(?=$|[\sT])')
+
+# スプレッドシートのシリアル値（1899/12/30からの日数）の起点
+SERIAL_EPOCH = date(1899, 12, 30)
+
+
+def parse_sheet_date(value: Optional[str]) -> Optional[date]:
+    """
+    スプレッドシートの日付を解析
+    
+    対応形式: 2025/10/20、2025-1-5、2025.10.20、2025年10月20日（全角数字を含む）、
+    2025/10/20 10:30:00（時刻は無視）、20251020、シリアル値（45950）
+    
+    Args:
+        value: 日付の文字列
+    
+    Returns:
+        日付（空、または解析できない場合None）
+    """
+    text = unicodedata.normalize('NFKC', value or '').strip()
+    if not text:
+        return None
+    
+    try:
+        match = DATE_PATTERN.match(text)
+        if match:
+            return date(*map(int, match.groups()))
+        if re.fullmatch(r'\d{8}', text):
+            return date(int(text[:4]), int(text[4:6]), int(text[6:]))
+        if re.fullmatch(r'\d{5}(\.\d+)?', text):
+            return SERIAL_EPOCH + timedelta(days=int(float(text)))
+    except ValueError:
+        return None
+    return None
@@ -0,0 +1,105 @@
+"""
+処理段階ごとの時間計測
+
+取り込みバッチの各段階（スプレッドシート読み込み・書籍情報取得・DB書き込みなど）の
+経過時間を積算し、実行履歴（ImportRun）に記録する
+"""
+
+import math
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """
+    最近傍順位法によるパーセンタイル
+    
+    Args:
+        values: 値のリスト
+        pct: パーセンタイル（0〜100）
+    
+    Returns:
+        パーセンタイル値（値がない場合はNone）
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class StageTimer:
+    """
+    段階ごとの経過時間（秒）を積算するタイマー（メインスレッド専用）
+    
+    段階の中で別の段階に入った場合、内側の時間は外側の段階に加算しないため、
+    各段階の合計は計測全体の経過時間とほぼ一致する。
+    tracemallocでメモリ割り当てを追跡中の場合は、段階ごとの確保メモリのピークも記録する。
+    """
+    
+    def __init__(self):
+        """初期化"""
+        self.timings: Dict[str, float] = {}
+        self.peak_memory: Dict[str, int] = {}  # 段階名 → 確保メモリのピーク（バイト）
+        self._stack: List[Tuple[str, float]] = []  # (段階名, 計測を再開した時刻)
+        self._started = time.perf_counter()
+    
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        withブロック内の経過時間を段階nameに加算
+        
+        Args:
+            name: 段階名
+        """
+        now = time.perf_counter()
+        if self._stack:
+            parent, resumed_at = self._stack[-1]
+            self._add(parent, now - resumed_at)
+            self._record_peak(parent)
+        elif tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._stack.append((name, now))
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            _, resumed_at = self._stack.pop()
+            self._add(name, now - resumed_at)
+            self._record_peak(name)
+            if self._stack:
+                self._stack[-1] = (self._stack[-1][0], now)
+    
+    def _add(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+    
+    def _record_peak(self, name: str) -> None:
+        """直前の区切りからの確保メモリのピークを段階nameに記録し、ピークをリセット"""
+        if not tracemalloc.is_tracing():
+            return
+        _, peak = tracemalloc.get_traced_memory()
+        self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak)
+        tracemalloc.reset_peak()
+    
+    def elapsed(self) -> float:
+        """
+        計測開始からの経過時間
+        
+        Returns:
+            経過時間（秒）
+        """
+        return time.perf_counter() - self._started
+    
+    def as_dict(self, digits: int = 3) -> Dict[str, float]:
+        """
+        段階ごとの経過時間（JSONField保存用）
+        
+        Args:
+            digits: 丸める小数点以下の桁数
+        
+        Returns:
+            段階名をキー、秒を値とする辞書
+        """
+        return {name: round(seconds, digits) for name, seconds in self.timings.items()}
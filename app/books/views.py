@@ -1,6 +1,5 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
-from .utils.google_books_client import GoogleBooksClient
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,9 +20,13 @@ def fetch_book_info(request):
             'error': 'ISBNコードを入力してください'
         }, status=400)
     
+    # requestsの読み込みをWebワーカーの起動時ではなく初回呼び出し時に行う
+    from .utils.google_books_client import get_shared_client
+    from .utils.book_info_cache import CachedBookInfoClient
+    
     try:
-        # Google Books APIクライアント初期化
-        client = GoogleBooksClient()
+        # Google Books APIクライアント取得（プロセス内で接続プールを共有）
+        client = get_shared_client()
         
         # ISBN妥当性チェック
         if not client.validate_isbn(isbn):
@@ -32,8 +35,20 @@ def fetch_book_info(request):
                 'error': 'ISBNコードの形式が正しくありません（10桁または13桁の数字）'
             }, status=400)
         
-        # 書籍情報取得
-        book_info = client.get_book_info_by_isbn(isbn)
+        # 書籍情報取得（キャッシュ優先）
+        status, book_info = CachedBookInfoClient(client).lookup(isbn)
+        
+        if status == client.LOOKUP_THROTTLED:
+            return JsonResponse({
+                'success': False,
+                'error': 'Google Books APIの利用上限に達しました。しばらくしてから再度お試しください'
+            }, status=503)
+        
+        if status == client.LOOKUP_ERROR:
+            return JsonResponse({
+                'success': False,
+                'error': '書籍情報の取得に失敗しました。しばらくしてから再度お試しください'
+            }, status=502)
         
         if book_info:
             return JsonResponse({
@@ -91,6 +91,9 @@ DATABASES = {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # 接続の再利用（秒）。常駐ワーカー（import_worker）が実行ごとに再接続しないようにする
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '300')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -176,4 +179,46 @@ LOGGING = {
 GOOGLE_SHEETS_API_KEY = os.getenv('GOOGLE_SHEETS_API_KEY', '')
 GOOGLE_SHEETS_CREDENTIALS_PATH = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH', '/app/credentials/google_sheets_credentials.json')
 GOOGLE_SHEETS_SPREADSHEET_ID = os.getenv('GOOGLE_SHEETS_SPREADSHEET_ID', '')
+# スプレッドシートを読み込む際の1ページあたりの行数
+GOOGLE_SHEETS_WINDOW_ROWS = int(os.getenv('GOOGLE_SHEETS_WINDOW_ROWS', '1000'))
 GOOGLE_BOOKS_API_KEY = os.getenv('GOOGLE_BOOKS_API_KEY', '')
+# Google Books API接続設定（接続プールサイズ、タイムアウト秒、5xx時のリトライ回数・バックオフ係数・ジッター秒）
+GOOGLE_BOOKS_POOL_SIZE = int(os.getenv('GOOGLE_BOOKS_POOL_SIZE', '10'))
+GOOGLE_BOOKS_TIMEOUT = float(os.getenv('GOOGLE_BOOKS_TIMEOUT', '10'))
+GOOGLE_BOOKS_MAX_RETRIES = int(os.getenv('GOOGLE_BOOKS_MAX_RETRIES', '3'))
+GOOGLE_BOOKS_BACKOFF_FACTOR = float(os.getenv('GOOGLE_BOOKS_BACKOFF_FACTOR', '0.5'))
+GOOGLE_BOOKS_BACKOFF_JITTER = float(os.getenv('GOOGLE_BOOKS_BACKOFF_JITTER', '0.5'))
+# Google Books APIのレート制御（リクエスト/秒、AIMD: 成功ごとに加算・429等で乗算減少）
+GOOGLE_BOOKS_RATE_LIMIT_INITIAL = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT_INITIAL', '5'))
+GOOGLE_BOOKS_RATE_LIMIT_MIN = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT_MIN', '0.5'))
+GOOGLE_BOOKS_RATE_LIMIT_MAX = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT_MAX', '20'))
+GOOGLE_BOOKS_RATE_LIMIT_INCREASE = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT_INCREASE', '0.5'))
+GOOGLE_BOOKS_RATE_LIMIT_DECREASE = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT_DECREASE', '0.5'))
+# レート制御の待機上限（秒、超えた場合はRATE_LIMITEDとして扱う）
+GOOGLE_BOOKS_RATE_LIMIT_WAIT = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT_WAIT', '30'))
+# ISBN書籍情報キャッシュの有効期限（見つかった書籍／該当なしのネガティブキャッシュ）
+GOOGLE_BOOKS_CACHE_TTL_DAYS = int(os.getenv('GOOGLE_BOOKS_CACHE_TTL_DAYS', '30'))
+GOOGLE_BOOKS_NEGATIVE_CACHE_TTL_HOURS = int(os.getenv('GOOGLE_BOOKS_NEGATIVE_CACHE_TTL_HOURS', '24'))
+
+# Import batch settings
+# Google Books APIへの並列問い合わせ数（1で逐次処理）
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', '4'))
+# スプレッドシートへの取り込み済みフラグをまとめて書き戻す行数
+IMPORT_FLAG_FLUSH_SIZE = int(os.getenv('IMPORT_FLAG_FLUSH_SIZE', '100'))
+# 1トランザクションで処理する行数（書籍の一括登録もこの単位。取り込み済みフラグはコミット後に書き戻す）
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '200'))
+# 取り込み失敗行（ISBN不正・書籍なし）の再試行間隔（指数バックオフ）と試行上限
+IMPORT_RETRY_BASE_MINUTES = int(os.getenv('IMPORT_RETRY_BASE_MINUTES', '60'))
+IMPORT_RETRY_MAX_MINUTES = int(os.getenv('IMPORT_RETRY_MAX_MINUTES', '10080'))
+IMPORT_RETRY_MAX_ATTEMPTS = int(os.getenv('IMPORT_RETRY_MAX_ATTEMPTS', '8'))
+# 常駐ワーカー（import_worker）の実行間隔（秒）と、間隔に加えるランダムな揺らぎの最大値（秒）
+IMPORT_WORKER_INTERVAL_SECONDS = float(os.getenv('IMPORT_WORKER_INTERVAL_SECONDS', '60'))
+IMPORT_WORKER_JITTER_SECONDS = float(os.getenv('IMPORT_WORKER_JITTER_SECONDS', '10'))
+# 取り込みロックの有効期限（秒）。ワーカーが異常終了した場合、この時間が経過すると他のワーカーが引き継ぐ
+IMPORT_LOCK_TTL_SECONDS = int(os.getenv('IMPORT_LOCK_TTL_SECONDS', '300'))
+# 常駐ワーカーがシートを分担する行範囲（シャード）の行数。0の場合は分割せず、ロックを保持した1つのワーカーのみが取り込む
+IMPORT_SHARD_ROWS = int(os.getenv('IMPORT_SHARD_ROWS', '0'))
+# エラーログの保存期間（日）。最終発生日時がこれより古いエラーログは purge_error_logs で削除する
+ERROR_LOG_RETENTION_DAYS = int(os.getenv('ERROR_LOG_RETENTION_DAYS', '90'))
+# 管理画面の書籍・貸出履歴・エラーログの一覧で件数を数える上限。超える場合は推定値を表示する（0の場合は常に全件数える）
+ADMIN_COUNT_ESTIMATE_THRESHOLD = int(os.getenv('ADMIN_COUNT_ESTIMATE_THRESHOLD', '10000'))